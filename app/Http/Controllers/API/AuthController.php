@@ -8,6 +8,7 @@ use App\Http\Controllers\Controller;
 use Illuminate\Support\Facades\Hash;
 use Illuminate\Support\Facades\Validator;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\Http;
 
 class AuthController extends Controller
 {
@@ -204,126 +205,133 @@ class AuthController extends Controller
 
             Log::info('Processed user data', ['user_data' => $userData]);
 
-            // Step 1: Enhanced Python detection with comprehensive fallbacks
-            $pythonCommand = $this->findPythonCommand();
+            // Prefer the long-lived recommendation server (recommendation.py serve) when configured
+            $startTime = microtime(true);
+            $result = $this->requestRecommendationServer($userData);
+            $executionTime = microtime(true) - $startTime;
 
-            if ($pythonCommand === null) {
-                Log::error('Python not found - installation required');
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'Python interpreter not available. Please install Python 3.8+ and ensure it\'s in your system PATH.'
-                ], 503);
-            }
+            if ($result === null) {
+                // Step 1: Enhanced Python detection with comprehensive fallbacks
+                $pythonCommand = $this->findPythonCommand();
+
+                if ($pythonCommand === null) {
+                    Log::error('Python not found - installation required');
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'Python interpreter not available. Please install Python 3.8+ and ensure it\'s in your system PATH.'
+                    ], 503);
+                }
 
-            Log::info('Python detection successful', ['command' => $pythonCommand]);
+                Log::info('Python detection successful', ['command' => $pythonCommand]);
 
-            // Step 2: Locate Python script with multiple fallback paths
-            $pythonScriptPath = $this->findPythonScript();
+                // Step 2: Locate Python script with multiple fallback paths
+                $pythonScriptPath = $this->findPythonScript();
 
-            if ($pythonScriptPath === null) {
-                Log::error('Python script not found in any location');
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'Recommendation service temporarily unavailable. Python script not found.'
-                ], 503);
-            }
+                if ($pythonScriptPath === null) {
+                    Log::error('Python script not found in any location');
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'Recommendation service temporarily unavailable. Python script not found.'
+                    ], 503);
+                }
 
-            Log::info('Python script located', ['path' => $pythonScriptPath]);
+                Log::info('Python script located', ['path' => $pythonScriptPath]);
 
-            // Step 3: Locate dataset file
-            $datasetPath = $this->findDataset($pythonScriptPath);
+                // Step 3: Locate dataset file
+                $datasetPath = $this->findDataset($pythonScriptPath);
 
-            if ($datasetPath === null) {
-                Log::error('Dataset file not found');
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'Recommendation data temporarily unavailable. Dataset not found.'
-                ], 503);
-            }
+                if ($datasetPath === null) {
+                    Log::error('Dataset file not found');
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'Recommendation data temporarily unavailable. Dataset not found.'
+                    ], 503);
+                }
 
-            Log::info('Dataset located', ['path' => $datasetPath]);
+                Log::info('Dataset located', ['path' => $datasetPath]);
 
-            // Step 4: Prepare JSON data with proper encoding to avoid command line issues
-            $userDataJson = json_encode($userData, JSON_UNESCAPED_SLASHES | JSON_UNESCAPED_UNICODE | JSON_PRETTY_PRINT);
+                // Step 4: Prepare JSON data with proper encoding to avoid command line issues
+                $userDataJson = json_encode($userData, JSON_UNESCAPED_SLASHES | JSON_UNESCAPED_UNICODE | JSON_PRETTY_PRINT);
 
-            if (json_last_error() !== JSON_ERROR_NONE) {
-                Log::error('JSON encoding failed', ['error' => json_last_error_msg()]);
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'Failed to process user data for ML model'
-                ], 500);
-            }
-
-            // Step 5: Use temporary file approach to avoid JSON escaping issues
-            $tempFile = tempnam(sys_get_temp_dir(), 'recommendation_input_');
-            if (file_put_contents($tempFile, $userDataJson) === false) {
-                Log::error('Failed to create temporary file', ['temp_file' => $tempFile]);
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'Failed to prepare recommendation request'
-                ], 500);
-            }
+                if (json_last_error() !== JSON_ERROR_NONE) {
+                    Log::error('JSON encoding failed', ['error' => json_last_error_msg()]);
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'Failed to process user data for ML model'
+                    ], 500);
+                }
 
-            // Step 6: Build secure command with proper escaping
-            $command = sprintf(
-                '%s %s --file %s 2>&1',
-                escapeshellcmd($pythonCommand),
-                escapeshellarg($pythonScriptPath),
-                escapeshellarg($tempFile)
-            );
+                // Step 5: Use temporary file approach to avoid JSON escaping issues
+                $tempFile = tempnam(sys_get_temp_dir(), 'recommendation_input_');
+                if (file_put_contents($tempFile, $userDataJson) === false) {
+                    Log::error('Failed to create temporary file', ['temp_file' => $tempFile]);
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'Failed to prepare recommendation request'
+                    ], 500);
+                }
 
-            Log::info('Executing ML recommendation command', [
-                'command' => $command,
-                'script_path' => $pythonScriptPath,
-                'dataset_path' => $datasetPath,
-                'temp_file' => $tempFile,
-                'input_data_size' => strlen($userDataJson)
-            ]);
+                // Step 6: Build secure command with proper escaping
+                $command = sprintf(
+                    '%s %s --file %s 2>&1',
+                    escapeshellcmd($pythonCommand),
+                    escapeshellarg($pythonScriptPath),
+                    escapeshellarg($tempFile)
+                );
 
-            // Step 7: Execute with proper resource limits for ML processing
-            set_time_limit(180); // 3 minutes for complex ML operations
-            ini_set('memory_limit', '2048M'); // Increased memory for large datasets
+                Log::info('Executing ML recommendation command', [
+                    'command' => $command,
+                    'script_path' => $pythonScriptPath,
+                    'dataset_path' => $datasetPath,
+                    'temp_file' => $tempFile,
+                    'input_data_size' => strlen($userDataJson)
+                ]);
 
-            $startTime = microtime(true);
-            $output = shell_exec($command);
-            $executionTime = microtime(true) - $startTime;
+                // Step 7: Execute with proper resource limits for ML processing
+                set_time_limit(180); // 3 minutes for complex ML operations
+                ini_set('memory_limit', '2048M'); // Increased memory for large datasets
 
-            // Step 8: Clean up temporary file immediately
-            if (file_exists($tempFile)) {
-                unlink($tempFile);
-            }
+                $startTime = microtime(true);
+                $output = shell_exec($command);
+                $executionTime = microtime(true) - $startTime;
 
-            Log::info('Python ML script execution completed', [
-                'execution_time' => round($executionTime, 2) . 's',
-                'output_length' => strlen($output ?? ''),
-                'raw_output' => $output
-            ]);
+                // Step 8: Clean up temporary file immediately
+                if (file_exists($tempFile)) {
+                    unlink($tempFile);
+                }
 
-            // Step 9: Validate script output
-            if (empty($output)) {
-                Log::error('Python script returned empty output', [
-                    'command' => $command,
-                    'execution_time' => $executionTime
+                Log::info('Python ML script execution completed', [
+                    'execution_time' => round($executionTime, 2) . 's',
+                    'output_length' => strlen($output ?? ''),
+                    'raw_output' => $output
                 ]);
-                return response()->json([
-                    'status' => 'error',
-                    'message' => 'ML model failed to generate output. Please try again.'
-                ], 500);
-            }
 
-            // Step 10: Parse Python output with robust JSON extraction
-            $result = $this->parsePythonOutput($output);
+                // Step 9: Validate script output
+                if (empty($output)) {
+                    Log::error('Python script returned empty output', [
+                        'command' => $command,
+                        'execution_time' => $executionTime
+                    ]);
+                    return response()->json([
+                        'status' => 'error',
+                        'message' => 'ML model failed to generate output. Please try again.'
+                    ], 500);
+                }
 
-            if ($result === null) {
-                Log::error('Failed to parse Python output as JSON', [
-                    'raw_output' => $output,
-                    'output_length' => strlen($output)
-                ]);
-                // Return fallback recommendations instead of complete failure
-                return response()->json([
-                    'status' => 'success',
-                    'recommendations' => $this->getDefaultRecommendations($userData['skills'])
-                ], 200);
+                // Step 10: Parse Python output with robust JSON extraction
+                $result = $this->parsePythonOutput($output);
+
+                if ($result === null) {
+                    Log::error('Failed to parse Python output as JSON', [
+                        'raw_output' => $output,
+                        'output_length' => strlen($output)
+                    ]);
+                    // Return fallback recommendations instead of complete failure
+                    return response()->json([
+                        'status' => 'success',
+                        'recommendations' => $this->getDefaultRecommendations($userData['skills'])
+                    ], 200);
+                }
             }
 
             // Step 11: Handle Python script errors
@@ -404,6 +412,55 @@ class AuthController extends Controller
         }
     }
 
+    /**
+     * Ask the long-lived recommendation server for recommendations.
+     * Returns null when no server is configured or it cannot be reached,
+     * so the caller falls back to running the Python script directly.
+     */
+    private function requestRecommendationServer(array $userData)
+    {
+        $url = config('services.recommendation.server_url');
+        $socket = config('services.recommendation.server_socket');
+
+        if (empty($url) && empty($socket)) {
+            return null;
+        }
+
+        try {
+            $client = Http::timeout((int) config('services.recommendation.server_timeout', 10))->acceptJson();
+
+            if (!empty($socket)) {
+                $client = $client->withOptions(['curl' => [CURLOPT_UNIX_SOCKET_PATH => $socket]]);
+                $url = 'http://localhost';
+            }
+
+            $response = $client->post(rtrim($url, '/') . '/recommend', $userData);
+            $result = $response->json();
+
+            if (!is_array($result)) {
+                Log::warning('Recommendation server returned invalid JSON', [
+                    'status' => $response->status(),
+                    'body' => $response->body()
+                ]);
+                return null;
+            }
+
+            Log::info('Recommendation server responded', [
+                'status' => $response->status(),
+                'execution_time' => $result['execution_time'] ?? null
+            ]);
+
+            return $result;
+        } catch (\Exception $e) {
+            Log::warning('Recommendation server unavailable, falling back to Python script', [
+                'url' => $url,
+                'socket' => $socket,
+                'error' => $e->getMessage()
+            ]);
+            return null;
+        }
+    }
+
     /**
      * Enhanced Python detection with comprehensive OS support
      */
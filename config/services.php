@@ -31,4 +31,10 @@ return [
         'region' => env('AWS_DEFAULT_REGION', 'us-east-1'),
     ],
 
+    'recommendation' => [
+        'server_url' => env('RECOMMENDATION_SERVER_URL'),
+        'server_socket' => env('RECOMMENDATION_SERVER_SOCKET'),
+        'server_timeout' => env('RECOMMENDATION_SERVER_TIMEOUT', 10),
+    ],
+
 ];
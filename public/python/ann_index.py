@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Approximate Nearest Neighbour Index
+IVF-style coarse quantizer over the normalized dataset rows: spherical
+k-means splits the rows into lists, the model stores each list
+contiguously, and a query only scans the lists whose centroids are most
+similar to it.
+
+Knobs:
+    n_lists  (build)  more lists -> smaller lists -> faster, lower recall
+    n_probes (query)  lists scanned per query; more -> higher recall, slower
+
+Benchmark (recall@k against the exact scan on synthetic data):
+    python ann_index.py --sizes 10000,100000,500000 --probes 1,4,16 --k 6
+"""
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+MAX_LISTS = 1024
+TRAIN_SAMPLE_SIZE = 100000
+TRAIN_ITERATIONS = 10
+ASSIGN_CHUNK_ROWS = 65536
+
+
+def default_n_lists(n_rows):
+    """About sqrt(rows) lists, capped so assignment stays cheap on large datasets"""
+    return int(max(1, min(MAX_LISTS, round(np.sqrt(n_rows)))))
+
+
+class IVFIndex:
+    """
+    centroids: (n_lists, features) float32, L2-normalized
+    offsets:   rows of list l are offsets[l]:offsets[l + 1] of the model's row order
+    """
+
+    def __init__(self, centroids, offsets):
+        self.centroids = centroids
+        self.offsets = offsets
+
+    @property
+    def n_lists(self):
+        return int(self.centroids.shape[0])
+
+    def probe(self, query_normalized, n_probes):
+        """The n_probes lists whose centroids are most similar to the query"""
+        scores = self.centroids @ query_normalized.astype(np.float32, copy=False)
+        n_probes = min(n_probes, self.n_lists)
+        return np.argpartition(scores, self.n_lists - n_probes)[self.n_lists - n_probes:]
+
+
+def assign_lists(X_normalized, centroids, chunk_rows=ASSIGN_CHUNK_ROWS):
+    """Nearest (most similar) centroid of every row, in memory-bounded chunks"""
+    labels = np.empty(X_normalized.shape[0], dtype=np.int64)
+    for start in range(0, X_normalized.shape[0], chunk_rows):
+        chunk = np.asarray(X_normalized[start:start + chunk_rows], dtype=np.float32)
+        labels[start:start + chunk_rows] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(X_normalized, n_lists, iterations=TRAIN_ITERATIONS,
+                    sample_size=TRAIN_SAMPLE_SIZE, seed=0):
+    """Spherical k-means on a sample of the normalized rows"""
+    rng = np.random.default_rng(seed)
+    n_rows = X_normalized.shape[0]
+    sample = np.sort(rng.choice(n_rows, min(n_rows, sample_size), replace=False))
+    data = np.asarray(X_normalized[sample], dtype=np.float32)
+    n_lists = min(n_lists, data.shape[0])
+
+    centroids = data[rng.choice(data.shape[0], n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_lists(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        counts = np.bincount(labels, minlength=n_lists)
+
+        # Re-seed empty lists with random rows so every list stays useful
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = data[rng.choice(data.shape[0], len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1)
+        norms[norms == 0.0] = 1.0
+        centroids = (sums / norms[:, np.newaxis]).astype(np.float32)
+
+    return centroids
+
+
+def build_ivf(X_normalized, n_lists=None, iterations=TRAIN_ITERATIONS, seed=0):
+    """
+    Train the quantizer and group rows by list. Returns the row permutation
+    that puts every list contiguously, and the IVFIndex over the permuted rows.
+    """
+    if n_lists is None:
+        n_lists = default_n_lists(X_normalized.shape[0])
+    centroids = train_centroids(X_normalized, n_lists, iterations, seed=seed)
+    labels = assign_lists(X_normalized, centroids)
+
+    order = np.argsort(labels, kind='stable')
+    offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=centroids.shape[0]), out=offsets[1:])
+    return order, IVFIndex(centroids, offsets)
+
+
+def _synthetic_rows(n_rows, n_features, n_clusters, rng):
+    """Clustered sparse 0/1 rows, roughly shaped like survey skill/interest flags"""
+    prototypes = rng.random((n_clusters, n_features)) < 0.06
+    labels = rng.integers(0, n_clusters, n_rows)
+    flips = rng.random((n_rows, n_features)) < 0.02
+    return (prototypes[labels] ^ flips).astype(np.float64)
+
+
+def benchmark(sizes, probes, k=6, n_queries=200, n_features=291, n_clusters=40, seed=0):
+    """recall@k and latency of the IVF search against the exact scan for each dataset size"""
+    from scoring import ScoringEngine, l2_normalize_rows
+
+    rng = np.random.default_rng(seed)
+    report = []
+    for n_rows in sizes:
+        X = _synthetic_rows(n_rows, n_features, n_clusters, rng)
+        start = time.perf_counter()
+        order, ivf = build_ivf(l2_normalize_rows(X, dtype=np.float32), seed=seed)
+        build_seconds = time.perf_counter() - start
+        engine = ScoringEngine.from_matrix(X[order])
+        engine.ann = ivf
+
+        queries = _synthetic_rows(n_queries, n_features, n_clusters, rng)
+        engine.ann_probes = 0
+        exact, exact_ms = _timed_top_k(engine, queries, k)
+        entry = {"rows": n_rows, "n_lists": ivf.n_lists, "build_seconds": round(build_seconds, 2),
+                 "exact": {"mean_ms": exact_ms}, "ivf": []}
+
+        for n_probes in probes:
+            engine.ann_probes = n_probes
+            approx, approx_ms = _timed_top_k(engine, queries, k)
+            hits = sum(len(set(a.tolist()) & set(e.tolist())) for a, e in zip(approx, exact))
+            entry["ivf"].append({
+                "n_probes": n_probes,
+                "recall_at_k": round(hits / float(sum(len(e) for e in exact)), 4),
+                "mean_ms": approx_ms,
+                "speedup": round(exact_ms / max(approx_ms, 1e-9), 1)
+            })
+        report.append(entry)
+    return report
+
+
+def _timed_top_k(engine, queries, k):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(engine.top_k(query, k)[0])
+    mean_ms = (time.perf_counter() - start) / len(queries) * 1000
+    return results, round(mean_ms, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IVF recall/latency benchmark against the exact scan')
+    parser.add_argument('--sizes', default='10000,100000,500000', help='Comma-separated dataset sizes')
+    parser.add_argument('--probes', default='1,2,4,8,16', help='Comma-separated n_probes values')
+    parser.add_argument('--k', type=int, default=6, help='Neighbours per query (recommend_roles uses top_n*2)')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per dataset size')
+    args = parser.parse_args()
+
+    report = benchmark([int(s) for s in args.sizes.split(',')], [int(p) for p in args.probes.split(',')],
+                       k=args.k, n_queries=args.queries)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
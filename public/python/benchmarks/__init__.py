@@ -0,0 +1,11 @@
+"""
+Career Recommendation System - Benchmarks
+Synthetic survey datasets with the df_upsampled.csv schema and a pipeline
+benchmark that times every stage and serving mode, emitting JSON that can
+be compared between commits, plus a worker scaling benchmark.
+
+    python -m benchmarks run --sizes 10000,100000 --output bench.json
+    python -m benchmarks compare baseline.json bench.json
+    python -m benchmarks scaling --rows 1000000 --workers 1,2,4,8
+    python -m benchmarks generate --rows 1000000 --output df_upsampled.csv
+"""
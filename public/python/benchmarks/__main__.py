@@ -0,0 +1,91 @@
+"""Command line entry point: python -m benchmarks {run,compare,generate,scaling}"""
+import sys
+import json
+import argparse
+
+from scoring import BACKENDS
+from benchmarks import pipeline, scaling
+from benchmarks.synthetic_survey import SyntheticSurvey, ROLE_NAMES, DEFAULT_UNIQUE_RATIO
+
+
+def _sizes(value):
+    return [int(float(size)) for size in value.split(',')]
+
+
+def _counts(value):
+    return [int(count) for count in value.split(',')]
+
+
+def _write_json(data, path):
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Recommendation pipeline benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Benchmark the pipeline on synthetic datasets')
+    run_parser.add_argument('--sizes', type=_sizes, default=list(pipeline.DEFAULT_SIZES),
+                            help='Comma-separated dataset sizes in rows, e.g. 10000,100000,5e6')
+    run_parser.add_argument('--roles', type=int, default=len(ROLE_NAMES), help='Distinct roles (default: %(default)s)')
+    run_parser.add_argument('--queries', type=int, default=pipeline.DEFAULT_QUERIES, help='Payloads per mode (default: %(default)s)')
+    run_parser.add_argument('--unique-ratio', type=float, default=DEFAULT_UNIQUE_RATIO, help='Fraction of distinct rows (default: %(default)s)')
+    run_parser.add_argument('--modes', default='single,batch,server', help='Serving modes to measure (default: %(default)s)')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--work-dir', help='Where temporary datasets and artifacts are written (default: system temp)')
+    run_parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    run_parser.add_argument('--verbose', action='store_true', help='Show pipeline logs')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two reports and flag regressions')
+    compare_parser.add_argument('baseline', help='Report from the reference commit')
+    compare_parser.add_argument('current', help='Report from the commit under test')
+    compare_parser.add_argument('--threshold', type=float, default=pipeline.DEFAULT_REGRESSION_THRESHOLD,
+                                help='Slowdown ratio counted as a regression (default: %(default)s)')
+
+    generate_parser = subparsers.add_parser('generate', help='Write a synthetic df_upsampled.csv')
+    generate_parser.add_argument('--rows', type=lambda v: int(float(v)), required=True)
+    generate_parser.add_argument('--roles', type=int, default=len(ROLE_NAMES))
+    generate_parser.add_argument('--unique-ratio', type=float, default=DEFAULT_UNIQUE_RATIO)
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.add_argument('--output', required=True)
+
+    scaling_parser = subparsers.add_parser('scaling', help='Scoring throughput and latency per worker count')
+    scaling_parser.add_argument('--rows', type=lambda v: int(float(v)), default=scaling.DEFAULT_ROWS)
+    scaling_parser.add_argument('--workers', type=_counts, default=list(scaling.DEFAULT_WORKERS),
+                                help='Comma-separated worker counts (default: 1,2,4)')
+    scaling_parser.add_argument('--queries', type=int, default=scaling.DEFAULT_QUERIES, help='Batch size (default: %(default)s)')
+    scaling_parser.add_argument('--backend', choices=BACKENDS, default='dense')
+    scaling_parser.add_argument('--seed', type=int, default=0)
+    scaling_parser.add_argument('--work-dir', help='Where the temporary dataset and artifact are written (default: system temp)')
+    scaling_parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    scaling_parser.add_argument('--verbose', action='store_true', help='Show pipeline logs')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = pipeline.run(args.sizes, args.roles, args.queries, args.unique_ratio,
+                              tuple(args.modes.split(',')), args.seed, args.work_dir, args.verbose)
+        _write_json(report, args.output)
+    elif args.command == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        comparison = pipeline.compare(baseline, current, args.threshold)
+        _write_json(comparison, None)
+        sys.exit(1 if comparison['regressions'] else 0)
+    elif args.command == 'scaling':
+        report = scaling.run(args.rows, args.workers, args.queries, args.backend, seed=args.seed,
+                             work_dir=args.work_dir, verbose=args.verbose)
+        _write_json(report, args.output)
+    else:
+        SyntheticSurvey(args.rows, args.roles, args.unique_ratio, args.seed).write_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Recommendation pipeline benchmark.
+
+For each dataset size: write a synthetic survey CSV, then time every
+stage of the pipeline once (load, prepare_model_data, artifact compile,
+model open) and the per-query stages over a fixed set of payloads
+(vectorize, score, labels). It then measures latency percentiles and
+throughput for the three serving modes: single requests, JSONL batch and
+the HTTP server. The result cache is disabled throughout so every query
+is scored.
+
+Metric names end in their unit: *_s, *_ms and *_us are lower-is-better,
+*_per_second is higher-is-better. compare() relies on that.
+"""
+import io
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import threading
+import contextlib
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+import model_artifact
+import recommendation
+import recommendation_server
+from result_cache import ResultCache
+from benchmarks.synthetic_survey import SyntheticSurvey, ROLE_NAMES
+
+SCHEMA_VERSION = 1
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_QUERIES = 500
+DEFAULT_REGRESSION_THRESHOLD = 1.10
+
+
+def _latency_summary(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    return {
+        "requests": int(samples.size),
+        "mean_ms": round(float(samples.mean()) * 1000, 3),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+        "max_ms": round(float(samples.max()) * 1000, 3),
+        "requests_per_second": round(samples.size / float(samples.sum()), 1)
+    }
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_payloads(n_payloads, seed=0):
+    """User payloads drawn from the skills and interests the template knows about"""
+    template = recommendation.create_input_features_template()
+    skills = [c[:-len('_skill')] for c in template if c.endswith('_skill')]
+    interests = list(recommendation.INTEREST_MAPPING) + [c[:-len('_interest')] for c in template
+                                                         if c.endswith('_interest')][:20]
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(n_payloads):
+        payloads.append({
+            'skills': [str(s) for s in rng.choice(skills, rng.integers(1, 8), replace=False)],
+            'interests': [str(i) for i in rng.choice(interests, rng.integers(1, 4), replace=False)],
+            'country': str(rng.choice(['USA', 'UK', 'Pakistan', 'India', 'Germany'])),
+            'years_code': int(rng.integers(0, 30)),
+            'work_experience': float(rng.integers(0, 20)),
+        })
+    return payloads
+
+
+def benchmark_stages(dataset_path, artifact_root, payloads):
+    """One-off stage timings and per-query stage costs; returns (report, model)"""
+    stages = {}
+    df, stages['load_s'] = _timed(recommendation.load_dataset, dataset_path)
+    prepared, stages['prepare_model_data_s'] = _timed(recommendation.prepare_model_data, df)
+    X_encoded, y_encoded, le_target, label_encoders, input_columns = prepared
+    del df
+
+    source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+    _, stages['compile_artifact_s'] = _timed(
+        model_artifact.write_artifact, artifact_root, source_hash, dataset_path, X_encoded.values,
+        y_encoded, le_target, label_encoders, input_columns)
+    del prepared, X_encoded
+    model, stages['open_model_s'] = _timed(recommendation.load_model, dataset_path, artifact_root,
+                                           cache=ResultCache(0))
+
+    vectors = []
+    start = time.perf_counter()
+    for user_data in payloads:
+        vectors.append(model.vectorizer.vectorize(recommendation.validate_user_data(dict(user_data))))
+    vectorize = time.perf_counter() - start
+
+    top_roles = []
+    start = time.perf_counter()
+    for vector in vectors:
+        top_roles.append(model.engine.top_k_roles(vector, 3))
+    score = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for role_ids, scores in top_roles:
+        recommendation.role_scores(model.engine, role_ids, scores)
+    labels = time.perf_counter() - start
+
+    per_query = {
+        "vectorize_us": round(vectorize / len(payloads) * 1e6, 2),
+        "score_us": round(score / len(payloads) * 1e6, 2),
+        "labels_us": round(labels / len(payloads) * 1e6, 2),
+    }
+    return {"stages": {k: round(v, 4) for k, v in stages.items()}, "per_query": per_query}, model
+
+
+def benchmark_single(model, payloads):
+    """generate_recommendations per payload, as the CLI and server call it"""
+    samples = []
+    for user_data in payloads:
+        start = time.perf_counter()
+        recommendation.generate_recommendations(dict(user_data), model)
+        samples.append(time.perf_counter() - start)
+    return _latency_summary(samples)
+
+
+def benchmark_batch(model, payloads, batch_size=recommendation.BATCH_SIZE):
+    """run_batch over the payloads as one JSONL stream"""
+    stream = io.StringIO('\n'.join(json.dumps(p) for p in payloads) + '\n')
+    (processed, failed), elapsed = _timed(recommendation.run_batch, stream, io.StringIO(), model,
+                                          batch_size=batch_size)
+    return {
+        "users": processed,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 4),
+        "users_per_second": round(processed / elapsed, 1)
+    }
+
+
+def benchmark_server(model, payloads):
+    """Round trips to an in-process HTTP server on an ephemeral port over one keep-alive connection"""
+    service = recommendation_server.RecommendationService(
+        load_model=lambda: model,
+        recommend=recommendation.generate_recommendations,
+        model_info=recommendation.get_model_info
+    )
+    server = recommendation_server.RecommendationHTTPServer(('127.0.0.1', 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = recommendation_server.open_connection(f"http://127.0.0.1:{server.server_address[1]}")
+        samples = []
+        try:
+            for user_data in payloads:
+                start = time.perf_counter()
+                result = recommendation_server.request_recommendation(user_data, connection=connection)
+                samples.append(time.perf_counter() - start)
+                if result.get('status') != 'success':
+                    raise RuntimeError(f"Server returned error: {result.get('message')}")
+        finally:
+            connection.close()
+        return _latency_summary(samples)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, n_roles=len(ROLE_NAMES), n_queries=DEFAULT_QUERIES,
+        unique_ratio=0.5, modes=('single', 'batch', 'server'), seed=0, work_dir=None, verbose=False):
+    """Benchmark every dataset size and return the JSON-ready report"""
+    payloads = synthetic_payloads(n_queries, seed)
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "config": {"sizes": list(sizes), "roles": n_roles, "queries": n_queries,
+                   "unique_ratio": unique_ratio, "modes": list(modes), "seed": seed},
+        "results": []
+    }
+
+    base_dir = tempfile.mkdtemp(prefix='recommendation-bench-', dir=work_dir)
+    log_sink = contextlib.nullcontext() if verbose else contextlib.redirect_stderr(io.StringIO())
+    try:
+        with log_sink:
+            for n_rows in sizes:
+                size_dir = os.path.join(base_dir, str(n_rows))
+                os.makedirs(size_dir)
+                dataset_path = os.path.join(size_dir, 'df_upsampled.csv')
+                survey = SyntheticSurvey(n_rows, n_roles, unique_ratio, seed)
+                _, generate = _timed(survey.write_csv, dataset_path)
+
+                entry, model = benchmark_stages(dataset_path, os.path.join(size_dir, 'model_artifacts'), payloads)
+                entry = dict({"rows": n_rows, "roles": n_roles,
+                              "unique_rows": model.manifest['n_unique_rows'],
+                              "generate_s": round(generate, 2)}, **entry)
+                if 'single' in modes:
+                    entry["single"] = benchmark_single(model, payloads)
+                if 'batch' in modes:
+                    entry["batch"] = benchmark_batch(model, payloads)
+                if 'server' in modes:
+                    entry["server"] = benchmark_server(model, payloads)
+                report["results"].append(entry)
+                del model
+                shutil.rmtree(size_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return report
+
+
+def _metrics(value, prefix=''):
+    """Flatten a result entry into {'single.p50_ms': 1.2, ...}"""
+    flat = {}
+    for key, item in value.items():
+        path = f"{prefix}{key}"
+        if isinstance(item, dict):
+            flat.update(_metrics(item, path + '.'))
+        elif isinstance(item, (int, float)) and not isinstance(item, bool):
+            flat[path] = item
+    return flat
+
+
+def compare(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    Metric-by-metric ratios between two reports for the dataset sizes both
+    cover. A metric regresses when it gets worse by more than threshold x.
+    """
+    previous = {(r['rows'], r['roles']): r for r in baseline['results']}
+    comparison = {"baseline_commit": baseline.get('commit'), "current_commit": current.get('commit'),
+                  "threshold": threshold, "results": [], "regressions": []}
+
+    for result in current['results']:
+        key = (result['rows'], result['roles'])
+        if key not in previous:
+            continue
+        old_metrics, new_metrics = _metrics(previous[key]), _metrics(result)
+        changes = {}
+        for name, new_value in new_metrics.items():
+            old_value = old_metrics.get(name)
+            if name.endswith('_per_second'):
+                worse = old_value and new_value and old_value / new_value
+            elif name.endswith(('_s', '_ms', '_us')):
+                worse = old_value and new_value / old_value
+            else:
+                continue
+            if not worse:
+                continue
+            changes[name] = {"baseline": old_value, "current": new_value, "slowdown": round(worse, 3)}
+            if worse > threshold:
+                comparison["regressions"].append(dict({"rows": key[0], "metric": name}, **changes[name]))
+        comparison["results"].append({"rows": key[0], "roles": key[1], "metrics": changes})
+
+    return comparison
@@ -0,0 +1,93 @@
+"""
+Worker scaling benchmark.
+
+Builds one synthetic dataset, then scores the same payloads with each
+worker count in turn: batch throughput (queries split across the pool)
+and single-query latency (rows split across the pool once the dataset is
+large enough). Results are identical for every worker count, which the
+benchmark checks, so only the timings differ.
+
+BLAS libraries run their own threads as well; pin them (for example
+OPENBLAS_NUM_THREADS=1) so the numbers measure these workers alone.
+"""
+import io
+import os
+import time
+import shutil
+import tempfile
+import contextlib
+
+import numpy as np
+
+import recommendation
+import scoring
+from result_cache import ResultCache
+from benchmarks.pipeline import synthetic_payloads, _latency_summary
+from benchmarks.synthetic_survey import SyntheticSurvey, ROLE_NAMES
+
+DEFAULT_ROWS = 200000
+DEFAULT_WORKERS = (1, 2, 4)
+DEFAULT_QUERIES = 2000
+SINGLE_QUERIES = 200
+
+
+def _vectors(model, payloads):
+    return np.vstack([model.vectorizer.vectorize(recommendation.validate_user_data(dict(user_data)))
+                      for user_data in payloads])
+
+
+def run(n_rows=DEFAULT_ROWS, worker_counts=DEFAULT_WORKERS, n_queries=DEFAULT_QUERIES, backend='dense',
+        n_roles=len(ROLE_NAMES), seed=0, work_dir=None, verbose=False):
+    """Batch throughput and single-query latency per worker count; returns the JSON-ready report"""
+    payloads = synthetic_payloads(n_queries, seed)
+    report = {
+        "rows": n_rows, "unique_rows": None, "backend": backend, "queries": n_queries, "cpus": os.cpu_count(),
+        "min_rows_per_shard": scoring.MIN_ROWS_PER_SHARD, "results": []
+    }
+
+    base_dir = tempfile.mkdtemp(prefix='recommendation-scaling-', dir=work_dir)
+    log_sink = contextlib.nullcontext() if verbose else contextlib.redirect_stderr(io.StringIO())
+    try:
+        with log_sink:
+            dataset_path = SyntheticSurvey(n_rows, n_roles, seed=seed).write_csv(
+                os.path.join(base_dir, 'df_upsampled.csv'))
+            model = recommendation.load_model(dataset_path, os.path.join(base_dir, 'model_artifacts'), backend,
+                                              cache=ResultCache(0))
+            vectors = _vectors(model, payloads)
+            engine = model.engine
+            report["unique_rows"] = engine.n_rows
+
+            expected = None
+            for workers in worker_counts:
+                engine.workers = workers
+                engine.top_k_roles_batch(vectors[:8], 3)
+
+                start = time.perf_counter()
+                results = engine.top_k_roles_batch(vectors, 3)
+                elapsed = time.perf_counter() - start
+
+                samples = []
+                for vector in vectors[:SINGLE_QUERIES]:
+                    start = time.perf_counter()
+                    engine.top_k_roles(vector, 3)
+                    samples.append(time.perf_counter() - start)
+
+                role_ids = [result[0].tolist() for result in results]
+                if expected is None:
+                    expected = role_ids
+                elif role_ids != expected:
+                    raise RuntimeError(f"Results with {workers} workers differ from {worker_counts[0]} workers")
+
+                report["results"].append({
+                    "workers": workers,
+                    "shards_per_query": engine.n_shards,
+                    "batch_queries_per_second": round(len(vectors) / elapsed, 1),
+                    "single": _latency_summary(samples)
+                })
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    baseline = report["results"][0]["batch_queries_per_second"]
+    for result in report["results"]:
+        result["batch_speedup"] = round(result["batch_queries_per_second"] / baseline, 2)
+    return report
@@ -0,0 +1,139 @@
+"""
+Synthetic developer-survey datasets with the same columns as
+create_input_features_template() plus response_id and current_role.
+
+Every row is a pure function of (seed, source row), computed with a
+counter-based hash, so datasets of any size are written chunk by chunk in
+bounded memory and the same arguments always give the same file. Like the
+real upsampled dataset, the first n_rows * unique_ratio rows are distinct
+responses and the rest repeat earlier ones.
+"""
+import numpy as np
+
+from recommendation import create_input_features_template
+
+DEFAULT_CHUNK_ROWS = 100000
+DEFAULT_UNIQUE_RATIO = 0.5
+
+ROLE_NAMES = [
+    'Developer, back-end',
+    'Developer, full-stack',
+    'Developer, front-end',
+    'Developer, mobile',
+    'Data scientist or machine learning specialist',
+    'Engineer, data',
+    'DevOps specialist',
+    'Cloud infrastructure engineer',
+    'Developer, embedded applications or devices',
+    'Database administrator',
+    'Security professional',
+    'Developer, QA or test',
+]
+
+CATEGORY_VALUES = {
+    'main_branch': ['Developer', 'Hobbyist', 'Student', 'Former developer'],
+    'work_mode': ['Hybrid', 'Remote', 'In-person'],
+    'education': ["Bachelor's degree (B.A., B.S., B.Eng., etc.)", "Master's degree (M.A., M.S., M.Eng., MBA, etc.)",
+                  'Some college/university study without earning a degree', 'Secondary school',
+                  'Professional degree (JD, MD, Ph.D, Ed.D, etc.)'],
+    'country': ['USA', 'UK', 'Pakistan', 'India', 'Germany', 'Canada', 'Brazil', 'France', 'Poland', 'Netherlands'],
+}
+
+# Columns a role's members flag far more often than the background rate
+SIGNATURE_COLUMNS_PER_ROLE = 12
+SIGNATURE_RATE = 0.55
+BACKGROUND_RATE = 0.04
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def role_names(n_roles):
+    """n_roles target labels: real survey role names first, then numbered extras"""
+    return ROLE_NAMES[:n_roles] + [f'Developer, specialty {i}' for i in range(len(ROLE_NAMES), n_roles)]
+
+
+def _uniform(seed, rows, n_columns, stream):
+    """Deterministic uniform [0, 1) draws, one per (row, column), from splitmix64"""
+    with np.errstate(over='ignore'):
+        counters = rows.astype(np.uint64)[:, np.newaxis] * np.uint64(n_columns) + np.arange(n_columns, dtype=np.uint64)
+        z = counters + np.uint64((seed * 1000003 + stream) & 0xFFFFFFFFFFFFFFFF) * _GOLDEN + _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * _MIX_1
+        z = (z ^ (z >> np.uint64(27))) * _MIX_2
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+class SyntheticSurvey:
+    """
+    n_rows:       rows in the dataset
+    n_roles:      distinct current_role values
+    unique_ratio: fraction of rows that are distinct responses
+    """
+
+    def __init__(self, n_rows, n_roles=len(ROLE_NAMES), unique_ratio=DEFAULT_UNIQUE_RATIO, seed=0):
+        if n_rows <= 0:
+            raise ValueError("n_rows must be positive")
+        self.n_rows = int(n_rows)
+        self.n_unique = max(1, min(self.n_rows, int(round(self.n_rows * unique_ratio))))
+        self.roles = np.array(role_names(n_roles), dtype=object)
+        self.seed = seed
+
+        template = create_input_features_template()
+        self.template = template
+        self.columns = ['response_id'] + list(template) + ['current_role']
+        self.flag_columns = [c for c in template if c.endswith('_skill') or c.endswith('_interest')]
+        self.employment_columns = [c for c in template
+                                   if isinstance(template[c], float) and c != 'work_experience']
+
+        # Per-role flag probabilities: a handful of signature columns over a low background rate
+        rng = np.random.default_rng(seed)
+        self.flag_rates = np.full((len(self.roles), len(self.flag_columns)), BACKGROUND_RATE)
+        for role in range(len(self.roles)):
+            signature = rng.choice(len(self.flag_columns), SIGNATURE_COLUMNS_PER_ROLE, replace=False)
+            self.flag_rates[role, signature] = SIGNATURE_RATE
+
+    def source_rows(self, start, stop):
+        """The distinct response each of rows start:stop repeats"""
+        rows = np.arange(start, stop)
+        picks = (_uniform(self.seed, rows, 1, stream=1)[:, 0] * self.n_unique).astype(np.int64)
+        return np.where(rows < self.n_unique, rows, picks)
+
+    def frame(self, start=0, stop=None):
+        """Rows start:stop as a DataFrame"""
+        import pandas as pd
+
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        sources = self.source_rows(start, stop)
+        role = (_uniform(self.seed, sources, 1, stream=2)[:, 0] * len(self.roles)).astype(np.int64)
+        categories = _uniform(self.seed, sources, len(CATEGORY_VALUES) + 3, stream=3)
+        flags = _uniform(self.seed, sources, len(self.flag_columns), stream=4) < self.flag_rates[role]
+        flag_index = {col: i for i, col in enumerate(self.flag_columns)}
+
+        data = {'response_id': sources}
+        for col, default in self.template.items():
+            if col in CATEGORY_VALUES:
+                values = np.array(CATEGORY_VALUES[col], dtype=object)
+                position = list(CATEGORY_VALUES).index(col)
+                data[col] = values[(categories[:, position] * len(values)).astype(np.int64)]
+            elif col == 'Unnamed: 0':
+                data[col] = sources
+            elif col == 'years_code':
+                data[col] = (categories[:, -3] * 40).astype(np.int64)
+            elif col == 'work_experience':
+                data[col] = np.round(np.minimum(categories[:, -3] * 40, categories[:, -1] * 30), 1)
+            elif col in self.employment_columns:
+                chosen = (categories[:, -2] * len(self.employment_columns)).astype(np.int64)
+                data[col] = (chosen == self.employment_columns.index(col)).astype(np.float64)
+            else:
+                data[col] = flags[:, flag_index[col]].astype(type(default))
+        data['current_role'] = self.roles[role]
+        return pd.DataFrame(data, columns=self.columns)
+
+    def write_csv(self, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Write the dataset to path in chunks of chunk_rows"""
+        for start in range(0, self.n_rows, chunk_rows):
+            self.frame(start, start + chunk_rows).to_csv(path, index=False, mode='w' if start == 0 else 'a',
+                                                         header=start == 0)
+        return path
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Offline Evaluation
+Scores the held-out split of the dataset (the same train_test_split the
+notebook makes) against the training split and reports how often the
+true role is recommended: hit@1 and hit@3 overall, recall per role, and
+the wall-clock time and rows/second of the scoring. Held-out rows are
+queried as a payload would encode them, so columns no payload can set
+(the saved CSV index, employment flags) keep their template defaults.
+
+The training split is compiled into a throwaway artifact, so each
+configuration is the engine a served model would use:
+
+    exact       every training row, no deduplication (the reference)
+    dense, sparse, stream, quantized
+                the artifact's deduplicated backends, which rank exactly
+    ivf         the dense backend probing only --ann-probes IVF lists
+
+Every configuration also reports the share of held-out rows whose top
+roles match the first one's, which is 1.0 for the exact backends.
+"""
+import math
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+import model_artifact
+from scoring import ScoringEngine, RoleIndex, BACKENDS, SIMILARITY_CHUNK_BYTES
+
+TEST_SIZE = 0.2
+SPLIT_RANDOM_STATE = 42
+HIT_RANKS = (1, 3)
+CONFIGURATIONS = ('exact',) + BACKENDS + ('ivf',)
+DEFAULT_ANN_PROBES = 4
+
+
+def split_indices(n_rows):
+    """Train and test row indices of the notebook's train_test_split"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(n_rows), test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATE)
+
+
+def split_sizes(n_rows):
+    """Train and test row counts of split_indices, without shuffling anything"""
+    test_size = int(math.ceil(TEST_SIZE * n_rows))
+    return n_rows - test_size, test_size
+
+
+def role_targets(roles, y_encoded, classes):
+    """RoleIndex id of each encoded target; -1 for roles the index has none of"""
+    ids = {name: role for role, name in enumerate(roles.names)}
+    role_of_class = np.array([ids.get(str(value).strip(), -1) for value in classes], dtype=np.int64)
+    return role_of_class[np.asarray(y_encoded, dtype=np.int64)]
+
+
+def score_held_out(engine, X_test, targets, k=max(HIT_RANKS), chunk_bytes=SIMILARITY_CHUNK_BYTES):
+    """Top-k role ids of every held-out row (-1 padded), hit rates and timings"""
+    start = time.perf_counter()
+    results = engine.top_k_roles_batch(X_test, k, chunk_bytes)
+    elapsed = time.perf_counter() - start
+
+    predicted = np.full((len(results), k), -1, dtype=np.int64)
+    for row, (role_ids, _) in enumerate(results):
+        predicted[row, :len(role_ids)] = role_ids
+    hits = (predicted == targets[:, np.newaxis]) & (targets[:, np.newaxis] >= 0)
+
+    n_roles = engine.roles.n_roles
+    known = targets >= 0
+    support = np.bincount(targets[known], minlength=n_roles)
+    report = {"seconds": round(elapsed, 3),
+              "rows_per_second": round(len(results) / elapsed, 1) if elapsed > 0 else None,
+              "unknown_role_rows": int((~known).sum())}
+    per_role = {name: {"support": int(count)} for name, count in zip(engine.roles.names, support)}
+    for rank in HIT_RANKS:
+        hit = hits[:, :rank].any(axis=1)
+        report[f"hit@{rank}"] = round(float(hit.mean()), 4) if len(hit) else None
+        recalled = np.bincount(targets[known], weights=hit[known], minlength=n_roles)
+        for name, count, total in zip(engine.roles.names, recalled, support):
+            per_role[name][f"recall@{rank}"] = round(float(count / total), 4) if total else None
+    report["per_role"] = per_role
+    return predicted, report
+
+
+def evaluate(X_encoded, y_encoded, le_target, label_encoders, input_columns, dataset_path, vectorizer=None,
+             configurations=CONFIGURATIONS, ann_probes=DEFAULT_ANN_PROBES, workers=1, work_dir=None):
+    """
+    Score the held-out split with each configuration; returns the JSON-ready
+    report. vectorizer (a FeatureVectorizer) turns held-out rows into queries;
+    without one they are scored as they are.
+    """
+    X = np.asarray(X_encoded, dtype=np.float64)
+    y = np.asarray(y_encoded, dtype=np.int64)
+    train, test = split_indices(X.shape[0])
+    queries = X[test] if vectorizer is None else vectorizer.as_queries(X[test])
+    report = {"train_rows": int(len(train)), "test_rows": int(len(test)), "test_size": TEST_SIZE,
+              "random_state": SPLIT_RANDOM_STATE, "configurations": {}}
+
+    artifact_root = tempfile.mkdtemp(prefix='recommendation-evaluate-', dir=work_dir)
+    try:
+        path = model_artifact.write_artifact(artifact_root, 'held-out-train', dataset_path, X[train], y[train],
+                                             le_target, label_encoders, input_columns)
+        reference = None
+        for name in configurations:
+            if name == 'exact':
+                engine = ScoringEngine.from_matrix(X[train])
+                engine.roles = RoleIndex.for_engine(engine, y[train], le_target.classes_)
+            elif name == 'ivf':
+                engine = model_artifact.load_artifact(path, 'dense').engine
+                engine.ann_probes = ann_probes
+            elif name in BACKENDS:
+                engine = model_artifact.load_artifact(path, name).engine
+            else:
+                raise ValueError(f"Unknown configuration: {name}")
+            engine.workers = max(1, workers)
+
+            targets = role_targets(engine.roles, y[test], le_target.classes_)
+            predicted, result = score_held_out(engine, queries, targets)
+            if reference is None:
+                reference = predicted
+            result["matches_first"] = round(float((predicted == reference).all(axis=1).mean()), 4)
+            result["memory_mb"] = round(engine.memory_bytes() / 1024 / 1024, 2)
+            if name == 'ivf':
+                result["ann_probes"] = ann_probes
+                result["ann_lists"] = engine.ann.n_lists
+            report["configurations"][name] = result
+    finally:
+        shutil.rmtree(artifact_root, ignore_errors=True)
+
+    return report
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Feature Vectorizer
+Turns a user payload straight into an encoded feature row. The column
+index map, the encoded template defaults and the skill/interest expansion
+table are computed once when the model is loaded, so each request only
+copies the default row and sets a few entries.
+"""
+import numpy as np
+
+# Profile fields copied from user data, with the cast update_input_features_from_user_data applies
+PROFILE_FIELDS = (
+    ('main_branch', str),
+    ('work_mode', str),
+    ('education', str),
+    ('years_code', int),
+    ('country', str),
+    ('work_experience', float),
+)
+
+
+def encode_input_features(input_features, label_encoders, input_columns):
+    """
+    Encode one feature dict into a row aligned with input_columns, with the
+    same rules as the notebook: label-encode strings (unseen -> -1) and fill
+    missing values with 0.
+    """
+    row = np.zeros(len(input_columns), dtype=np.float64)
+
+    for i, col in enumerate(input_columns):
+        value = input_features.get(col)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            if col not in label_encoders:
+                raise ValueError(f"Non-numeric value for numeric column '{col}': {value}")
+            try:
+                row[i] = label_encoders[col].transform([value])[0]
+            except ValueError:
+                # Handle unseen categories in the input features
+                row[i] = -1
+        elif value == value:  # NaN stays 0
+            row[i] = value
+
+    return row
+
+
+class FeatureVectorizer:
+    """
+    Compiled equivalent of create_input_features_template ->
+    update_input_features_from_user_data -> encode_input_features.
+    The row it produces is bit-identical to that pipeline's.
+    """
+
+    def __init__(self, template, interest_mapping, label_encoders, input_columns):
+        self.input_columns = list(input_columns)
+        self.n_features = len(self.input_columns)
+        self.column_index = {col: i for i, col in enumerate(self.input_columns)}
+        self.base_row = encode_input_features(template, label_encoders, self.input_columns)
+        self.category_codes = {
+            col: {value: code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in label_encoders.items()
+        }
+
+        # name -> columns a skill sets (its _skill and _interest flags) and
+        # columns a directly named interest sets (its _interest flag); only
+        # template keys count, and only those the model actually has
+        self.skill_columns = {}
+        self.interest_columns = {}
+        for key in template:
+            index = self.column_index.get(key)
+            if index is None:
+                continue
+            if key.endswith('_skill'):
+                self.skill_columns.setdefault(key[:-len('_skill')], []).append(index)
+            elif key.endswith('_interest'):
+                name = key[:-len('_interest')]
+                self.skill_columns.setdefault(name, []).append(index)
+                self.interest_columns[name] = [index]
+
+        # Interest categories ('Web', 'AI', ...) expand to every column their mapped skills set
+        self.interest_expansion = {
+            interest: [i for skill in skills for i in self.skill_columns.get(skill, [])]
+            for interest, skills in interest_mapping.items()
+        }
+
+        # Columns a payload can set; every other column always keeps its template default
+        self.payload_columns = np.zeros(self.n_features, dtype=bool)
+        self.payload_columns[[self.column_index[field] for field, _ in PROFILE_FIELDS
+                              if field in self.column_index]] = True
+        self.payload_columns[[i for columns in self.skill_columns.values() for i in columns]] = True
+
+    def as_queries(self, rows):
+        """Encoded dataset rows as a payload would encode them: other columns reset to the template"""
+        return np.where(self.payload_columns, rows, self.base_row)
+
+    def _encode_profile_value(self, col, value):
+        if isinstance(value, str):
+            if col not in self.category_codes:
+                raise ValueError(f"Non-numeric value for numeric column '{col}': {value}")
+            return self.category_codes[col].get(value, -1)
+        return value if value == value else 0
+
+    def vectorize(self, user_data, out=None):
+        """Encoded feature row for one (validated) user payload, written into out if given"""
+        if out is None:
+            row = self.base_row.copy()
+        else:
+            row = out
+            row[:] = self.base_row
+
+        for field, cast in PROFILE_FIELDS:
+            if field in user_data:
+                value = cast(user_data[field])
+                index = self.column_index.get(field)
+                if index is not None:
+                    row[index] = self._encode_profile_value(field, value)
+
+        flagged = []
+        for skill in user_data.get('skills', []):
+            flagged.extend(self.skill_columns.get(f"{skill}", ()))
+        for interest in user_data.get('interests', []):
+            if interest in self.interest_expansion:
+                flagged.extend(self.interest_expansion[interest])
+            else:
+                flagged.extend(self.interest_columns.get(f"{interest}", ()))
+        if flagged:
+            row[flagged] = 1.0
+
+        return row
+
+    def vectorize_batch(self, payloads):
+        """Feature matrix with one row per (validated) user payload"""
+        matrix = np.empty((len(payloads), self.n_features), dtype=np.float64)
+        for i, user_data in enumerate(payloads):
+            self.vectorize(user_data, out=matrix[i])
+        return matrix
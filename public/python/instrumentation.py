@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Instrumentation
+Monotonic per-stage timers for the recommendation response and an opt-in
+profiler (cProfile + tracemalloc) that writes its report to a file.
+
+    timer = StageTimer()
+    with timer.stage('similarity'):
+        ...
+    timer.as_dict()   # {'similarity_ms': 0.41, 'total_ms': 0.52}
+
+Code on the request path takes a timer argument defaulting to NULL_TIMER,
+whose stages cost nothing, so timings are only collected when asked for.
+"""
+import io
+import time
+import contextlib
+
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
+
+class StageTimer:
+    """Accumulates wall time per named stage; repeated stages add up"""
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self):
+        """Stage durations in milliseconds, in the order the stages first ran, plus the total"""
+        timings = {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timings
+
+
+class NullTimer:
+    """Timer that records nothing"""
+
+    enabled = False
+    _context = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def as_dict(self):
+        return {}
+
+
+NULL_TIMER = NullTimer()
+
+
+class Profiler:
+    """
+    cProfile plus tracemalloc around a block of work. stop() writes a text
+    report (hottest functions by cumulative time, peak memory and the
+    largest allocation sites) to path, and the raw cProfile stats to
+    path + '.pstats' for snakeviz / pstats.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._profile = None
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def stop(self):
+        import pstats
+        import tracemalloc
+
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self._profile.dump_stats(self.path + '.pstats')
+        stats_text = io.StringIO()
+        pstats.Stats(self._profile, stream=stats_text).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("=== cProfile (cumulative) ===\n")
+            f.write(stats_text.getvalue())
+            f.write("\n=== tracemalloc ===\n")
+            f.write(f"current: {current / 1024 / 1024:.2f} MiB, peak: {peak / 1024 / 1024:.2f} MiB\n\n")
+            for statistic in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"{statistic}\n")
+        return self.path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
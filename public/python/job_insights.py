@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Job Insights
+Optional enrichment of recommended roles with job listings from the
+Adzuna search API, the same query JobInsightController::getInsights
+makes, so clients no longer call /job-insights once per role.
+
+The lookups for all roles of a response run concurrently on an asyncio
+loop. Each one borrows a keep-alive connection from a small pool and
+runs the blocking http.client call on the pool's threads, bounded by a
+per-request timeout. Results are cached by (country, role) in a
+ResultCache, so repeated roles never leave the process while fresh.
+A role whose lookup fails gets an "error" entry; the recommendation
+itself never fails because of it.
+"""
+import json
+import queue
+import asyncio
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlencode
+
+from result_cache import ResultCache
+
+DEFAULT_BASE_URL = 'https://api.adzuna.com/v1/api/jobs'
+DEFAULT_TIMEOUT_SECONDS = 5.0
+DEFAULT_MAX_CONNECTIONS = 4
+DEFAULT_LISTINGS_PER_ROLE = 5
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_CACHE_TTL_SECONDS = 3600
+# getInsights' default country
+DEFAULT_COUNTRY = 'gb'
+
+# Survey country names -> the country codes Adzuna serves
+ADZUNA_COUNTRIES = {
+    'united kingdom of great britain and northern ireland': 'gb', 'united kingdom': 'gb', 'uk': 'gb',
+    'united states of america': 'us', 'united states': 'us', 'usa': 'us',
+    'austria': 'at', 'australia': 'au', 'belgium': 'be', 'brazil': 'br', 'canada': 'ca',
+    'switzerland': 'ch', 'germany': 'de', 'spain': 'es', 'france': 'fr', 'india': 'in', 'italy': 'it',
+    'mexico': 'mx', 'netherlands': 'nl', 'new zealand': 'nz', 'poland': 'pl', 'singapore': 'sg',
+    'south africa': 'za',
+}
+
+
+def adzuna_country(user_data):
+    """Adzuna country code for a payload: job_country if given, else its survey country, else gb"""
+    for field in ('job_country', 'country'):
+        value = str(user_data.get(field) or '').strip().lower()
+        if value in ADZUNA_COUNTRIES.values():
+            return value
+        if value in ADZUNA_COUNTRIES:
+            return ADZUNA_COUNTRIES[value]
+    return DEFAULT_COUNTRY
+
+
+def summarize_listings(role, country, payload, limit):
+    """The parts of an Adzuna search response a client shows for one role"""
+    if not isinstance(payload, dict) or not isinstance(payload.get('results') or [], list):
+        raise ValueError("Job search returned an unexpected response")
+    listings = []
+    for job in (payload.get('results') or [])[:limit]:
+        if not isinstance(job, dict):
+            raise ValueError("Job search returned an unexpected listing")
+        listings.append({
+            "title": job.get('title'),
+            "company": (job.get('company') or {}).get('display_name'),
+            "location": (job.get('location') or {}).get('display_name'),
+            "salary_min": job.get('salary_min'),
+            "salary_max": job.get('salary_max'),
+            "created": job.get('created'),
+            "url": job.get('redirect_url')
+        })
+    return {"role": role, "country": country, "count": payload.get('count'), "mean_salary": payload.get('mean'),
+            "listings": listings}
+
+
+class JobInsightClient:
+    """
+    base_url:         API root the /{country}/search/1 paths hang off; point
+                      it at a local stub server to test without Adzuna
+    app_id, app_key:  Adzuna credentials
+    timeout:          seconds one upstream request may take
+    max_connections:  pooled keep-alive connections, i.e. lookups in flight at once
+    cache:            ResultCache for (country, role) results (default: in-memory, 1 hour)
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, app_id=None, app_key=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, listings_per_role=DEFAULT_LISTINGS_PER_ROLE, cache=None):
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f"Job insights base URL must be an http(s) URL: {base_url}")
+        self.base_url = base_url
+        self._connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self._host = url.hostname
+        self._port = url.port
+        self._path = url.path.rstrip('/')
+        self.app_id = app_id
+        self.app_key = app_key
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self.listings_per_role = listings_per_role
+        self.cache = cache if cache is not None else ResultCache(DEFAULT_CACHE_ENTRIES, DEFAULT_CACHE_TTL_SECONDS)
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        # Idle keep-alive connections; None slots are opened on first use
+        self._connections = queue.LifoQueue()
+        for _ in range(self.max_connections):
+            self._connections.put(None)
+
+    def _pool(self):
+        """Threads the blocking requests run on, created on first use (after any fork)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_connections,
+                                                    thread_name_prefix='job-insights')
+            return self._executor
+
+    def _search_path(self, role, country):
+        params = {
+            'app_id': self.app_id or '',
+            'app_key': self.app_key or '',
+            'results_per_page': self.listings_per_role,
+            'what': role,
+            'where': '',
+            'content-type': 'application/json'
+        }
+        return f"{self._path}/{country}/search/1?{urlencode(params)}"
+
+    def _get_json(self, path):
+        """One GET on a pooled connection; the connection is dropped on any error"""
+        connection = self._connections.get()
+        try:
+            if connection is None:
+                connection = self._connection_class(self._host, self._port, timeout=self.timeout)
+            with self._lock:
+                self.requests_sent += 1
+            connection.request('GET', path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            body = response.read()
+            if response.will_close:
+                connection.close()
+                connection = None
+            if response.status != 200:
+                raise ValueError(f"Job search returned HTTP {response.status}")
+            return json.loads(body.decode('utf-8'))
+        except Exception:
+            if connection is not None:
+                connection.close()
+                connection = None
+            raise
+        finally:
+            self._connections.put(connection)
+
+    async def _lookup_role(self, role, country):
+        loop = asyncio.get_running_loop()
+        try:
+            payload = await asyncio.wait_for(
+                loop.run_in_executor(self._pool(), self._get_json, self._search_path(role, country)), self.timeout)
+            # A malformed body is one role's failure like any other, never the recommendation's
+            return summarize_listings(role, country, payload, self.listings_per_role)
+        except asyncio.TimeoutError:
+            return {"role": role, "country": country, "error": f"Job search timed out after {self.timeout}s"}
+        except Exception as e:
+            return {"role": role, "country": country, "error": f"Job search failed: {str(e)}"}
+
+    async def lookup_async(self, roles, country):
+        """Insights for each role, in order; uncached roles are fetched concurrently"""
+        keys = [f"jobs|{country}|{role}" for role in roles]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {key: role for key, role in zip(keys, roles) if key not in found}
+        if missing:
+            fetched = await asyncio.gather(*[self._lookup_role(role, country) for role in missing.values()])
+            fresh = {key: insight for key, insight in zip(missing, fetched) if 'error' not in insight}
+            self.cache.put_many(fresh)
+            found.update(zip(missing, fetched))
+        return [found[key] for key in keys]
+
+    def lookup(self, roles, country):
+        """lookup_async from synchronous code (the CLI and the server's request threads)"""
+        return asyncio.run(self.lookup_async(list(roles), country))
+
+    def for_payload(self, user_data, roles):
+        """Insights for the roles recommended to one payload, in its country"""
+        return self.lookup(roles, adzuna_country(user_data))
+
+    def stats(self):
+        return {"base_url": self.base_url, "requests_sent": self.requests_sent, "cache": self.cache.stats()}
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Compiled Model Artifact
+Compiles df_upsampled.csv once into memory-mapped NumPy files so that
+recommendation requests never parse the CSV or refit the label encoders.
+
+New survey responses are appended in place (append_to_artifact): every
+file only grows, and the manifest, replaced atomically last, records how
+many rows are committed. Readers slice each array to the manifest's
+counts, so they never see a half-written append. Appended rows are
+deduplicated among themselves only and sit after the IVF lists as an
+always-scanned tail until compact_artifact rebuilds the structures.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import contextlib
+from datetime import datetime
+
+import numpy as np
+
+from scoring import (ScoringEngine, SparseScoringEngine, StreamingScoringEngine, QuantizedScoringEngine,
+                     NpyRowBlocks, RowGroups, RoleIndex, l2_normalize_rows, split_binary_columns, sparse_components,
+                     quantize_columns, dedupe_rows)
+from ann_index import IVFIndex, build_ivf
+
+ARTIFACT_FORMAT_VERSION = 7
+MANIFEST_FILE = 'manifest.json'
+SOURCE_STAT_FILE = 'source_stat.json'
+FEATURES_FILE = 'X.npy'
+UNIQUE_FEATURES_FILE = 'X_unique.npy'
+GROUP_OFFSETS_FILE = 'group_offsets.npy'
+GROUP_MEMBERS_FILE = 'group_members.npy'
+NORMALIZED_FILE = 'X_normalized.npy'
+SPARSE_DATA_FILE = 'X_binary_data.npy'
+SPARSE_INDICES_FILE = 'X_binary_indices.npy'
+SPARSE_INDPTR_FILE = 'X_binary_indptr.npy'
+SPARSE_DENSE_FILE = 'X_dense_block.npy'
+QUANTIZED_FILE = 'X_quantized.npy'
+QUANTIZED_SCALES_FILE = 'X_quantized_scales.npy'
+ANN_CENTROIDS_FILE = 'ann_centroids.npy'
+ANN_OFFSETS_FILE = 'ann_offsets.npy'
+TARGETS_FILE = 'y.npy'
+BUILD_LOCK_FILE = '.build.lock'
+HASH_CHUNK_SIZE = 1024 * 1024
+ARTIFACT_DIR_ENV = 'RECOMMENDATION_ARTIFACT_DIR'
+
+
+class FrozenLabelEncoder:
+    """Read-only LabelEncoder rebuilt from a stored vocabulary (no sklearn needed)"""
+
+    def __init__(self, classes):
+        self.classes_ = np.empty(len(classes), dtype=object)
+        self.classes_[:] = list(classes)
+        self._codes = {value: code for code, value in enumerate(classes)}
+
+    def transform(self, values):
+        """Map values to their codes, raising ValueError on unseen labels like sklearn"""
+        try:
+            return np.array([self._codes[value] for value in values], dtype=np.int64)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"y contains previously unseen labels: {e}")
+
+    def inverse_transform(self, codes):
+        """Map codes back to their original labels"""
+        return self.classes_[np.asarray(codes, dtype=np.int64)]
+
+    def extended(self, values):
+        """
+        Encoder that keeps every existing code and gives labels in values it
+        has not seen the next codes, in sorted order
+        """
+        unseen = sorted(set(values) - set(self._codes))
+        if not unseen:
+            return self
+        return FrozenLabelEncoder(list(self.classes_) + unseen)
+
+
+class ModelArtifact:
+    """A compiled model loaded from disk; the matrices are read-only memory maps"""
+
+    def __init__(self, path, manifest, X, y_encoded, engine):
+        self.path = path
+        self.manifest = manifest
+        self.X = X
+        self.y_encoded = y_encoded
+        self.engine = engine
+        # FeatureVectorizer and ResultCache, attached by recommendation.load_model
+        self.vectorizer = None
+        self.cache = None
+        self.input_columns = list(manifest['input_columns'])
+        self.le_target = FrozenLabelEncoder(manifest['target_classes'])
+        self.label_encoders = {
+            col: FrozenLabelEncoder(classes)
+            for col, classes in manifest['label_encoders'].items()
+        }
+
+    @property
+    def source_hash(self):
+        return self.manifest['source_hash']
+
+    @property
+    def n_rows(self):
+        return int(self.X.shape[0])
+
+
+def _to_json_value(value):
+    """Convert a numpy scalar / NaN vocabulary entry into something JSON can store"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def default_artifact_root(dataset_path):
+    """Artifacts live next to the dataset unless RECOMMENDATION_ARTIFACT_DIR is set"""
+    env_root = os.environ.get(ARTIFACT_DIR_ENV)
+    if env_root:
+        return os.path.abspath(env_root)
+    return os.path.join(os.path.dirname(os.path.abspath(dataset_path)), 'model_artifacts')
+
+
+def hash_file(path):
+    """SHA-256 of a file's content, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, data):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def resolve_source_hash(dataset_path, artifact_root):
+    """
+    Content hash of the dataset. The hash is cached against (size, mtime) so
+    the CSV is only re-read when it has actually been touched.
+    """
+    dataset_path = os.path.abspath(dataset_path)
+    stat = os.stat(dataset_path)
+    stat_path = os.path.join(artifact_root, SOURCE_STAT_FILE)
+
+    try:
+        with open(stat_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if (cached.get('path') == dataset_path and cached.get('size') == stat.st_size
+                and cached.get('mtime_ns') == stat.st_mtime_ns):
+            return cached['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    source_hash = hash_file(dataset_path)
+    try:
+        os.makedirs(artifact_root, exist_ok=True)
+        _write_json_atomic(stat_path, {
+            'path': dataset_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': source_hash,
+        })
+    except OSError:
+        # A read-only artifact directory only costs us the hash cache
+        pass
+    return source_hash
+
+
+@contextlib.contextmanager
+def build_lock(artifact_root):
+    """
+    Exclusive lock on the artifact directory while a model is compiled, so
+    that worker processes noticing the same dataset change build it once:
+    the others wait here and then open the published copy.
+    """
+    os.makedirs(artifact_root, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): concurrent builds are still safe, just repeated
+        yield
+        return
+    with open(os.path.join(artifact_root, BUILD_LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def artifact_path(artifact_root, source_hash):
+    return os.path.join(artifact_root, source_hash[:16])
+
+
+def write_artifact(artifact_root, source_hash, dataset_path, X_encoded, y_encoded,
+                   le_target, label_encoders, input_columns, ann_lists=None):
+    """
+    Write a compiled artifact and publish it atomically under its source hash.
+    ann_lists sets the IVF list count (default: about sqrt of the unique rows).
+    """
+    os.makedirs(artifact_root, exist_ok=True)
+    final_path = artifact_path(artifact_root, source_hash)
+    tmp_path = tempfile.mkdtemp(dir=artifact_root, prefix='.build-')
+
+    try:
+        X = np.ascontiguousarray(np.asarray(X_encoded, dtype=np.float64))
+        if not np.isfinite(X).all():
+            raise ValueError("Encoded feature matrix contains NaN or infinity")
+        y = np.ascontiguousarray(np.asarray(y_encoded, dtype=np.int64))
+
+        np.save(os.path.join(tmp_path, FEATURES_FILE), X)
+        np.save(os.path.join(tmp_path, TARGETS_FILE), y)
+
+        # Scoring structures cover unique (row, role) pairs only, stored in
+        # IVF list order so every list is one contiguous slice
+        unique_index, groups = dedupe_rows(X, y)
+        order, ivf = build_ivf(l2_normalize_rows(X[unique_index], dtype=np.float32), ann_lists)
+        unique_index, groups = unique_index[order], groups.take(order)
+        X_unique = X[unique_index]
+        np.save(os.path.join(tmp_path, UNIQUE_FEATURES_FILE), X_unique)
+        np.save(os.path.join(tmp_path, GROUP_OFFSETS_FILE), groups.offsets)
+        np.save(os.path.join(tmp_path, GROUP_MEMBERS_FILE), groups.members)
+        np.save(os.path.join(tmp_path, NORMALIZED_FILE), l2_normalize_rows(X_unique, dtype=np.float32))
+        codes, scales = quantize_columns(l2_normalize_rows(X_unique))
+        np.save(os.path.join(tmp_path, QUANTIZED_FILE), codes)
+        np.save(os.path.join(tmp_path, QUANTIZED_SCALES_FILE), scales)
+        np.save(os.path.join(tmp_path, ANN_CENTROIDS_FILE), ivf.centroids)
+        np.save(os.path.join(tmp_path, ANN_OFFSETS_FILE), ivf.offsets)
+
+        binary_columns, dense_columns = split_binary_columns(X_unique, input_columns)
+        data, indices, indptr, dense = sparse_components(X_unique, binary_columns, dense_columns)
+        np.save(os.path.join(tmp_path, SPARSE_DATA_FILE), data)
+        np.save(os.path.join(tmp_path, SPARSE_INDICES_FILE), indices)
+        np.save(os.path.join(tmp_path, SPARSE_INDPTR_FILE), indptr)
+        np.save(os.path.join(tmp_path, SPARSE_DENSE_FILE), dense)
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'source_hash': source_hash,
+            'source_path': os.path.abspath(dataset_path),
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'n_rows': int(X.shape[0]),
+            'n_unique_rows': int(X_unique.shape[0]),
+            'compression_ratio': round(X.shape[0] / max(1, X_unique.shape[0]), 3),
+            'input_columns': list(input_columns),
+            'binary_columns': binary_columns.tolist(),
+            'dense_columns': dense_columns.tolist(),
+            'ann': {'type': 'ivf', 'n_lists': ivf.n_lists},
+            'target_classes': [_to_json_value(c) for c in le_target.classes_],
+            'label_encoders': {
+                col: [_to_json_value(c) for c in le.classes_]
+                for col, le in label_encoders.items()
+            },
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        if os.path.isdir(final_path):
+            # Stale or concurrently built copy: replace it
+            shutil.rmtree(final_path, ignore_errors=True)
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another process published the same hash first; theirs is equivalent
+            if not os.path.isdir(final_path):
+                raise
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return final_path
+
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def load_artifact(path, backend='dense'):
+    """Open a compiled artifact; the matrices are memory-mapped read-only"""
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    def load(name, n_rows=None):
+        # Files can hold rows of an append that has not been committed to the manifest yet
+        return np.load(os.path.join(path, name), mmap_mode='r')[:n_rows]
+
+    n_rows, n_unique = manifest['n_rows'], manifest['n_unique_rows']
+    X = load(FEATURES_FILE, n_rows)
+    y_encoded = load(TARGETS_FILE, n_rows)
+    X_unique = load(UNIQUE_FEATURES_FILE, n_unique)
+    groups = RowGroups(load(GROUP_OFFSETS_FILE, n_unique + 1), load(GROUP_MEMBERS_FILE, n_rows))
+
+    if backend == 'dense':
+        engine = ScoringEngine(load(NORMALIZED_FILE, n_unique), X_unique, groups)
+    elif backend == 'sparse':
+        indptr = load(SPARSE_INDPTR_FILE, n_unique + 1)
+        engine = SparseScoringEngine(
+            load(SPARSE_DATA_FILE, int(indptr[-1])), load(SPARSE_INDICES_FILE, int(indptr[-1])), indptr,
+            load(SPARSE_DENSE_FILE, n_unique), np.array(manifest['binary_columns'], dtype=np.int64),
+            np.array(manifest['dense_columns'], dtype=np.int64), X_unique, groups
+        )
+    elif backend == 'stream':
+        engine = StreamingScoringEngine(NpyRowBlocks(os.path.join(path, NORMALIZED_FILE), n_unique), X_unique,
+                                        groups)
+    elif backend == 'quantized':
+        engine = QuantizedScoringEngine(load(QUANTIZED_FILE, n_unique), load(QUANTIZED_SCALES_FILE), X_unique, groups)
+    else:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    engine.ann = IVFIndex(load(ANN_CENTROIDS_FILE), load(ANN_OFFSETS_FILE))
+    engine.roles = RoleIndex.for_engine(engine, y_encoded, manifest['target_classes'])
+
+    return ModelArtifact(path, manifest, X, y_encoded, engine)
+
+
+def find_artifact(artifact_root, source_hash, backend='dense'):
+    """Return the artifact compiled from source_hash, or None if it is missing or unusable"""
+    path = artifact_path(artifact_root, source_hash)
+    if not os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+        return None
+    try:
+        artifact = load_artifact(path, backend)
+    except (OSError, ValueError, KeyError):
+        return None
+    if artifact.source_hash != source_hash:
+        return None
+    return artifact
+
+
+def previous_encoders(artifact_root):
+    """
+    (le_target, label_encoders) of the most recently written artifact under
+    artifact_root, or (None, None). Rebuilds start from these so existing
+    category codes keep their values.
+    """
+    manifests = []
+    if os.path.isdir(artifact_root):
+        for name in os.listdir(artifact_root):
+            manifest_path = os.path.join(artifact_root, name, MANIFEST_FILE)
+            if not name.startswith('.') and os.path.isfile(manifest_path):
+                manifests.append((os.path.getmtime(manifest_path), manifest_path))
+
+    for _, manifest_path in sorted(manifests, reverse=True):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return (FrozenLabelEncoder(manifest['target_classes']),
+                    {col: FrozenLabelEncoder(classes) for col, classes in manifest['label_encoders'].items()})
+        except (OSError, ValueError, KeyError):
+            continue
+    return None, None
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    return version, shape, fortran_order, dtype
+
+
+def _append_npy(path, rows, n_existing):
+    """
+    Write rows after the first n_existing rows of the .npy array at path
+    (anything beyond them is left over from an interrupted append) and grow
+    the shape in its header. Committed bytes are never rewritten, so
+    processes with the file memory-mapped are unaffected.
+    """
+    with open(path, 'r+b') as f:
+        version, shape, fortran_order, dtype = _read_npy_header(f)
+        data_offset = f.tell()
+        rows = np.ascontiguousarray(rows, dtype=dtype)
+        if fortran_order or tuple(shape[1:]) != rows.shape[1:] or n_existing > shape[0]:
+            raise ValueError(f"Cannot append {rows.shape} rows to {path} with shape {shape}")
+
+        new_shape = (n_existing + rows.shape[0],) + tuple(shape[1:])
+        prefix_bytes = 10 if version == (1, 0) else 12
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+            np.lib.format.dtype_to_descr(dtype), new_shape)
+        header_bytes = data_offset - prefix_bytes
+        if len(header) + 1 <= header_bytes:
+            f.truncate(data_offset + n_existing * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+            f.seek(0, os.SEEK_END)
+            f.write(rows.tobytes())
+            f.flush()
+            f.seek(prefix_bytes)
+            f.write((header + ' ' * (header_bytes - len(header) - 1) + '\n').encode('latin1'))
+            return
+
+    # No room left in the header: write a new file and swap it in; readers keep the old inode
+    existing = np.load(path, mmap_mode='r')[:n_existing]
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.npy')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.concatenate([existing, rows]))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def append_to_artifact(artifact, source_hash, X_new, y_new, le_target, label_encoders):
+    """
+    Extend a compiled artifact with encoded rows, renaming it to the new
+    source hash. Existing rows are not re-encoded, renormalized or moved:
+    only the new rows are deduplicated, normalized and written after them,
+    and the vocabularies are replaced by the extended encoders. Returns the
+    artifact's new path.
+    """
+    path = artifact.path
+    manifest = dict(artifact.manifest)
+    n_rows, n_unique = manifest['n_rows'], manifest['n_unique_rows']
+    X_new = np.ascontiguousarray(np.asarray(X_new, dtype=np.float64))
+    y_new = np.ascontiguousarray(np.asarray(y_new, dtype=np.int64))
+    if X_new.shape[1] != len(manifest['input_columns']):
+        raise ValueError(f"Expected {len(manifest['input_columns'])} columns, got {X_new.shape[1]}")
+    if not np.isfinite(X_new).all():
+        raise ValueError("Encoded feature matrix contains NaN or infinity")
+
+    binary_columns = np.array(manifest['binary_columns'], dtype=np.int64)
+    dense_columns = np.array(manifest['dense_columns'], dtype=np.int64)
+    unique_index, groups = dedupe_rows(X_new, y_new)
+    X_unique = X_new[unique_index]
+    try:
+        if not np.isin(X_new[:, binary_columns], (0.0, 1.0)).all():
+            raise ValueError("A sparse column has a value other than 0 or 1")
+        codes, _ = quantize_columns(l2_normalize_rows(X_unique),
+                                    np.load(os.path.join(path, QUANTIZED_SCALES_FILE)))
+    except ValueError:
+        # The column split or quantization scales no longer fit: rebuild from the arrays instead
+        return compact_artifact(artifact, source_hash, np.concatenate([artifact.X, X_new]),
+                                np.concatenate([artifact.y_encoded, y_new]), le_target, label_encoders)
+    data, indices, indptr, dense = sparse_components(X_unique, binary_columns, dense_columns)
+    nnz = int(np.load(os.path.join(path, SPARSE_INDPTR_FILE), mmap_mode='r')[n_unique])
+
+    def append(name, rows, n_existing):
+        _append_npy(os.path.join(path, name), rows, n_existing)
+
+    append(FEATURES_FILE, X_new, n_rows)
+    append(TARGETS_FILE, y_new, n_rows)
+    append(UNIQUE_FEATURES_FILE, X_unique, n_unique)
+    append(GROUP_OFFSETS_FILE, groups.offsets[1:] + n_rows, n_unique + 1)
+    append(GROUP_MEMBERS_FILE, groups.members + n_rows, n_rows)
+    append(NORMALIZED_FILE, l2_normalize_rows(X_unique, dtype=np.float32), n_unique)
+    append(SPARSE_DATA_FILE, data, nnz)
+    append(SPARSE_INDICES_FILE, indices, nnz)
+    append(SPARSE_INDPTR_FILE, indptr[1:] + nnz, n_unique + 1)
+    append(SPARSE_DENSE_FILE, dense, n_unique)
+    append(QUANTIZED_FILE, codes, n_unique)
+
+    manifest.update({
+        'source_hash': source_hash,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+        'n_rows': n_rows + X_new.shape[0],
+        'n_unique_rows': n_unique + X_unique.shape[0],
+        'compression_ratio': round((n_rows + X_new.shape[0]) / max(1, n_unique + X_unique.shape[0]), 3),
+        'appended_rows': manifest.get('appended_rows', 0) + X_new.shape[0],
+        'target_classes': [_to_json_value(c) for c in le_target.classes_],
+        'label_encoders': {col: [_to_json_value(c) for c in le.classes_] for col, le in label_encoders.items()},
+    })
+    # The manifest is the commit point
+    _write_json_atomic(os.path.join(path, MANIFEST_FILE), manifest)
+
+    artifact_root = os.path.dirname(path)
+    final_path = artifact_path(artifact_root, source_hash)
+    if final_path != path:
+        if os.path.isdir(final_path):
+            shutil.rmtree(final_path, ignore_errors=True)
+        os.rename(path, final_path)
+    return final_path
+
+
+def compact_artifact(artifact, source_hash=None, X=None, y_encoded=None, le_target=None, label_encoders=None,
+                     ann_lists=None):
+    """
+    Rewrite an artifact from its own encoded arrays (no CSV parsing or
+    re-encoding): appended rows are deduplicated against the rest and
+    clustered into the IVF lists again. Returns the new path.
+    """
+    manifest = artifact.manifest
+    source_hash = source_hash or artifact.source_hash
+    path = write_artifact(
+        os.path.dirname(artifact.path), source_hash, manifest['source_path'],
+        artifact.X if X is None else X, artifact.y_encoded if y_encoded is None else y_encoded,
+        le_target or artifact.le_target, label_encoders or artifact.label_encoders,
+        manifest['input_columns'], ann_lists)
+    if os.path.abspath(artifact.path) != os.path.abspath(path):
+        shutil.rmtree(artifact.path, ignore_errors=True)
+    return path
+
+
+def prune_artifacts(artifact_root, keep_path):
+    """
+    Remove artifacts compiled from older versions of the dataset. Processes
+    still serving an old artifact keep working: their memory maps and open
+    files outlive the directory entries.
+    """
+    keep_path = os.path.abspath(keep_path)
+    for name in os.listdir(artifact_root):
+        path = os.path.abspath(os.path.join(artifact_root, name))
+        if path != keep_path and os.path.isdir(path) and not name.startswith('.'):
+            shutil.rmtree(path, ignore_errors=True)
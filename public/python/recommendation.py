@@ -6,58 +6,135 @@ Compatible with the exact same logic as Jupyter notebook
 """
 import sys
 import json
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.model_selection import train_test_split
 import os
 import argparse
 import warnings
+import time
 import traceback
 from datetime import datetime
 
+import model_artifact
+import evaluation
+from scoring import ScoringEngine, RoleIndex, BACKENDS, SIMILARITY_CHUNK_BYTES, l2_normalize_rows
+from feature_vectorizer import FeatureVectorizer, encode_input_features
+from result_cache import ResultCache, cache_key
+from instrumentation import StageTimer, NULL_TIMER, Profiler
+
 # Suppress sklearn warnings for cleaner output
 warnings.filterwarnings('ignore')
 
-def log_info(message, data=None):
-    """Log information for debugging"""
+# Batch mode: users scored per similarity pass
+BATCH_SIZE = 1024
+
+# Decimal places of the similarity scores returned with each recommended role
+SCORE_DECIMALS = 4
+
+# Scoring backend: 'dense' float32 matrix or 'sparse' CSR binary block + small dense block
+DEFAULT_BACKEND = os.environ.get('RECOMMENDATION_BACKEND', 'dense')
+
+# IVF lists scanned per query; 0 scans every row (exact results)
+DEFAULT_ANN_PROBES = int(os.environ.get('RECOMMENDATION_ANN_PROBES', '0'))
+
+# Scoring threads per process; batches are split by query, large single queries by row
+DEFAULT_WORKERS = int(os.environ.get('RECOMMENDATION_WORKERS', '1'))
+
+# serve: worker processes forked behind one listening socket
+DEFAULT_PROCESSES = int(os.environ.get('RECOMMENDATION_PROCESSES', '1'))
+
+# append: compact the artifact once appended rows exceed this fraction of the dataset
+DEFAULT_COMPACT_RATIO = float(os.environ.get('RECOMMENDATION_COMPACT_RATIO', '0.1'))
+
+# Result cache: in-memory entries, entry lifetime in seconds, optional shared SQLite file
+DEFAULT_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '4096'))
+DEFAULT_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', '3600'))
+DEFAULT_CACHE_DB = os.environ.get('RECOMMENDATION_CACHE_DB') or None
+# Part of every cache key; bump it when the cached value changes shape so shared
+# SQLite caches never hand an older format back (v2: [roles, scores] pairs)
+CACHE_VALUE_FORMAT = 'roles-v2'
+
+# Job insights (--jobs): upstream search API root, seconds per lookup, lookups in flight,
+# listings kept per role and seconds a (country, role) result stays cached
+DEFAULT_JOBS_URL = os.environ.get('RECOMMENDATION_JOBS_URL', 'https://api.adzuna.com/v1/api/jobs')
+DEFAULT_JOBS_TIMEOUT = float(os.environ.get('RECOMMENDATION_JOBS_TIMEOUT', '5'))
+DEFAULT_JOBS_CONNECTIONS = int(os.environ.get('RECOMMENDATION_JOBS_CONNECTIONS', '4'))
+DEFAULT_JOBS_PER_ROLE = int(os.environ.get('RECOMMENDATION_JOBS_PER_ROLE', '5'))
+DEFAULT_JOBS_CACHE_TTL = int(os.environ.get('RECOMMENDATION_JOBS_CACHE_TTL', '3600'))
+
+# Only needed to build the artifact; the request path must not import them
+TRAINING_ONLY_MODULES = ('pandas', 'sklearn', 'scipy')
+STARTUP_REPORT_TOP_MODULES = 15
+
+# stderr log verbosity; 'info' and above never print user payloads
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_LEVEL = LOG_LEVELS.get(os.environ.get('RECOMMENDATION_LOG_LEVEL', 'info').lower(), LOG_LEVELS['info'])
+
+def set_log_level(level):
+    """Only log messages at or above level ('debug', 'info', 'warning', 'error')"""
+    global LOG_LEVEL
+    if level.lower() not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level: {level}")
+    LOG_LEVEL = LOG_LEVELS[level.lower()]
+
+def log_enabled(level):
+    return LOG_LEVELS[level] >= LOG_LEVEL
+
+def log_message(level, message, data=None):
+    """Log to stderr (stdout carries the JSON result) if level is enabled"""
+    if LOG_LEVELS[level] < LOG_LEVEL:
+        return
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     if data:
-        print(f"[{timestamp}] INFO: {message} - {data}", file=sys.stderr)
+        print(f"[{timestamp}] {level.upper()}: {message} - {data}", file=sys.stderr)
     else:
-        print(f"[{timestamp}] INFO: {message}", file=sys.stderr)
+        print(f"[{timestamp}] {level.upper()}: {message}", file=sys.stderr)
+
+def log_debug(message, data=None):
+    """Per-request detail, including user payloads; off unless the level is debug"""
+    log_message('debug', message, data)
 
-def load_dataset():
+def log_info(message, data=None):
+    """Log information for debugging"""
+    log_message('info', message, data)
+
+def log_error(message, data=None):
+    log_message('error', message, data)
+
+def find_dataset_path():
+    """Locate df_upsampled.csv with comprehensive path search"""
+    # Get the directory where this script is located
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Try multiple possible locations for the dataset
+    possible_paths = [
+        os.path.join(script_dir, 'df_upsampled.csv'),
+        os.path.join(os.path.dirname(script_dir), 'df_upsampled.csv'),
+        os.path.join(script_dir, '..', 'df_upsampled.csv'),
+        os.path.join(script_dir, '..', '..', 'df_upsampled.csv'),
+        'df_upsampled.csv',
+        '../df_upsampled.csv',
+        '../../df_upsampled.csv',
+        os.path.expanduser('~/df_upsampled.csv'),
+    ]
+
+    for path in possible_paths:
+        abs_path = os.path.abspath(path)
+        if os.path.exists(abs_path) and os.path.getsize(abs_path) > 1000:  # At least 1KB
+            return abs_path
+
+    raise FileNotFoundError(f"Dataset not found in any of these locations: {possible_paths}")
+
+def load_dataset(dataset_path=None):
     """Load the upsampled dataset with comprehensive path search"""
     try:
-        # Get the directory where this script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Try multiple possible locations for the dataset
-        possible_paths = [
-            os.path.join(script_dir, 'df_upsampled.csv'),
-            os.path.join(os.path.dirname(script_dir), 'df_upsampled.csv'),
-            os.path.join(script_dir, '..', 'df_upsampled.csv'),
-            os.path.join(script_dir, '..', '..', 'df_upsampled.csv'),
-            'df_upsampled.csv',
-            '../df_upsampled.csv',
-            '../../df_upsampled.csv',
-            os.path.expanduser('~/df_upsampled.csv'),
-        ]
-
-        dataset_path = None
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path) and os.path.getsize(abs_path) > 1000:  # At least 1KB
-                dataset_path = abs_path
-                break
-
         if dataset_path is None:
-            raise FileNotFoundError(f"Dataset not found in any of these locations: {possible_paths}")
+            dataset_path = find_dataset_path()
 
         log_info(f"Loading dataset from: {dataset_path}")
 
+        # pandas is only needed to (re)build the artifact, so keep it off the request path
+        import pandas as pd
+
         # Load dataset with error handling
         df_upsampled = pd.read_csv(dataset_path)
 
@@ -78,9 +155,15 @@ def load_dataset():
     except Exception as e:
         raise Exception(f"Failed to load dataset: {str(e)}")
 
-def prepare_model_data(df_upsampled):
-    """Prepare data exactly as in the Jupyter notebook"""
+def prepare_model_data(df_upsampled, label_encoders=None, le_target=None):
+    """
+    Prepare data exactly as in the Jupyter notebook. Given the encoders of
+    an earlier build, labels they know keep their codes and only unseen
+    labels get new ones, instead of every column being refit.
+    """
     try:
+        from sklearn.preprocessing import LabelEncoder
+
         log_info("Preparing model data (same as Jupyter notebook)")
 
         # Same as notebook: exclude response_id and current_role from input columns
@@ -89,38 +172,44 @@ def prepare_model_data(df_upsampled):
 
         log_info(f"Input columns: {len(input_columns)}, Target: {target_column}")
 
-        # Prepare the data
-        X = df_upsampled[input_columns].copy()
-        y = df_upsampled[target_column].copy()
+        # Prepare the data; categorical columns are encoded in place of this one copy
+        X_encoded = df_upsampled[input_columns].copy()
+        y = df_upsampled[target_column]
 
         # Encode the target variable
-        le_target = LabelEncoder()
-        y_encoded = le_target.fit_transform(y)
+        if le_target is None:
+            le_target = LabelEncoder()
+            y_encoded = le_target.fit_transform(y)
+        else:
+            le_target = le_target.extended(y)
+            y_encoded = le_target.transform(y)
 
         log_info(f"Target classes: {len(le_target.classes_)}")
 
         # Encode categorical input features (same as notebook)
+        previous_encoders = label_encoders or {}
         label_encoders = {}
-        X_encoded = X.copy()
 
-        categorical_columns = X.select_dtypes(include=['object']).columns
+        categorical_columns = X_encoded.select_dtypes(include=['object']).columns
         log_info(f"Categorical columns to encode: {len(categorical_columns)}")
 
         for col in categorical_columns:
-            le = LabelEncoder()
-            X_encoded[col] = le.fit_transform(X[col])
+            if col in previous_encoders:
+                le = previous_encoders[col].extended(X_encoded[col])
+                X_encoded[col] = le.transform(X_encoded[col])
+            else:
+                le = LabelEncoder()
+                X_encoded[col] = le.fit_transform(X_encoded[col])
             label_encoders[col] = le
 
-        # Split the data (same as notebook)
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_encoded, y_encoded, test_size=0.2, random_state=42
-        )
+        # The notebook's train/test split; only the evaluate command needs the rows themselves
+        train_size, test_size = evaluation.split_sizes(len(y_encoded))
 
         log_info("Model data preparation completed", {
             'X_shape': X_encoded.shape,
             'y_shape': y_encoded.shape,
-            'train_size': X_train.shape[0],
-            'test_size': X_test.shape[0]
+            'train_size': train_size,
+            'test_size': test_size
         })
 
         return X_encoded, y_encoded, le_target, label_encoders, input_columns
@@ -128,6 +217,217 @@ def prepare_model_data(df_upsampled):
     except Exception as e:
         raise Exception(f"Failed to prepare model data: {str(e)}")
 
+def build_model_artifact(dataset_path=None, artifact_root=None, source_hash=None, backend=DEFAULT_BACKEND,
+                         ann_lists=None):
+    """Compile the dataset into an on-disk artifact keyed by its content hash"""
+    try:
+        if dataset_path is None:
+            dataset_path = find_dataset_path()
+        if artifact_root is None:
+            artifact_root = model_artifact.default_artifact_root(dataset_path)
+        if source_hash is None:
+            source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+
+        log_info(f"Building model artifact for dataset hash {source_hash[:16]}")
+
+        df_upsampled = load_dataset(dataset_path)
+        # Keep the category codes of the artifact being replaced
+        previous_target, previous_encoders = model_artifact.previous_encoders(artifact_root)
+        X_encoded, y_encoded, le_target, label_encoders, input_columns = prepare_model_data(
+            df_upsampled, previous_encoders, previous_target)
+
+        path = model_artifact.write_artifact(
+            artifact_root, source_hash, dataset_path, X_encoded.values, y_encoded,
+            le_target, label_encoders, input_columns, ann_lists
+        )
+        model_artifact.prune_artifacts(artifact_root, path)
+
+        artifact = model_artifact.load_artifact(path, backend)
+        log_info("Model artifact built", {
+            'path': path,
+            'rows': artifact.n_rows,
+            'unique_rows': artifact.manifest['n_unique_rows'],
+            'compression_ratio': artifact.manifest['compression_ratio'],
+            'ann_lists': artifact.manifest['ann']['n_lists']
+        })
+        return artifact
+
+    except Exception as e:
+        raise Exception(f"Failed to build model artifact: {str(e)}")
+
+def load_model(dataset_path=None, artifact_root=None, backend=DEFAULT_BACKEND, ann_probes=DEFAULT_ANN_PROBES,
+               cache=None, workers=DEFAULT_WORKERS):
+    """
+    Load the compiled model artifact, rebuilding it when the dataset has changed.
+    ann_probes > 0 restricts scoring to that many IVF lists per query.
+    workers is the number of scoring threads (results do not depend on it).
+    cache is the ResultCache to answer from (default: one built from the
+    RECOMMENDATION_CACHE_* settings); pass the same one across reloads to keep it.
+    """
+    try:
+        if dataset_path is None:
+            dataset_path = find_dataset_path()
+        if artifact_root is None:
+            artifact_root = model_artifact.default_artifact_root(dataset_path)
+
+        source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+        artifact = model_artifact.find_artifact(artifact_root, source_hash, backend)
+
+        if artifact is None:
+            with model_artifact.build_lock(artifact_root):
+                # Another process may have built it (or appended to the dataset) while we waited
+                source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+                artifact = model_artifact.find_artifact(artifact_root, source_hash, backend)
+                if artifact is None:
+                    log_info("No compiled model for current dataset, rebuilding")
+                    artifact = build_model_artifact(dataset_path, artifact_root, source_hash, backend)
+                else:
+                    log_info(f"Loaded compiled model built by another process: {artifact.path}")
+        else:
+            log_info(f"Loaded compiled model from: {artifact.path}")
+
+        artifact.engine.ann_probes = ann_probes
+        artifact.engine.workers = max(1, workers)
+        if cache is None:
+            cache = ResultCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, DEFAULT_CACHE_DB)
+        artifact.cache = cache
+
+        artifact.vectorizer = FeatureVectorizer(
+            create_input_features_template(), INTEREST_MAPPING, artifact.label_encoders, artifact.input_columns
+        )
+        return artifact
+
+    except Exception as e:
+        raise Exception(f"Failed to load model: {str(e)}")
+
+def read_survey_responses(rows_path, dataset_columns, categorical_columns):
+    """
+    New survey responses from a CSV file with the dataset's header, or from
+    JSONL ("-" for stdin) with one response object per line, checked and put
+    in dataset column order. response_id may be left out.
+    """
+    import pandas as pd
+
+    if rows_path == '-' or rows_path.endswith(('.jsonl', '.json')):
+        stream = sys.stdin if rows_path == '-' else open(rows_path, 'r', encoding='utf-8')
+        try:
+            records = [json.loads(line) for line in stream if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {rows_path}: {str(e)}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        rows = pd.DataFrame.from_records(records)
+    else:
+        rows = pd.read_csv(rows_path)
+
+    if rows.empty:
+        raise ValueError("No survey responses to append")
+    if 'response_id' in dataset_columns and 'response_id' not in rows.columns:
+        rows['response_id'] = None
+    missing = [col for col in dataset_columns if col not in rows.columns]
+    unknown = [col for col in rows.columns if col not in dataset_columns]
+    if missing or unknown:
+        raise ValueError(f"Columns do not match the dataset (missing: {missing}, unknown: {unknown})")
+
+    rows = rows[list(dataset_columns)].copy()
+    for col in dataset_columns:
+        if col == 'response_id':
+            continue
+        if rows[col].isna().any():
+            raise ValueError(f"Missing values in column: {col}")
+        if col in categorical_columns or col == 'current_role':
+            rows[col] = rows[col].astype(str)
+        else:
+            try:
+                rows[col] = pd.to_numeric(rows[col])
+            except (TypeError, ValueError):
+                raise ValueError(f"Non-numeric values in column: {col}")
+            if rows[col].dtype == bool:
+                rows[col] = rows[col].astype(np.int64)
+    return rows
+
+def append_survey_responses(rows_path, dataset_path=None, artifact_root=None, compact_ratio=DEFAULT_COMPACT_RATIO):
+    """
+    Append new survey responses to the dataset CSV and extend its compiled
+    artifact in place. Only the new rows are encoded: existing category codes
+    stay as they are and unseen categories get the next free codes. The
+    artifact is compacted once appended rows exceed compact_ratio of the
+    dataset (None never compacts).
+    """
+    try:
+        if dataset_path is None:
+            dataset_path = find_dataset_path()
+        if artifact_root is None:
+            artifact_root = model_artifact.default_artifact_root(dataset_path)
+
+        import pandas as pd
+
+        with model_artifact.build_lock(artifact_root):
+            source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+            artifact = model_artifact.find_artifact(artifact_root, source_hash)
+            if artifact is None:
+                log_info("No compiled model for current dataset, rebuilding before append")
+                artifact = build_model_artifact(dataset_path, artifact_root, source_hash)
+
+            dataset_columns = list(pd.read_csv(dataset_path, nrows=0).columns)
+            rows = read_survey_responses(rows_path, dataset_columns, artifact.label_encoders)
+
+            le_target = artifact.le_target.extended(rows['current_role'])
+            label_encoders = {col: le.extended(rows[col]) for col, le in artifact.label_encoders.items()}
+            X_new = np.column_stack([
+                label_encoders[col].transform(rows[col]) if col in label_encoders else rows[col].to_numpy()
+                for col in artifact.input_columns
+            ]).astype(np.float64)
+            y_new = le_target.transform(rows['current_role'])
+            summary = {
+                "appended_rows": len(rows),
+                "new_roles": le_target.classes_[len(artifact.le_target.classes_):].tolist(),
+                "new_categories": {col: le.classes_[len(artifact.label_encoders[col].classes_):].tolist()
+                                   for col, le in label_encoders.items()
+                                   if len(le.classes_) > len(artifact.label_encoders[col].classes_)}
+            }
+
+            # The CSV stays the source of truth: a later full rebuild sees the same rows
+            with open(dataset_path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+            rows.to_csv(dataset_path, mode='a', header=False, index=False)
+            new_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+
+            path = model_artifact.append_to_artifact(artifact, new_hash, X_new, y_new, le_target, label_encoders)
+            artifact = model_artifact.load_artifact(path)
+            # append_to_artifact compacts by itself when the new rows do not fit the stored layout
+            pending = artifact.manifest.get('appended_rows', 0)
+            if pending and compact_ratio is not None and pending > compact_ratio * artifact.n_rows:
+                log_info("Appended rows exceed the compaction threshold, compacting")
+                artifact = model_artifact.load_artifact(model_artifact.compact_artifact(artifact))
+                pending = 0
+            summary["compacted"] = pending == 0
+
+        log_info("Survey responses appended", dict(summary, path=artifact.path))
+        return artifact, summary
+
+    except Exception as e:
+        raise Exception(f"Failed to append survey responses: {str(e)}")
+
+# Common interest names mapped to the technical skills they imply
+INTEREST_MAPPING = {
+    'Web': ['HTML/CSS', 'JavaScript', 'React'],
+    'AI': ['Python', 'TensorFlow', 'PyTorch'],
+    'Full Stack': ['JavaScript', 'React', 'Node.js'],
+    'Mobile': ['React Native', 'Flutter'],
+    'Cloud': ['AWS', 'Google Cloud', 'Microsoft Azure'],
+    'Data Science': ['Python', 'Pandas', 'NumPy'],
+    'Backend Development': ['Python', 'Java', 'Node.js'],
+    'Frontend Development': ['JavaScript', 'React', 'Vue.js'],
+    'DevOps': ['Docker', 'Kubernetes'],
+    'Database': ['SQL', 'MySQL', 'PostgreSQL']
+}
+
 def create_input_features_template():
     """Create template with all possible input features (same structure as notebook)"""
 
@@ -247,7 +547,7 @@ def create_input_features_template():
 def update_input_features_from_user_data(input_features, user_data):
     """Update the template with user-provided data"""
     try:
-        log_info("Updating input features with user data")
+        log_debug("Updating input features with user data")
 
         # Update basic profile information
         if 'main_branch' in user_data:
@@ -281,21 +581,8 @@ def update_input_features_from_user_data(input_features, user_data):
         interests_mapped = 0
         for interest in interests:
             # Map common interest names to technical skills
-            interest_mapping = {
-                'Web': ['HTML/CSS', 'JavaScript', 'React'],
-                'AI': ['Python', 'TensorFlow', 'PyTorch'],
-                'Full Stack': ['JavaScript', 'React', 'Node.js'],
-                'Mobile': ['React Native', 'Flutter'],
-                'Cloud': ['AWS', 'Google Cloud', 'Microsoft Azure'],
-                'Data Science': ['Python', 'Pandas', 'NumPy'],
-                'Backend Development': ['Python', 'Java', 'Node.js'],
-                'Frontend Development': ['JavaScript', 'React', 'Vue.js'],
-                'DevOps': ['Docker', 'Kubernetes'],
-                'Database': ['SQL', 'MySQL', 'PostgreSQL']
-            }
-
-            if interest in interest_mapping:
-                for mapped_skill in interest_mapping[interest]:
+            if interest in INTEREST_MAPPING:
+                for mapped_skill in INTEREST_MAPPING[interest]:
                     skill_key = f"{mapped_skill}_skill"
                     interest_key = f"{mapped_skill}_interest"
                     if skill_key in input_features:
@@ -310,7 +597,7 @@ def update_input_features_from_user_data(input_features, user_data):
                     input_features[interest_key] = 1
                     interests_mapped += 1
 
-        log_info("Input features updated", {
+        log_debug("Input features updated", {
             'skills_provided': len(skills),
             'skills_mapped': skills_mapped,
             'interests_provided': len(interests),
@@ -320,73 +607,156 @@ def update_input_features_from_user_data(input_features, user_data):
         return input_features
 
     except Exception as e:
-        log_info(f"Error updating input features: {str(e)}")
+        log_error(f"Error updating input features: {str(e)}")
         raise Exception(f"Failed to update input features: {str(e)}")
 
-def recommend_roles(input_features, X, y_encoded, le_target, label_encoders, input_columns, top_n=3):
-    """Same recommendation function as in the Jupyter notebook"""
+def role_scores(engine, role_ids, scores):
+    """Role names and rounded similarities for the response"""
+    return [engine.roles.names[role] for role in role_ids], [round(float(score), SCORE_DECIMALS) for score in scores]
+
+def recommend_roles_batch(feature_matrix, engine, top_n=3, chunk_bytes=SIMILARITY_CHUNK_BYTES):
+    """
+    Recommend roles (and their scores) for N encoded users at once. Similarities
+    are one matrix product per chunk of users, sized so the N x rows block stays
+    under chunk_bytes.
+    """
+    return [role_scores(engine, role_ids, scores)
+            for role_ids, scores in engine.top_k_roles_batch(feature_matrix, top_n, chunk_bytes)]
+
+def _read_batch_blocks(stream, batch_size):
+    """Yield lists of (line_number, line) for non-blank input lines"""
+    block = []
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        block.append((line_number, line))
+        if len(block) >= batch_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+def model_cache_key(model):
+    """Identifies the model, scoring mode and value format a cached result came from"""
+    model_key = f"{model.source_hash}:{CACHE_VALUE_FORMAT}"
+    if model.engine.uses_ann:
+        return f"{model_key}:ivf{model.engine.ann_probes}"
+    return model_key
+
+def _cached_role_lists(feature_matrix, model, top_n):
+    """recommend_roles_batch through the result cache; users with the same row are scored once"""
+    cache = model.cache
+    model_key = model_cache_key(model)
+    keys = [cache_key(row, model_key, top_n) for row in feature_matrix]
+    found = cache.get_many(list(dict.fromkeys(keys)))
+
+    missing = {}
+    for position, key in enumerate(keys):
+        if key not in found and key not in missing:
+            missing[key] = position
+    if missing:
+        role_lists = recommend_roles_batch(feature_matrix[list(missing.values())], model.engine, top_n)
+        scored = dict(zip(missing, role_lists))
+        cache.put_many(scored)
+        found.update(scored)
+
+    # JSON round trips turn the (roles, scores) pairs into lists
+    return [tuple(found[key]) for key in keys]
+
+def run_batch(input_stream, output_stream, model, top_n=3, batch_size=BATCH_SIZE):
+    """Score a JSONL stream of user payloads and write one JSON result line per user"""
+    start_time = time.perf_counter()
+    processed = 0
+    failed = 0
+    use_cache = model.cache is not None and model.cache.enabled
+
+    for block in _read_batch_blocks(input_stream, batch_size):
+        results = [None] * len(block)
+        feature_matrix = np.empty((len(block), model.vectorizer.n_features), dtype=np.float64)
+        positions = []
+
+        for position, (line_number, line) in enumerate(block):
+            try:
+                user_data = json.loads(line)
+                user_data = validate_user_data(user_data)
+                model.vectorizer.vectorize(user_data, out=feature_matrix[len(positions)])
+                positions.append(position)
+                results[position] = {"status": "success", "line": line_number}
+                if 'id' in user_data:
+                    results[position]["id"] = user_data['id']
+            except Exception as e:
+                results[position] = {"status": "error", "line": line_number, "message": str(e)}
+                failed += 1
+
+        if positions and use_cache:
+            role_lists = _cached_role_lists(feature_matrix[:len(positions)], model, top_n)
+        elif positions:
+            role_lists = recommend_roles_batch(feature_matrix[:len(positions)], model.engine, top_n)
+        if positions:
+            for position, (roles, scores) in zip(positions, role_lists):
+                results[position]["recommendations"] = roles
+                results[position]["scores"] = scores
+
+        for result in results:
+            output_stream.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n')
+        output_stream.flush()
+        processed += len(block)
+
+    elapsed = time.perf_counter() - start_time
+    log_info("=== Batch Recommendation Finished ===", {
+        'users': processed,
+        'failed': failed,
+        'elapsed': f"{elapsed:.2f}s",
+        'users_per_second': round(processed / elapsed, 1) if elapsed > 0 else None
+    })
+    return processed, failed
+
+def recommend_roles(input_features, X, y_encoded, le_target, label_encoders, input_columns, top_n=3,
+                    engine=None):
+    """
+    Same recommendation function as in the Jupyter notebook.
+    engine is the model's pre-normalized ScoringEngine; without one it is built from X.
+    Returns (role names, scores).
+    """
     try:
-        log_info("Starting recommendation process (same logic as Jupyter notebook)")
+        log_debug("Starting recommendation process (same logic as Jupyter notebook)")
 
-        # Convert input_features to a DataFrame
-        input_df = pd.DataFrame([input_features], columns=input_columns)
+        # Encode categorical features and fill missing columns with 0, in the model's column order
+        input_vector = encode_input_features(input_features, label_encoders, input_columns)
 
-        # Encode categorical features in the input
-        categorical_cols_processed = 0
-        for col in input_df.select_dtypes(include=['object']).columns:
-            if col in label_encoders:
-                try:
-                    input_df[col] = label_encoders[col].transform(input_df[col])
-                    categorical_cols_processed += 1
-                except ValueError:
-                    # Handle unseen categories in the input features
-                    input_df[col] = input_df[col].apply(lambda x: -1)
-                    categorical_cols_processed += 1
-
-        # Fill missing values with 0 (or another suitable default)
-        input_df = input_df.fillna(0)
-
-        # Ensure the input_df columns match X's columns
-        input_df = input_df.reindex(columns=X.columns, fill_value=0)
-
-        log_info("Input processing completed", {
-            'input_shape': input_df.shape,
-            'categorical_cols_processed': categorical_cols_processed,
-            'features_count': len(X.columns)
-        })
-
-        # Calculate cosine similarity (same as notebook)
-        input_vector = input_df.values
-        similarities = cosine_similarity(input_vector, X).flatten()
+        if engine is None:
+            engine = ScoringEngine.from_matrix(X)
+        if engine.roles is None:
+            engine.roles = RoleIndex.for_engine(engine, y_encoded, le_target.classes_)
 
-        # Get the indices of the top N similar rows
-        top_indices = similarities.argsort()[-top_n*2:][::-1]  # Get more to filter duplicates
+    except Exception as e:
+        log_error(f"Error in recommendation process: {str(e)}")
+        raise Exception(f"Failed to generate recommendations: {str(e)}")
 
-        # Retrieve the most similar roles
-        recommended_roles = le_target.inverse_transform(y_encoded[top_indices])
+    return recommend_roles_for_vector(input_vector, engine, top_n)
 
-        # Remove duplicates while preserving order
-        unique_roles = []
-        seen_roles = set()
+def recommend_roles_for_vector(input_vector, engine, top_n=3, timer=NULL_TIMER):
+    """
+    Top-N distinct roles for one encoded feature row and their scores, each
+    role's cosine similarity to its most similar row
+    """
+    try:
+        # Cosine similarity (same as notebook), reduced to each role's best row
+        role_ids, top_similarities = engine.top_k_roles(input_vector, top_n, timer)
 
-        for role in recommended_roles:
-            role_clean = str(role).strip()
-            if role_clean not in seen_roles and len(role_clean) > 2:
-                unique_roles.append(role_clean)
-                seen_roles.add(role_clean)
-            if len(unique_roles) >= top_n:
-                break
+        with timer.stage('labels'):
+            unique_roles, scores = role_scores(engine, role_ids, top_similarities)
 
-        log_info("Recommendations generated", {
-            'total_candidates': len(recommended_roles),
-            'unique_recommendations': len(unique_roles),
-            'top_similarities': similarities[top_indices[:3]].tolist()
-        })
+        if log_enabled('debug'):
+            log_debug("Recommendations generated", {
+                'unique_recommendations': len(unique_roles),
+                'top_similarities': scores[:3]
+            })
 
-        return unique_roles
+        return unique_roles, scores
 
     except Exception as e:
-        log_info(f"Error in recommendation process: {str(e)}")
+        log_error(f"Error in recommendation process: {str(e)}")
         raise Exception(f"Failed to generate recommendations: {str(e)}")
 
 def validate_user_data(user_data):
@@ -418,8 +788,371 @@ def validate_user_data(user_data):
 
     return user_data
 
+def generate_recommendations(user_data, model, top_n=3, timer=NULL_TIMER):
+    """
+    Full pipeline for one payload: validate, map to features, recommend_roles.
+    Returns (role names, scores). Pass a StageTimer to collect per-stage timings.
+    """
+    with timer.stage('validate'):
+        user_data = validate_user_data(user_data)
+    with timer.stage('vectorize'):
+        input_vector = model.vectorizer.vectorize(user_data)
+
+    cache = model.cache
+    if cache is None or not cache.enabled:
+        return recommend_roles_for_vector(input_vector, model.engine, top_n, timer)
+
+    with timer.stage('cache'):
+        key = cache_key(input_vector, model_cache_key(model), top_n)
+        recommendations = cache.get(key)
+    if recommendations is None:
+        recommendations = recommend_roles_for_vector(input_vector, model.engine, top_n, timer)
+        with timer.stage('cache'):
+            cache.put(key, recommendations)
+    else:
+        log_debug("Recommendations served from cache")
+    return tuple(recommendations)
+
+def get_model_info(model):
+    """Summary of the loaded model for the response's model_info field"""
+    return {
+        "dataset_size": model.n_rows,
+        "unique_rows": model.manifest['n_unique_rows'],
+        "features_count": len(model.input_columns),
+        "target_classes": len(model.le_target.classes_),
+        "backend": model.engine.backend,
+        "ann_probes": model.engine.ann_probes if model.engine.uses_ann else 0,
+        "workers": model.engine.workers,
+        "cache": model.cache.stats() if model.cache is not None else None
+    }
+
+def create_job_insights(base_url=None, cache_db=None):
+    """
+    JobInsightClient from the RECOMMENDATION_JOBS_* settings; credentials come
+    from ADZUNA_APP_ID / ADZUNA_APP_KEY. Results are cached per (country, role)
+    in memory and, with cache_db, in the shared SQLite cache file.
+    """
+    from job_insights import JobInsightClient
+
+    app_id = os.environ.get('ADZUNA_APP_ID')
+    app_key = os.environ.get('ADZUNA_APP_KEY')
+    if not app_id or not app_key:
+        log_message('warning', "ADZUNA_APP_ID / ADZUNA_APP_KEY are not set; job searches will be rejected")
+    return JobInsightClient(base_url or DEFAULT_JOBS_URL, app_id, app_key, DEFAULT_JOBS_TIMEOUT,
+                            DEFAULT_JOBS_CONNECTIONS, DEFAULT_JOBS_PER_ROLE,
+                            ResultCache(DEFAULT_CACHE_SIZE, DEFAULT_JOBS_CACHE_TTL, cache_db))
+
+def command_build(argv):
+    """build subcommand - compile the dataset into a model artifact"""
+    parser = argparse.ArgumentParser(prog='recommendation.py build',
+                                     description='Compile df_upsampled.csv into a model artifact')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    parser.add_argument('--artifact-dir', help=f'Artifact directory (default: ${model_artifact.ARTIFACT_DIR_ENV} or next to the dataset)')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the artifact is up to date')
+    parser.add_argument('--ann-lists', type=int, help='IVF lists to build (default: about sqrt of the unique rows)')
+    args = parser.parse_args(argv)
+
+    try:
+        start_time = datetime.now()
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else find_dataset_path()
+        artifact_root = args.artifact_dir or model_artifact.default_artifact_root(dataset_path)
+
+        if args.force or args.ann_lists:
+            artifact = build_model_artifact(dataset_path, artifact_root, ann_lists=args.ann_lists)
+        else:
+            artifact = load_model(dataset_path, artifact_root)
+
+        result = {
+            "status": "success",
+            "artifact": artifact.path,
+            "source_hash": artifact.source_hash,
+            "compression": {
+                "rows": artifact.n_rows,
+                "unique_rows": artifact.manifest['n_unique_rows'],
+                "ratio": artifact.manifest['compression_ratio']
+            },
+            "execution_time": round((datetime.now() - start_time).total_seconds(), 2),
+            "model_info": get_model_info(artifact)
+        }
+        print(json.dumps(result, ensure_ascii=False, separators=(',', ':')))
+
+    except Exception as e:
+        log_error("=== Model Build Failed ===", {'error_message': str(e)})
+        print(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False, separators=(',', ':')))
+        sys.exit(1)
+
+def command_append(argv):
+    """append subcommand - add survey responses without re-encoding the dataset"""
+    parser = argparse.ArgumentParser(prog='recommendation.py append',
+                                     description='Append survey responses to the dataset and its compiled model')
+    parser.add_argument('rows', help='CSV with the dataset header, or JSONL with one response per line ("-" for stdin)')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    parser.add_argument('--artifact-dir', help=f'Artifact directory (default: ${model_artifact.ARTIFACT_DIR_ENV} or next to the dataset)')
+    parser.add_argument('--compact-ratio', type=float, default=DEFAULT_COMPACT_RATIO,
+                        help='Compact once appended rows exceed this fraction of the dataset (default: %(default)s)')
+    parser.add_argument('--no-compact', action='store_true', help='Never compact automatically')
+    args = parser.parse_args(argv)
+
+    try:
+        start_time = datetime.now()
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else find_dataset_path()
+        artifact, summary = append_survey_responses(args.rows, dataset_path, args.artifact_dir,
+                                                    None if args.no_compact else args.compact_ratio)
+        result = dict({
+            "status": "success",
+            "artifact": artifact.path,
+            "source_hash": artifact.source_hash,
+            "rows": artifact.n_rows,
+            "unique_rows": artifact.manifest['n_unique_rows'],
+            "pending_compaction_rows": artifact.manifest.get('appended_rows', 0),
+            "execution_time": round((datetime.now() - start_time).total_seconds(), 2)
+        }, **summary)
+        print(json.dumps(result, ensure_ascii=False, separators=(',', ':')))
+
+    except Exception as e:
+        log_error("=== Append Failed ===", {'error_message': str(e)})
+        print(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False, separators=(',', ':')))
+        sys.exit(1)
+
+def command_compact(argv):
+    """compact subcommand - fold appended rows back into the deduplicated, clustered layout"""
+    parser = argparse.ArgumentParser(prog='recommendation.py compact',
+                                     description='Rewrite the compiled model from its own arrays after appends')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    parser.add_argument('--artifact-dir', help=f'Artifact directory (default: ${model_artifact.ARTIFACT_DIR_ENV} or next to the dataset)')
+    args = parser.parse_args(argv)
+
+    try:
+        start_time = datetime.now()
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else find_dataset_path()
+        artifact_root = args.artifact_dir or model_artifact.default_artifact_root(dataset_path)
+
+        with model_artifact.build_lock(artifact_root):
+            source_hash = model_artifact.resolve_source_hash(dataset_path, artifact_root)
+            artifact = model_artifact.find_artifact(artifact_root, source_hash)
+            if artifact is None:
+                artifact = build_model_artifact(dataset_path, artifact_root, source_hash)
+            appended_rows = artifact.manifest.get('appended_rows', 0)
+            if appended_rows:
+                artifact = model_artifact.load_artifact(model_artifact.compact_artifact(artifact))
+
+        print(json.dumps({
+            "status": "success",
+            "artifact": artifact.path,
+            "compacted_rows": appended_rows,
+            "rows": artifact.n_rows,
+            "unique_rows": artifact.manifest['n_unique_rows'],
+            "execution_time": round((datetime.now() - start_time).total_seconds(), 2)
+        }, ensure_ascii=False, separators=(',', ':')))
+
+    except Exception as e:
+        log_error("=== Compaction Failed ===", {'error_message': str(e)})
+        print(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False, separators=(',', ':')))
+        sys.exit(1)
+
+def command_serve(argv):
+    """serve subcommand - keep the model loaded and answer requests over HTTP"""
+    import recommendation_server
+
+    parser = argparse.ArgumentParser(prog='recommendation.py serve',
+                                     description='Run the long-lived recommendation server')
+    parser.add_argument('--host', default=recommendation_server.DEFAULT_HOST, help='Bind address (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=recommendation_server.DEFAULT_PORT, help='Bind port (default: %(default)s)')
+    parser.add_argument('--socket', help='Listen on this Unix domain socket instead of TCP')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    parser.add_argument('--artifact-dir', help='Artifact directory (default: next to the dataset)')
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help='Scoring backend (default: %(default)s)')
+    parser.add_argument('--ann-probes', type=int, default=DEFAULT_ANN_PROBES, help='IVF lists scanned per query, 0 for exact (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Scoring threads (default: %(default)s)')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES, help='Worker processes sharing one memory-mapped model (default: %(default)s)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='Cached results kept in memory, 0 to disable (default: %(default)s)')
+    parser.add_argument('--cache-ttl', type=int, default=DEFAULT_CACHE_TTL, help='Seconds a cached result stays valid, 0 for no expiry (default: %(default)s)')
+    parser.add_argument('--cache-db', default=DEFAULT_CACHE_DB, help='SQLite file shared with other processes as a second cache tier')
+    parser.add_argument('--jobs', action='store_true', help='Answer /recommend?jobs=1 with job listings for each role')
+    parser.add_argument('--jobs-url', default=DEFAULT_JOBS_URL, help='Job search API root (default: $RECOMMENDATION_JOBS_URL or Adzuna)')
+    parser.add_argument('--verbose', action='store_true', help='Log every HTTP request')
+    parser.add_argument('--log-level', choices=sorted(LOG_LEVELS, key=LOG_LEVELS.get), help='stderr log level (default: $RECOMMENDATION_LOG_LEVEL or info)')
+    args = parser.parse_args(argv)
+    if args.log_level:
+        set_log_level(args.log_level)
+    recommendation_server.use_logger(log_message)
+
+    dataset_path = os.path.abspath(args.dataset) if args.dataset else None
+
+    def make_service():
+        # One cache per process for its lifetime; keys carry the dataset hash, so reloads never serve stale results
+        cache = ResultCache(args.cache_size, args.cache_ttl, args.cache_db)
+        return recommendation_server.RecommendationService(
+            load_model=lambda: load_model(dataset_path, args.artifact_dir, args.backend, args.ann_probes, cache,
+                                          args.workers),
+            recommend=generate_recommendations,
+            model_info=get_model_info,
+            job_insights=create_job_insights(args.jobs_url, args.cache_db) if args.jobs else None
+        )
+
+    if args.processes > 1:
+        # The supervisor only makes sure the artifact is compiled; workers map it themselves
+        recommendation_server.serve_workers(
+            make_service, args.processes, args.host, args.port, args.socket, args.verbose,
+            prepare=lambda: load_model(dataset_path, args.artifact_dir, args.backend, cache=ResultCache(0)))
+    else:
+        recommendation_server.serve(make_service(), args.host, args.port, args.socket, args.verbose)
+
+def first_pass_agreement(engine, query, k):
+    """
+    Share of the exact top-k unique rows that the first pass alone ranks in
+    its top k, i.e. before the exact re-rank fixes the order
+    """
+    query_normalized = l2_normalize_rows(query)[0]
+    approx = engine.similarities(query_normalized[np.newaxis, :])[0]
+    exact = engine.exact_similarities(np.arange(engine.n_rows), query_normalized)
+    k = min(k, engine.n_rows)
+    first_pass = set(np.argsort(-approx, kind='stable')[:k].tolist())
+    return len(first_pass & set(np.argsort(-exact, kind='stable')[:k].tolist())) / float(k)
+
+def command_compare_backends(argv):
+    """compare-backends subcommand - memory and latency of each scoring backend"""
+    parser = argparse.ArgumentParser(prog='recommendation.py compare-backends',
+                                     description='Report memory and scoring latency for every backend')
+    parser.add_argument('--file', required=True, help='JSON file with user data to score')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed scoring runs per backend')
+    parser.add_argument('--top-n', type=int, default=3, help='Roles recommended, as by a request (default: %(default)s)')
+    parser.add_argument('--top-k', type=int, default=6, help='Rows compared between backends (default: %(default)s)')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    parser.add_argument('--artifact-dir', help='Artifact directory (default: next to the dataset)')
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            user_data = validate_user_data(json.load(f))
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else None
+
+        report = {}
+        reference = None
+        for backend in BACKENDS:
+            model = load_model(dataset_path, args.artifact_dir, backend)
+            query = model.vectorizer.vectorize(user_data)
+
+            # Timed like a request: the top distinct roles, each scored by its best row
+            samples = []
+            for _ in range(max(1, args.repeat)):
+                start = time.perf_counter()
+                role_ids, similarities = model.engine.top_k_roles(query, args.top_n)
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+
+            roles, scores = role_scores(model.engine, role_ids, similarities)
+            top_indices, top_similarities = model.engine.top_k(query, args.top_k)
+            if reference is None:
+                reference = ((roles, scores), top_indices, top_similarities, model.engine.memory_bytes())
+            report[backend] = {
+                "memory_mb": round(model.engine.memory_bytes() / 1024 / 1024, 2),
+                "memory_saved_vs_dense": round(reference[3] / max(1, model.engine.memory_bytes()), 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+                "recommendations": roles,
+                "scores": scores,
+                "matches_dense": (roles, scores) == reference[0],
+                "top_k_matches_dense": (top_indices.tolist() == reference[1].tolist()
+                                        and np.array_equal(top_similarities, reference[2])),
+                "first_pass_agreement": round(first_pass_agreement(model.engine, query, args.top_k), 3)
+            }
+
+        print(json.dumps({"status": "success", "backends": report}, ensure_ascii=False, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False, separators=(',', ':')))
+        sys.exit(1)
+
+def command_evaluate(argv):
+    """evaluate subcommand - hit rates of each backend on the held-out split"""
+    parser = argparse.ArgumentParser(prog='recommendation.py evaluate',
+                                     description='Score the held-out 20%% of the dataset against the rest')
+    parser.add_argument('--configurations', nargs='+', choices=evaluation.CONFIGURATIONS,
+                        default=list(evaluation.CONFIGURATIONS),
+                        help='Engines to compare; the first is the reference for matches_first (default: all)')
+    parser.add_argument('--ann-probes', type=int, default=evaluation.DEFAULT_ANN_PROBES,
+                        help='IVF lists probed by the ivf configuration (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Scoring threads')
+    parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+    args = parser.parse_args(argv)
+
+    try:
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else find_dataset_path()
+        X_encoded, y_encoded, le_target, label_encoders, input_columns = prepare_model_data(
+            load_dataset(dataset_path))
+        vectorizer = FeatureVectorizer(create_input_features_template(), INTEREST_MAPPING, label_encoders,
+                                       input_columns)
+        report = evaluation.evaluate(X_encoded.values, y_encoded, le_target, label_encoders, input_columns,
+                                     dataset_path, vectorizer, args.configurations, args.ann_probes, args.workers)
+        print(json.dumps(dict({"status": "success", "dataset_path": dataset_path}, **report),
+                         ensure_ascii=False, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False, separators=(',', ':')))
+        sys.exit(1)
+
+def parse_import_times(stderr_text):
+    """Per-module timings from python -X importtime output, in import order"""
+    modules = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2)
+        })
+    return modules
+
+def startup_report(argv):
+    """Run this CLI cold under -X importtime and break its startup time down by module"""
+    import subprocess
+
+    command = [sys.executable, '-X', 'importtime', os.path.abspath(__file__)] + list(argv)
+    start = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True)
+    wall_time = time.perf_counter() - start
+
+    modules = parse_import_times(completed.stderr)
+    direct_imports = sorted((m for m in modules if m['depth'] == 0), key=lambda m: m['cumulative_ms'], reverse=True)
+    loaded_roots = {m['module'].split('.')[0] for m in modules}
+    try:
+        result = json.loads(completed.stdout)
+    except ValueError:
+        result = None
+
+    return {
+        "status": "success" if completed.returncode == 0 else "error",
+        "wall_time_ms": round(wall_time * 1000, 1),
+        "import_time_ms": round(sum(m['self_ms'] for m in modules), 1),
+        "modules_imported": len(modules),
+        "top_imports": [
+            {"module": m['module'], "cumulative_ms": m['cumulative_ms']}
+            for m in direct_imports[:STARTUP_REPORT_TOP_MODULES]
+        ],
+        "training_only_modules_loaded": [name for name in TRAINING_ONLY_MODULES if name in loaded_roots],
+        "result": result
+    }
+
+COMMANDS = {
+    'build': command_build,
+    'append': command_append,
+    'compact': command_compact,
+    'serve': command_serve,
+    'compare-backends': command_compare_backends,
+    'evaluate': command_evaluate,
+}
+
 def main():
     """Main function - handles all input methods and processing"""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+
+    profiler = None
     try:
         start_time = datetime.now()
         log_info("=== Career Recommendation System Started ===")
@@ -427,9 +1160,48 @@ def main():
         # Parse command line arguments
         parser = argparse.ArgumentParser(description='Career Recommendation ML Engine')
         parser.add_argument('--file', help='JSON file with user data')
+        parser.add_argument('--batch', metavar='INPUT', help='JSONL file with one user payload per line ("-" for stdin)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Users scored per similarity pass in batch mode')
+        parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help='Scoring backend (default: %(default)s)')
+        parser.add_argument('--ann-probes', type=int, default=DEFAULT_ANN_PROBES, help='IVF lists scanned per query, 0 for exact (default: %(default)s)')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Scoring threads (default: $RECOMMENDATION_WORKERS or 1)')
+        parser.add_argument('--cache-db', default=DEFAULT_CACHE_DB, help='SQLite result cache shared across runs (default: $RECOMMENDATION_CACHE_DB)')
+        parser.add_argument('--dataset', help='Path to df_upsampled.csv (default: search common locations)')
+        parser.add_argument('--startup-report', action='store_true', help='Run the request in a fresh interpreter and report per-module import timings')
+        parser.add_argument('--timings', action='store_true', help='Add per-stage timings to the JSON result')
+        parser.add_argument('--jobs', action='store_true', help='Add job listings for each recommended role (job_insights)')
+        parser.add_argument('--jobs-url', default=DEFAULT_JOBS_URL, help='Job search API root (default: $RECOMMENDATION_JOBS_URL or Adzuna)')
+        parser.add_argument('--profile', metavar='PATH', help='Write a cProfile/tracemalloc report to PATH (raw stats to PATH.pstats)')
+        parser.add_argument('--log-level', choices=sorted(LOG_LEVELS, key=LOG_LEVELS.get), help='stderr log level (default: $RECOMMENDATION_LOG_LEVEL or info)')
         parser.add_argument('user_data', nargs='?', help='JSON string with user data')
 
         args = parser.parse_args()
+        dataset_path = os.path.abspath(args.dataset) if args.dataset else None
+        if args.log_level:
+            set_log_level(args.log_level)
+
+        if args.startup_report:
+            report = startup_report([arg for arg in sys.argv[1:] if arg != '--startup-report'])
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        timer = StageTimer() if args.timings else NULL_TIMER
+        if args.profile:
+            profiler = Profiler(args.profile).start()
+
+        if args.batch:
+            model = load_model(dataset_path, backend=args.backend, ann_probes=args.ann_probes,
+                               cache=ResultCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, args.cache_db),
+                               workers=args.workers)
+            if args.batch == '-':
+                run_batch(sys.stdin, sys.stdout, model, batch_size=args.batch_size)
+            else:
+                try:
+                    with open(args.batch, 'r', encoding='utf-8') as f:
+                        run_batch(f, sys.stdout, model, batch_size=args.batch_size)
+                except FileNotFoundError:
+                    raise ValueError(f"Batch input file not found: {args.batch}")
+            return
 
         # Get user input from file or command line
         user_data = None
@@ -452,25 +1224,24 @@ def main():
             raise ValueError("No user data provided. Use --file <filename> or provide JSON string as argument.")
 
         # Validate user data
-        user_data = validate_user_data(user_data)
-        log_info("User data validation successful", user_data)
+        with timer.stage('validate'):
+            user_data = validate_user_data(user_data)
+        log_debug("User data validation successful", user_data)
 
         # Load and prepare data (same as notebook)
         log_info("Loading ML model and dataset...")
-        df_upsampled = load_dataset()
-        X, y_encoded, le_target, label_encoders, input_columns = prepare_model_data(df_upsampled)
-
-        # Create input features template
-        log_info("Creating input features template...")
-        input_features = create_input_features_template()
+        with timer.stage('model_load'):
+            model = load_model(dataset_path, backend=args.backend, ann_probes=args.ann_probes,
+                               cache=ResultCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, args.cache_db),
+                               workers=args.workers)
 
-        # Update with user data
-        log_info("Mapping user data to ML model features...")
-        input_features = update_input_features_from_user_data(input_features, user_data)
-
-        # Get recommendations (same function as notebook)
+        # Map user data to features and get recommendations (same function as notebook)
         log_info("Generating career recommendations...")
-        recommendations = recommend_roles(input_features, X, y_encoded, le_target, label_encoders, input_columns)
+        recommendations, scores = generate_recommendations(user_data, model, timer=timer)
+        if args.jobs:
+            log_info("Looking up job insights...")
+            with timer.stage('jobs'):
+                job_insights = create_job_insights(args.jobs_url, args.cache_db).for_payload(user_data, recommendations)
 
         # Calculate execution time
         end_time = datetime.now()
@@ -480,13 +1251,14 @@ def main():
         result = {
             "status": "success",
             "recommendations": recommendations,
+            "scores": scores,
             "execution_time": round(execution_time, 2),
-            "model_info": {
-                "dataset_size": df_upsampled.shape[0],
-                "features_count": len(input_columns),
-                "target_classes": len(le_target.classes_)
-            }
+            "model_info": get_model_info(model)
         }
+        if args.jobs:
+            result["job_insights"] = job_insights
+        if args.timings:
+            result["timings"] = timer.as_dict()
 
         log_info("=== Recommendation Generation Successful ===", {
             'recommendations_count': len(recommendations),
@@ -503,7 +1275,7 @@ def main():
             'error_message': str(e),
             'traceback': traceback.format_exc()
         }
-        log_info("=== Recommendation Generation Failed ===", error_details)
+        log_error("=== Recommendation Generation Failed ===", error_details)
 
         # Output clean error result
         error_result = {
@@ -513,5 +1285,9 @@ def main():
         print(json.dumps(error_result, ensure_ascii=False, separators=(',', ':')))
         sys.exit(1)
 
+    finally:
+        if profiler is not None:
+            log_info(f"Profile written to {profiler.stop()}")
+
 if __name__ == "__main__":
     main()
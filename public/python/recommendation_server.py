@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Long-lived Recommendation Server
+Loads the compiled model once and answers JSON requests over localhost HTTP
+or a Unix domain socket, so the API no longer pays interpreter startup,
+imports and dataset loading on every call.
+
+Endpoints:
+    POST /recommend   body: same user data JSON as recommendation.py --file
+                      (?timings=1 adds per-stage timings to the response,
+                      ?jobs=1 adds job listings for each role when serve
+                      runs with job insights)
+    GET  /health      model and server status
+    POST /reload      reload the model (same as sending SIGHUP)
+
+With serve --processes N a supervisor binds the socket once and forks N
+workers that accept on it. Each worker opens the same compiled artifact
+as read-only memory maps, so the page cache holds one copy of the model
+however many workers run. SIGHUP to the supervisor (or POST /reload to any
+worker) rebuilds the artifact once and then reloads every worker.
+
+Client usage (and CLI vs server latency comparison):
+    python recommendation_server.py request --socket /tmp/rec.sock --file test_data.json
+    python recommendation_server.py compare --url http://127.0.0.1:8765 --file test_data.json
+"""
+import os
+import sys
+import json
+import time
+import signal
+import contextlib
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+import socketserver
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+from instrumentation import StageTimer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_REQUEST_BYTES = 1024 * 1024
+# Seconds a connection may sit idle mid-request (or between keep-alive requests)
+REQUEST_TIMEOUT_SECONDS = 30
+SUPERVISOR_POLL_SECONDS = 0.2
+WORKER_RESTART_DELAY_SECONDS = 1.0
+
+
+def process_memory():
+    """Resident, proportional (PSS) and shared bytes of this process, or None off Linux"""
+    try:
+        with open('/proc/self/smaps_rollup', 'r', encoding='utf-8') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+    except OSError:
+        return None
+
+    def kib(name):
+        return int(fields.get(name, '0 kB').split()[0]) * 1024
+
+    return {
+        "rss_bytes": kib('Rss'),
+        "pss_bytes": kib('Pss'),
+        "shared_bytes": kib('Shared_Clean') + kib('Shared_Dirty')
+    }
+
+
+def _log_message(level, message, data=None):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if data:
+        print(f"[{timestamp}] {level.upper()}: {message} - {data}", file=sys.stderr)
+    else:
+        print(f"[{timestamp}] {level.upper()}: {message}", file=sys.stderr)
+
+
+# log_message(level, message, data); serve installs recommendation's leveled logger
+_logger = _log_message
+
+
+def use_logger(log_message):
+    """Send server and worker logs through log_message, e.g. recommendation.log_message"""
+    global _logger
+    _logger = log_message
+
+
+def log_info(message, data=None):
+    """Log information for debugging"""
+    _logger('info', message, data)
+
+
+class RecommendationService:
+    """
+    Holds the loaded model and runs the recommendation pipeline.
+    The model reference is swapped atomically on reload, so in-flight
+    requests finish on the model they started with.
+    """
+
+    def __init__(self, load_model, recommend, model_info, job_insights=None):
+        self._load_model = load_model
+        self._recommend = recommend
+        self._model_info = model_info
+        # Optional job_insights.JobInsightClient; kept across reloads with its cache
+        self.job_insights = job_insights
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.model = load_model()
+        self.started_at = time.time()
+        self.loaded_at = time.time()
+        self.requests_served = 0
+        self.requests_failed = 0
+        # Set in pre-fork workers: reloads go through the supervisor so all workers switch together
+        self.supervisor_pid = None
+
+    def recommend(self, user_data, timer=None, jobs=False):
+        """
+        Answer one request with the same JSON shape as the CLI; timer adds a
+        timings object, jobs adds job_insights (one entry per recommended role)
+        """
+        if jobs and self.job_insights is None:
+            raise ValueError("Job insights are not enabled on this server")
+        start_time = time.perf_counter()
+        model = self.model
+        try:
+            if timer is None:
+                recommendations, scores = self._recommend(user_data, model)
+            else:
+                recommendations, scores = self._recommend(user_data, model, timer=timer)
+        except Exception:
+            with self._stats_lock:
+                self.requests_failed += 1
+            raise
+
+        job_insights = None
+        if jobs:
+            with timer.stage('jobs') if timer is not None else contextlib.nullcontext():
+                job_insights = self.job_insights.for_payload(user_data, recommendations)
+
+        with self._stats_lock:
+            self.requests_served += 1
+
+        result = {
+            "status": "success",
+            "recommendations": recommendations,
+            "scores": scores,
+            "execution_time": round(time.perf_counter() - start_time, 4),
+            "model_info": self._model_info(model)
+        }
+        if job_insights is not None:
+            result["job_insights"] = job_insights
+        if timer is not None:
+            result["timings"] = timer.as_dict()
+        return result
+
+    def reload(self):
+        """Reload the model (rebuilding the artifact if the dataset changed)"""
+        if not self._reload_lock.acquire(blocking=False):
+            log_info("Reload already in progress, skipping")
+            return False
+        try:
+            log_info("Reloading recommendation model")
+            model = self._load_model()
+            self.model = model
+            self.loaded_at = time.time()
+            log_info("Recommendation model reloaded", {'source_hash': model.source_hash[:16]})
+            return True
+        except Exception as e:
+            log_info(f"Model reload failed, keeping previous model: {str(e)}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self):
+        threading.Thread(target=self.reload, name='model-reload', daemon=True).start()
+
+    def request_reload(self):
+        """POST /reload: reload this process, or every worker when running under a supervisor"""
+        if self.supervisor_pid is not None:
+            os.kill(self.supervisor_pid, signal.SIGHUP)
+        else:
+            self.reload_in_background()
+
+    def health(self):
+        model = self.model
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "model_loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat(timespec='seconds'),
+            "source_hash": model.source_hash,
+            "requests_served": self.requests_served,
+            "requests_failed": self.requests_failed,
+            "memory": process_memory(),
+            "model_info": self._model_info(model),
+            "job_insights": self.job_insights.stats() if self.job_insights is not None else None
+        }
+
+
+class RecommendationRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 JSON handler; self.server.service is the RecommendationService"""
+
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response so headers and body leave in one send; written
+    # separately, Nagle plus delayed ACK stalls keep-alive clients ~40 ms
+    wbufsize = -1
+    # Socket timeout; without one a client that announces a body and never sends it holds a thread forever
+    timeout = REQUEST_TIMEOUT_SECONDS
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.server.service.health())
+        else:
+            self._send_json(404, {"status": "error", "message": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == '/reload':
+            self.server.service.request_reload()
+            self._send_json(202, {"status": "success", "message": "Reload started"})
+            return
+        if url.path != '/recommend':
+            self._send_json(404, {"status": "error", "message": f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            user_data = self._read_json()
+        except socket.timeout:
+            # The rest of the body may still arrive; the connection cannot be reused
+            self.close_connection = True
+            self._send_json(408, {"status": "error", "message": "Timed out reading the request body"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"status": "error", "message": str(e)})
+            return
+
+        query = parse_qs(url.query)
+        timer = None
+        if query.get('timings', ['0'])[-1] not in ('0', 'false', ''):
+            timer = StageTimer()
+        jobs = query.get('jobs', ['0'])[-1] not in ('0', 'false', '')
+
+        try:
+            self._send_json(200, self.server.service.recommend(user_data, timer, jobs))
+        except ValueError as e:
+            self._send_json(400, {"status": "error", "message": str(e)})
+        except Exception as e:
+            self._send_json(500, {"status": "error", "message": str(e)})
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError("Request body is empty")
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("Request body too large")
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Invalid JSON in request body: {str(e)}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            log_info(f"{self.address_string()} {format % args}")
+
+
+class RecommendationHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=False):
+        self.service = service
+        self.verbose = verbose
+        super().__init__(address, RecommendationRequestHandler)
+
+
+class UnixRecommendationHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, service, verbose=False):
+        self.service = service
+        self.verbose = verbose
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, RecommendationRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """Serve until SIGINT/SIGTERM; SIGHUP reloads the model"""
+    if socket_path:
+        server = UnixRecommendationHTTPServer(socket_path, service, verbose)
+        where = f"unix:{socket_path}"
+    else:
+        server = RecommendationHTTPServer((host, port), service, verbose)
+        where = f"http://{host}:{server.server_address[1]}"
+
+    def handle_shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: service.reload_in_background())
+    signal.signal(signal.SIGTERM, handle_shutdown)
+
+    log_info(f"Recommendation server listening on {where}", {'pid': os.getpid()})
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log_info("Recommendation server stopped")
+
+
+def _run_worker(server, make_service, supervisor_pid):
+    """Body of a forked worker: load the model and accept on the inherited socket"""
+    def handle_shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+    server.service = make_service()
+    server.service.supervisor_pid = supervisor_pid
+    signal.signal(signal.SIGHUP, lambda signum, frame: server.service.reload_in_background())
+    server.serve_forever()
+    # Leave the shared listening socket (and a Unix socket path) to the supervisor
+    server.socket.close()
+
+
+def serve_workers(make_service, processes, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None,
+                  verbose=False, prepare=None):
+    """
+    Pre-fork server: bind once, fork `processes` workers that each call
+    make_service() and share the listening socket, and restart any that die.
+    On SIGHUP, prepare() runs once in the supervisor (rebuilding the model
+    artifact if the dataset changed, under the artifact build lock) before
+    every worker is told to reload, so workers never build concurrently and
+    all end up on the same artifact. SIGINT/SIGTERM stop the workers.
+    """
+    if socket_path:
+        server = UnixRecommendationHTTPServer(socket_path, None, verbose)
+        where = f"unix:{socket_path}"
+    else:
+        server = RecommendationHTTPServer((host, port), None, verbose)
+        where = f"http://{host}:{server.server_address[1]}"
+
+    supervisor_pid = os.getpid()
+    workers = {}
+    state = {'stopping': False, 'reload': False}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _run_worker(server, make_service, supervisor_pid)
+                code = 0
+            except BaseException as e:
+                log_info(f"Worker failed: {str(e)}", {'pid': os.getpid()})
+            finally:
+                os._exit(code)
+        workers[pid] = time.time()
+
+    def handle_shutdown(signum, frame):
+        state['stopping'] = True
+
+    def handle_reload(signum, frame):
+        state['reload'] = True
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+    signal.signal(signal.SIGHUP, handle_reload)
+
+    try:
+        if prepare is not None:
+            prepare()
+        for _ in range(processes):
+            spawn()
+        log_info(f"Recommendation server listening on {where}",
+                 {'supervisor_pid': supervisor_pid, 'workers': sorted(workers)})
+
+        while not state['stopping']:
+            if state['reload']:
+                state['reload'] = False
+                try:
+                    if prepare is not None:
+                        prepare()
+                except Exception as e:
+                    log_info(f"Model refresh failed, workers keep the previous model: {str(e)}")
+                else:
+                    log_info("Reloading all workers", {'workers': sorted(workers)})
+                    for pid in workers:
+                        os.kill(pid, signal.SIGHUP)
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+            if pid in workers:
+                started = workers.pop(pid)
+                log_info("Worker exited, restarting", {'pid': pid, 'status': status})
+                if time.time() - started < WORKER_RESTART_DELAY_SECONDS:
+                    time.sleep(WORKER_RESTART_DELAY_SECONDS)
+                if not state['stopping']:
+                    spawn()
+                continue
+            time.sleep(SUPERVISOR_POLL_SECONDS)
+    finally:
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.server_close()
+        log_info("Recommendation server stopped")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def open_connection(url=None, socket_path=None, timeout=30):
+    if socket_path:
+        return UnixHTTPConnection(socket_path, timeout=timeout)
+    host, _, port = (url or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}").split('://', 1)[-1].rstrip('/').partition(':')
+    return http.client.HTTPConnection(host, int(port or 80), timeout=timeout)
+
+
+def request_recommendation(user_data, url=None, socket_path=None, connection=None, timeout=30):
+    """Client helper: POST user data to a running server and return the decoded JSON"""
+    conn = connection or open_connection(url, socket_path, timeout)
+    try:
+        body = json.dumps(user_data).encode('utf-8')
+        conn.request('POST', '/recommend', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return json.loads(response.read().decode('utf-8'))
+    finally:
+        if connection is None:
+            conn.close()
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _latency_summary(samples):
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2)
+    }
+
+
+def compare_latency(user_data_file, url=None, socket_path=None, requests=20, cli_requests=5):
+    """Time the per-request CLI path against a running server with the same payload"""
+    with open(user_data_file, 'r', encoding='utf-8') as f:
+        user_data = json.load(f)
+
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommendation.py')
+    cli_samples = []
+    for _ in range(cli_requests):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script_path, '--file', user_data_file],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        cli_samples.append(time.perf_counter() - start)
+
+    server_samples = []
+    conn = open_connection(url, socket_path)
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            result = request_recommendation(user_data, connection=conn)
+            server_samples.append(time.perf_counter() - start)
+            if result.get('status') != 'success':
+                raise RuntimeError(f"Server returned error: {result.get('message')}")
+    finally:
+        conn.close()
+
+    cli = _latency_summary(cli_samples)
+    server = _latency_summary(server_samples)
+    return {
+        "cli": cli,
+        "server": server,
+        "speedup_p50": round(cli['p50_ms'] / max(server['p50_ms'], 1e-6), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommendation server client')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name in ('request', 'compare'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--url', help=f'Server URL (default http://{DEFAULT_HOST}:{DEFAULT_PORT})')
+        sub.add_argument('--socket', help='Unix domain socket path')
+        sub.add_argument('--file', required=True, help='JSON file with user data')
+        if name == 'compare':
+            sub.add_argument('--requests', type=int, default=20, help='Server requests to time')
+            sub.add_argument('--cli-requests', type=int, default=5, help='CLI invocations to time')
+    args = parser.parse_args()
+
+    if args.command == 'request':
+        with open(args.file, 'r', encoding='utf-8') as f:
+            result = request_recommendation(json.load(f), args.url, args.socket)
+    else:
+        result = compare_latency(args.file, args.url, args.socket, args.requests, args.cli_requests)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Result Cache
+Recommendations keyed by a hash of the encoded feature vector and the model
+that scored it. Payloads that encode to the same row (skills in another
+order, repeated entries, ...) share one entry.
+
+Two tiers:
+    memory  in-process LRU bounded by entry count and TTL
+    sqlite  optional on-disk table shared by every process using the same
+            file, so one-shot CLI runs can reuse each other's results
+"""
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600
+SQLITE_TIMEOUT_SECONDS = 5
+# SQLite caps bound parameters per statement; look up keys in chunks below it
+SQLITE_LOOKUP_CHUNK = 500
+
+
+def cache_key(input_vector, model_key, top_n):
+    """Stable key for one encoded feature row scored by model_key"""
+    digest = hashlib.sha256()
+    digest.update(f"{model_key}|{int(top_n)}|".encode('utf-8'))
+    digest.update(np.ascontiguousarray(input_vector, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    max_entries: in-memory entries kept (0 disables the memory tier)
+    ttl:         seconds an entry stays valid in either tier (0 or None: forever)
+    db_path:     SQLite file for the shared on-disk tier, or None
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS, db_path=None, clock=time.time):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl or None
+        self.db_path = db_path
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.db_path is not None
+
+    def _connect(self):
+        import sqlite3  # only needed for the disk tier
+
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, timeout=SQLITE_TIMEOUT_SECONDS, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)')
+        return self._db
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _remember(self, key, value, stored_at):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_lookup(self, keys, now):
+        import sqlite3
+
+        found = {}
+        try:
+            db = self._connect()
+            for start in range(0, len(keys), SQLITE_LOOKUP_CHUNK):
+                chunk = keys[start:start + SQLITE_LOOKUP_CHUNK]
+                rows = db.execute(
+                    f"SELECT key, value, stored_at FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, value, stored_at in rows:
+                    if self._expired(stored_at, now):
+                        self.expirations += 1
+                    else:
+                        found[key] = (json.loads(value), stored_at)
+        except sqlite3.Error:
+            # A locked or unreadable cache file only costs us the disk tier
+            pass
+        return found
+
+    def get_many(self, keys):
+        """Cached values for the keys that have a live entry, as {key: value}"""
+        now = self._clock()
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self._expired(entry[1], now):
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+                    self.hits += 1
+
+            if missing and self.db_path is not None:
+                for key, (value, stored_at) in self._disk_lookup(missing, now).items():
+                    self._remember(key, value, stored_at)
+                    found[key] = value
+                    self.hits += 1
+                    self.disk_hits += 1
+
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        """Cached value for key, or None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """Store {key: value}; values must be JSON-serializable"""
+        now = self._clock()
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value, now)
+            if items and self.db_path is not None:
+                import sqlite3
+
+                try:
+                    db = self._connect()
+                    with db:
+                        db.executemany('INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)',
+                                       [(key, json.dumps(value, ensure_ascii=False), now)
+                                        for key, value in items.items()])
+                except sqlite3.Error:
+                    pass
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def stats(self):
+        """Counters for model_info"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk": self.db_path is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,930 @@
+#!/usr/bin/env python3
+"""
+Career Recommendation System - Scoring Engine
+Cosine similarity against a pre-normalized, contiguous float32 copy of the
+dataset matrix: one dot product plus an argpartition top-k per query.
+
+Candidates near the top-k threshold are re-scored in float64 from the
+original matrix, so the ranking is the same as
+cosine_similarity(input, X) followed by a stable argsort (ties go to the
+higher row index, i.e. argsort()[-k:][::-1]).
+
+Engines can score deduplicated rows: identical (row, role) pairs of the
+upsampled dataset are scored once and expanded back to their original
+row indices, which keeps the same ranking and tie-break.
+
+The quantized backend runs the first pass over int8 codes with one scale
+per column. Its error bound depends on the query, so the re-rank margin
+is widened per query and the results stay exact.
+
+top_k_roles ranks distinct roles instead of rows: a RoleIndex keeps the
+rows grouped by role, one np.maximum.reduceat over the first-pass scores
+gives every role's best row, and only rows within the margin of both the
+k-th role and their own role's best are re-scored. Any k costs the same
+single pass. The streaming backend never holds a score vector: it keeps
+each role's running best block by block, plus the rows still above their
+role's floor.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from instrumentation import NULL_TIMER
+
+SIMILARITY_CHUNK_BYTES = 256 * 1024 * 1024
+BINARY_COLUMN_SUFFIXES = ('_skill', '_interest')
+BACKENDS = ('dense', 'sparse', 'stream', 'quantized')
+# Rows per block read by the streaming backend (16384 x 291 float32 is about 19 MB)
+STREAM_BLOCK_ROWS = 16384
+# Rows of int8 codes widened to float32 per block by the quantized backend
+QUANTIZED_BLOCK_ROWS = 1024
+QUANTIZED_LEVELS = 127
+# Single queries are only split across workers when every shard gets at least this many rows
+MIN_ROWS_PER_SHARD = 32768
+
+
+def row_norms(matrix):
+    """
+    L2 norm of each row (zero rows get 1 so they stay zero when divided).
+    A plain per-row reduction, so identical rows always get identical norms.
+    """
+    norms = np.sqrt(np.square(matrix).sum(axis=1))
+    norms[norms == 0.0] = 1.0
+    return norms
+
+
+def l2_normalize_rows(matrix, dtype=np.float64):
+    """Scale rows to unit length (all-zero rows stay zero), as cosine_similarity does"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    norms = row_norms(matrix)
+    return np.ascontiguousarray(matrix / norms[:, np.newaxis], dtype=dtype)
+
+
+def split_binary_columns(X, input_columns):
+    """
+    Indices of the 0/1 *_skill/*_interest columns (stored sparse) and of every
+    other column (years, work experience, encoded categoricals, employment)
+    """
+    binary_columns = []
+    dense_columns = []
+    for i, col in enumerate(input_columns):
+        values = np.asarray(X[:, i])
+        if col.endswith(BINARY_COLUMN_SUFFIXES) and np.isin(values, (0.0, 1.0)).all():
+            binary_columns.append(i)
+        else:
+            dense_columns.append(i)
+    return np.array(binary_columns, dtype=np.int64), np.array(dense_columns, dtype=np.int64)
+
+
+def sparse_components(X, binary_columns, dense_columns):
+    """
+    Normalized CSR arrays (data, indices, indptr) for the binary block and the
+    normalized float32 dense block; together they equal l2_normalize_rows(X)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    norms = row_norms(X)
+
+    binary = X[:, binary_columns] != 0.0
+    counts = binary.sum(axis=1)
+    indptr = np.zeros(X.shape[0] + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.nonzero(binary)[1].astype(np.int32)
+    data = np.repeat(1.0 / norms, counts).astype(np.float32)
+
+    dense = np.ascontiguousarray(X[:, dense_columns] / norms[:, np.newaxis], dtype=np.float32)
+    return data, indices, indptr, dense
+
+
+def quantize_columns(X_normalized, scales=None, chunk_rows=65536):
+    """
+    int8 codes of a row-normalized matrix with per-column float32 scales, so
+    that X_normalized ~= codes * scales to within half a step per entry.
+    Scales are fitted to the columns' largest magnitudes unless given; with
+    given scales, raises ValueError if a value would need clipping.
+    """
+    X_normalized = np.asarray(X_normalized)
+    if scales is None:
+        peak = np.abs(X_normalized).max(axis=0) if X_normalized.shape[0] else np.zeros(X_normalized.shape[1])
+        scales = np.where(peak > 0, peak / QUANTIZED_LEVELS, 1.0).astype(np.float32)
+    codes = np.empty(X_normalized.shape, dtype=np.int8)
+    for start in range(0, X_normalized.shape[0], chunk_rows):
+        steps = np.rint(np.asarray(X_normalized[start:start + chunk_rows], dtype=np.float64) / scales)
+        if np.abs(steps).max(initial=0) > QUANTIZED_LEVELS:
+            raise ValueError("Values exceed the quantization range of the column scales")
+        codes[start:start + chunk_rows] = steps
+    return codes, scales
+
+
+def dedupe_rows(X, y_encoded):
+    """
+    Collapse identical (feature row, role) pairs. Returns the index of each
+    unique row's first occurrence (in dataset order) and the RowGroups that
+    map unique rows back to all of their original rows.
+    """
+    combined = np.ascontiguousarray(np.column_stack([np.asarray(X, dtype=np.float64),
+                                                     np.asarray(y_encoded, dtype=np.float64)]) + 0.0)
+    keys = combined.view(np.dtype((np.void, combined.dtype.itemsize * combined.shape[1]))).ravel()
+    _, first_index, inverse, counts = np.unique(keys, return_index=True, return_inverse=True,
+                                                return_counts=True)
+
+    # Number unique rows by first occurrence so the compact matrix keeps dataset order
+    order = np.argsort(first_index)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    group_of_row = rank[inverse.ravel()]
+
+    members = np.argsort(group_of_row, kind='stable').astype(np.int64)
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts[order], out=offsets[1:])
+    return first_index[order].astype(np.int64), RowGroups(offsets, members)
+
+
+class RowGroups:
+    """
+    Multiplicities of the unique rows an engine scores: the original dataset
+    rows of unique row g are members[offsets[g]:offsets[g + 1]], ascending.
+    """
+
+    def __init__(self, offsets, members):
+        self.offsets = offsets
+        self.members = members
+
+    @property
+    def n_groups(self):
+        return int(self.offsets.shape[0] - 1)
+
+    @property
+    def n_rows(self):
+        return int(self.members.shape[0])
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def first_rows(self):
+        """Lowest original row index of each unique row"""
+        return self.members[self.offsets[:-1]]
+
+    def take(self, order):
+        """RowGroups for the unique rows reordered as order"""
+        counts = self.counts()[order]
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts) + np.repeat(self.offsets[order], counts)
+        return RowGroups(offsets, self.members[positions])
+
+    def expand(self, groups, scores, k):
+        """
+        Original rows of the given unique rows, each with its unique row's score.
+        Only the k highest row indices of each group can make a top-k, so
+        larger groups are cut to those.
+        """
+        ends = self.offsets[groups + 1]
+        starts = np.maximum(self.offsets[groups], ends - k)
+        lengths = ends - starts
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions += np.repeat(starts, lengths)
+        return self.members[positions], np.repeat(scores, lengths)
+
+
+class RoleIndex:
+    """
+    Engine rows grouped by role: the rows of role r are
+    order[offsets[r]:offsets[r + 1]] and names[r] is its display name. Target
+    classes whose names match once stripped share a role; names of two
+    characters or fewer, and classes without rows, get none.
+    """
+
+    def __init__(self, order, offsets, names):
+        self.order = order
+        self.offsets = offsets
+        self.names = names
+        # Role of each position in the grouped order
+        self.position_roles = np.repeat(np.arange(len(names), dtype=np.int32), np.diff(offsets))
+        self._row_roles = None
+
+    @classmethod
+    def for_engine(cls, engine, y_encoded, classes):
+        """Index over an engine's rows given the dataset's encoded targets"""
+        if engine.groups is not None:
+            # Unique rows are (row, role) pairs, so any of their original rows has the role
+            y_encoded = np.asarray(y_encoded)[engine.groups.first_rows()]
+        return cls.from_labels(y_encoded, classes)
+
+    @classmethod
+    def from_labels(cls, row_labels, classes):
+        """Index over rows whose encoded targets are row_labels"""
+        row_labels = np.asarray(row_labels, dtype=np.int64)
+        counts = np.bincount(row_labels, minlength=len(classes))
+        role_of_class = np.full(len(classes), -1, dtype=np.int64)
+        names = []
+        role_ids = {}
+        for code, name in enumerate(str(value).strip() for value in classes):
+            if len(name) > 2 and counts[code]:
+                role_of_class[code] = role_ids.setdefault(name, len(names))
+                if role_of_class[code] == len(names):
+                    names.append(name)
+
+        row_roles = role_of_class[row_labels]
+        rows = np.flatnonzero(row_roles >= 0)
+        order = rows[np.argsort(row_roles[rows], kind='stable')]
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_roles[rows], minlength=len(names)), out=offsets[1:])
+        return cls(order, offsets, names)
+
+    @property
+    def n_roles(self):
+        return len(self.names)
+
+    def best(self, scores):
+        """Scores regrouped by role, and each role's maximum (one segmented reduction)"""
+        grouped = scores[self.order]
+        return grouped, np.maximum.reduceat(grouped, self.offsets[:-1])
+
+    def row_roles(self, n_rows):
+        """Role of each of an engine's n_rows rows, -1 for rows without one; built once"""
+        if self._row_roles is None or self._row_roles.shape[0] != n_rows:
+            dtype = np.int16 if self.n_roles < np.iinfo(np.int16).max else np.int32
+            row_roles = np.full(n_rows, -1, dtype=dtype)
+            row_roles[self.order] = self.position_roles
+            self._row_roles = row_roles
+        return self._row_roles
+
+
+def order_candidates(candidates, scores, k):
+    """Sort candidates by score descending, ties by row index descending, and keep k"""
+    order = np.lexsort((-candidates, -scores))[:k]
+    return candidates[order], scores[order]
+
+
+class ScoringEngine:
+    """
+    X_normalized: (rows, features) float32, rows L2-normalized, C-contiguous
+    X: the encoded matrix behind X_normalized (float64, may be a memory map),
+       used only to re-score the handful of candidates around the top-k threshold
+    groups: optional RowGroups when X holds deduplicated rows; top-k results
+       are then expanded back to original dataset row indices
+    ann: optional ann_index.IVFIndex over the rows; used when ann_probes > 0
+    roles: optional RoleIndex over the rows, needed by top_k_roles
+    workers: threads a query batch (or a large single query's rows) is split
+       across; the matrix products release the GIL
+    """
+
+    backend = 'dense'
+    roles = None
+    workers = 1
+    _pool = None
+    _pool_size = 0
+    _pool_lock = threading.Lock()
+
+    def __init__(self, X_normalized, X, groups=None):
+        self.X_normalized = X_normalized
+        self.X = X
+        self.groups = groups
+        self.ann = None
+        self.ann_probes = 0
+        self.n_rows, self.n_features = X_normalized.shape
+        # Worst-case float32 error of a unit-vector dot product, doubled so that
+        # every row that could be in the exact top-k survives the first pass
+        self.tolerance = 2.0 * self.n_features * float(np.finfo(np.float32).eps)
+
+    def query_tolerance(self, query_normalized):
+        """Margin below the k-th first-pass score within which rows are re-scored exactly"""
+        return self.tolerance
+
+    @classmethod
+    def from_matrix(cls, X, y_encoded=None):
+        """Engine over X; with y_encoded, identical (row, role) pairs are scored once"""
+        groups = None
+        if y_encoded is not None:
+            unique_index, groups = dedupe_rows(X, y_encoded)
+            X = np.asarray(X)[unique_index]
+        return cls(l2_normalize_rows(X, dtype=np.float32), X, groups)
+
+    @property
+    def n_dataset_rows(self):
+        """Rows of the original dataset, counting duplicates"""
+        return self.groups.n_rows if self.groups is not None else self.n_rows
+
+    def memory_bytes(self):
+        """Bytes of the first-pass scoring matrix"""
+        return int(self.X_normalized.nbytes)
+
+    def similarities(self, queries_normalized):
+        """First-pass float32 similarities; queries must already be normalized"""
+        return queries_normalized.astype(np.float32, copy=False) @ self.X_normalized.T
+
+    def similarities_range(self, query_normalized, start, stop):
+        """First-pass similarities of one query against rows start:stop"""
+        return self.X_normalized[start:stop] @ query_normalized.astype(np.float32, copy=False)
+
+    def exact_similarities(self, indices, query_normalized):
+        """
+        float64 cosine similarity of selected rows. Computed row by row rather
+        than with BLAS, whose rounding depends on the shape of the call, so a
+        row always gets the same score and exact ties stay exact.
+        """
+        return (l2_normalize_rows(self.X[indices]) * query_normalized).sum(axis=1)
+
+    @staticmethod
+    def _kth_largest(approx, top):
+        return np.partition(approx, approx.shape[0] - top)[approx.shape[0] - top]
+
+    def _refine(self, approx, query_normalized, k, row_ids=None):
+        """Exact top-k from first-pass scores of all rows, or of the rows in row_ids"""
+        k = min(k, self.n_dataset_rows)
+        n_scored = approx.shape[0]
+        if k <= 0 or n_scored == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        # The k best unique rows always cover at least k dataset rows
+        threshold = self._kth_largest(approx, min(k, n_scored)) - self.query_tolerance(query_normalized)
+        candidates = np.flatnonzero(approx >= threshold)
+        if row_ids is not None:
+            candidates = row_ids[candidates]
+        exact = self.exact_similarities(candidates, query_normalized)
+        if self.groups is not None:
+            candidates, exact = self.groups.expand(candidates, exact, k)
+        return order_candidates(candidates, exact, k)
+
+    @property
+    def uses_ann(self):
+        return self.ann is not None and self.ann_probes > 0
+
+    def _ann_similarities(self, query_normalized):
+        """Row ids and first-pass scores of the probed IVF lists, plus any rows appended after them"""
+        lists = np.sort(self.ann.probe(query_normalized, self.ann_probes))
+        starts = self.ann.offsets[lists]
+        stops = self.ann.offsets[lists + 1]
+        if self.ann.offsets[-1] < self.n_rows:
+            starts = np.append(starts, self.ann.offsets[-1])
+            stops = np.append(stops, self.n_rows)
+        row_ids = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+        approx = np.concatenate([self.similarities_range(query_normalized, start, stop)
+                                 for start, stop in zip(starts, stops)])
+        return row_ids, approx
+
+    def _top_k_ann(self, query_normalized, k, timer=NULL_TIMER):
+        """Exact top-k among the rows of the probed IVF lists, plus any rows appended after them"""
+        with timer.stage('similarity'):
+            row_ids, approx = self._ann_similarities(query_normalized)
+        with timer.stage('top_k'):
+            return self._refine(approx, query_normalized, k, row_ids)
+
+    def _executor(self):
+        """Thread pool sized to workers, created on first use and replaced if workers changes"""
+        with self._pool_lock:
+            if self._pool is None or self._pool_size != self.workers:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scoring')
+                self._pool_size = self.workers
+            return self._pool
+
+    @property
+    def n_shards(self):
+        """Row shards a single query is split into"""
+        return max(1, min(self.workers, self.n_rows // MIN_ROWS_PER_SHARD))
+
+    def range_candidates(self, query_normalized, k, start, stop):
+        """First-pass (row ids, scores) among rows start:stop that could still make the top-k"""
+        scores = self.similarities_range(query_normalized, start, stop)
+        return keep_top_candidates(np.arange(start, stop), scores, k, self.query_tolerance(query_normalized))
+
+    def _top_k_sharded(self, query_normalized, k, timer=NULL_TIMER):
+        """
+        Score row shards on the worker pool. Each shard keeps every row within
+        tolerance of its own k-th best, which includes all rows that can reach
+        the global threshold, so the merged re-rank is exact.
+        """
+        with timer.stage('similarity'):
+            k_shard = max(1, min(k, self.n_dataset_rows))
+            bounds = np.linspace(0, self.n_rows, self.n_shards + 1).astype(np.int64)
+            parts = list(self._executor().map(
+                lambda shard: self.range_candidates(query_normalized, k_shard, shard[0], shard[1]),
+                zip(bounds[:-1], bounds[1:])))
+            ids = np.concatenate([part[0] for part in parts])
+            approx = np.concatenate([part[1] for part in parts])
+        with timer.stage('top_k'):
+            return self._refine(approx, query_normalized, k, ids)
+
+    def top_k(self, query, k, timer=NULL_TIMER):
+        """
+        Indices and float64 scores of the k most similar rows for one encoded
+        query; timer gets the 'similarity' and 'top_k' (selection + exact re-rank) stages
+        """
+        query_normalized = l2_normalize_rows(query)[0]
+        if self.uses_ann:
+            return self._top_k_ann(query_normalized, k, timer)
+        if self.n_shards > 1:
+            return self._top_k_sharded(query_normalized, k, timer)
+        with timer.stage('similarity'):
+            approx = self.similarities(query_normalized)
+        with timer.stage('top_k'):
+            return self._refine(approx, query_normalized, k)
+
+    def top_k_batch(self, queries, k, chunk_bytes=SIMILARITY_CHUNK_BYTES):
+        """top_k for every row of queries; with workers > 1 the queries are split across the pool"""
+        queries_normalized = l2_normalize_rows(queries)
+        if self.uses_ann:
+            return [self._top_k_ann(query_normalized, k) for query_normalized in queries_normalized]
+
+        n_slices = min(self.workers, queries_normalized.shape[0])
+        if n_slices <= 1:
+            return self._top_k_batch_normalized(queries_normalized, k, chunk_bytes)
+        slices = np.array_split(queries_normalized, n_slices)
+        parts = self._executor().map(
+            lambda part: self._top_k_batch_normalized(part, k, chunk_bytes // n_slices), slices)
+        return [result for part in parts for result in part]
+
+    def _top_k_batch_normalized(self, queries_normalized, k, chunk_bytes):
+        """One matrix product per memory-bounded chunk of (already normalized) queries"""
+        rows_per_chunk = max(1, chunk_bytes // (4 * max(1, self.n_rows)))
+        results = []
+
+        for start in range(0, queries_normalized.shape[0], rows_per_chunk):
+            chunk = queries_normalized[start:start + rows_per_chunk]
+            for query_normalized, approx in zip(chunk, self.similarities(chunk)):
+                results.append(self._refine(approx, query_normalized, k))
+
+        return results
+
+    def _refine_roles(self, approx, query_normalized, k):
+        """
+        Exact top-k roles from first-pass scores of every row (-inf for rows
+        not scored). A role ranks by its best row; roles of equal score keep the
+        row tie-break, so the order is the one deduplicating the exact row
+        ranking by role would give.
+        """
+        grouped, best = self.roles.best(approx)
+        k = min(k, int(np.isfinite(best).sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        floors = self._role_floors(best, k, self.query_tolerance(query_normalized))
+        positions = np.flatnonzero(grouped >= floors[self.roles.position_roles])
+        return self._rank_role_candidates(self.roles.order[positions], self.roles.position_roles[positions],
+                                          query_normalized, k)
+
+    def _role_floors(self, best, k, tolerance):
+        """
+        Lowest first-pass score a row of each role needs to be the exact best
+        row of a top-k role: within tolerance of both the k-th role and its own
+        role's first-pass best. Lower bests (fewer rows scored) give lower floors.
+        """
+        k = min(k, int(np.isfinite(best).sum()))
+        return np.maximum(best, self._kth_largest(best, k)) - tolerance
+
+    def _rank_role_candidates(self, candidates, candidate_roles, query_normalized, k):
+        """Re-score candidate rows exactly and keep each role's best row, k roles at most"""
+        exact = self.exact_similarities(candidates, query_normalized)
+        if self.groups is not None:
+            # Ties go to the highest original row index, the last member of each group
+            candidates = self.groups.members[self.groups.offsets[candidates + 1] - 1]
+
+        ranking = np.lexsort((-candidates, -exact))
+        ranked_roles = candidate_roles[ranking]
+        first = np.sort(np.unique(ranked_roles, return_index=True)[1])[:k]
+        return ranked_roles[first], exact[ranking][first]
+
+    def _role_similarities(self, query_normalized):
+        """First-pass scores of every row for one query; rows an IVF probe skips get -inf"""
+        if self.uses_ann:
+            row_ids, scored = self._ann_similarities(query_normalized)
+            approx = np.full(self.n_rows, -np.inf, dtype=np.float32)
+            approx[row_ids] = scored
+            return approx
+        if self.n_shards > 1:
+            bounds = np.linspace(0, self.n_rows, self.n_shards + 1).astype(np.int64)
+            return np.concatenate(list(self._executor().map(
+                lambda shard: self.similarities_range(query_normalized, shard[0], shard[1]),
+                zip(bounds[:-1], bounds[1:]))))
+        return self.similarities(query_normalized[np.newaxis, :])[0]
+
+    def _top_k_roles_ann(self, query_normalized, k):
+        return self._refine_roles(self._role_similarities(query_normalized), query_normalized, k)
+
+    def top_k_roles(self, query, k, timer=NULL_TIMER):
+        """
+        Ids (into self.roles) and float64 scores of the k best distinct roles for
+        one encoded query, each scored by its most similar row
+        """
+        query_normalized = l2_normalize_rows(query)[0]
+        with timer.stage('similarity'):
+            approx = self._role_similarities(query_normalized)
+        with timer.stage('top_k'):
+            return self._refine_roles(approx, query_normalized, k)
+
+    def top_k_roles_batch(self, queries, k, chunk_bytes=SIMILARITY_CHUNK_BYTES):
+        """top_k_roles for every row of queries, split across the pool like top_k_batch"""
+        queries_normalized = l2_normalize_rows(queries)
+        if self.uses_ann:
+            return [self._top_k_roles_ann(query_normalized, k) for query_normalized in queries_normalized]
+
+        n_slices = min(self.workers, queries_normalized.shape[0])
+        if n_slices <= 1:
+            return self._top_k_roles_batch_normalized(queries_normalized, k, chunk_bytes)
+        slices = np.array_split(queries_normalized, n_slices)
+        parts = self._executor().map(
+            lambda part: self._top_k_roles_batch_normalized(part, k, chunk_bytes // n_slices), slices)
+        return [result for part in parts for result in part]
+
+    def _top_k_roles_batch_normalized(self, queries_normalized, k, chunk_bytes):
+        rows_per_chunk = max(1, chunk_bytes // (4 * max(1, self.n_rows)))
+        results = []
+        for start in range(0, queries_normalized.shape[0], rows_per_chunk):
+            chunk = queries_normalized[start:start + rows_per_chunk]
+            for query_normalized, approx in zip(chunk, self.similarities(chunk)):
+                results.append(self._refine_roles(approx, query_normalized, k))
+        return results
+
+
+class SparseScoringEngine(ScoringEngine):
+    """
+    Same scoring as ScoringEngine, but the normalized binary columns are a
+    scipy.sparse CSR matrix and only the remaining columns are stored dense.
+    """
+
+    backend = 'sparse'
+
+    def __init__(self, data, indices, indptr, dense, binary_columns, dense_columns, X, groups=None):
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("The sparse backend requires scipy (pip install scipy)")
+
+        self.binary = csr_matrix((data, indices, indptr), shape=(dense.shape[0], len(binary_columns)),
+                                 copy=False)
+        self.dense = dense
+        self.binary_columns = binary_columns
+        self.dense_columns = dense_columns
+        self.X = X
+        self.groups = groups
+        self.ann = None
+        self.ann_probes = 0
+        self.n_rows = dense.shape[0]
+        self.n_features = len(binary_columns) + len(dense_columns)
+        self.tolerance = 2.0 * self.n_features * float(np.finfo(np.float32).eps)
+
+    @classmethod
+    def from_matrix(cls, X, input_columns, y_encoded=None):
+        groups = None
+        if y_encoded is not None:
+            unique_index, groups = dedupe_rows(X, y_encoded)
+            X = np.asarray(X)[unique_index]
+        binary_columns, dense_columns = split_binary_columns(X, input_columns)
+        return cls(*sparse_components(X, binary_columns, dense_columns), binary_columns, dense_columns,
+                   X, groups)
+
+    def memory_bytes(self):
+        return int(self.binary.data.nbytes + self.binary.indices.nbytes
+                   + self.binary.indptr.nbytes + self.dense.nbytes)
+
+    def similarities(self, queries_normalized):
+        queries = queries_normalized.astype(np.float32, copy=False)
+        binary_part = queries[..., self.binary_columns]
+        dense_part = queries[..., self.dense_columns]
+        if queries.ndim == 1:
+            return self.binary @ binary_part + self.dense @ dense_part
+        return (self.binary @ binary_part.T).T + dense_part @ self.dense.T
+
+    def similarities_range(self, query_normalized, start, stop):
+        query = query_normalized.astype(np.float32, copy=False)
+        return (self.binary[start:stop] @ query[self.binary_columns]
+                + self.dense[start:stop] @ query[self.dense_columns])
+
+
+class QuantizedScoringEngine(ScoringEngine):
+    """
+    Same scoring as ScoringEngine, but the first pass reads int8 codes (a
+    quarter of the float32 matrix) widened to float32 one block at a time.
+    Each entry is off by at most half a step of its column, so a query's
+    first-pass scores are within sum(step / 2 * |query|) of the true ones;
+    the re-rank margin includes that bound and the results are exact.
+    """
+
+    backend = 'quantized'
+
+    def __init__(self, codes, scales, X, groups=None, block_rows=QUANTIZED_BLOCK_ROWS):
+        self.codes = codes
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.X = X
+        self.groups = groups
+        self.ann = None
+        self.ann_probes = 0
+        self.block_rows = block_rows
+        self.n_rows, self.n_features = codes.shape
+        self.tolerance = 2.0 * self.n_features * float(np.finfo(np.float32).eps)
+        # Half a step per column, with slack for the float32 scales themselves
+        self.step_error = self.scales.astype(np.float64) * 0.5 * (1.0 + 1e-3)
+        self._local = threading.local()
+
+    @classmethod
+    def from_matrix(cls, X, y_encoded=None, block_rows=QUANTIZED_BLOCK_ROWS):
+        groups = None
+        if y_encoded is not None:
+            unique_index, groups = dedupe_rows(X, y_encoded)
+            X = np.asarray(X)[unique_index]
+        codes, scales = quantize_columns(l2_normalize_rows(X))
+        return cls(codes, scales, X, groups, block_rows)
+
+    def memory_bytes(self):
+        """Bytes of the codes plus one thread's float32 block"""
+        return int(self.codes.nbytes + min(self.block_rows, self.n_rows) * self.n_features * 4)
+
+    def query_tolerance(self, query_normalized):
+        return self.tolerance + 2.0 * float(self.step_error @ np.abs(query_normalized))
+
+    def _block_buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.empty((min(self.block_rows, self.n_rows), self.n_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def _scaled(self, queries_normalized):
+        return (queries_normalized * self.scales).astype(np.float32)
+
+    def similarities(self, queries_normalized):
+        queries = self._scaled(queries_normalized)
+        return np.concatenate([queries @ block.T for block in self._blocks(0, self.n_rows)], axis=-1)
+
+    def similarities_range(self, query_normalized, start, stop):
+        if start == stop:
+            return np.empty(0, dtype=np.float32)
+        query = self._scaled(query_normalized)
+        return np.concatenate([block @ query for block in self._blocks(start, stop)])
+
+    def _blocks(self, start, stop):
+        buffer = self._block_buffer()
+        for block_start in range(start, stop, buffer.shape[0]):
+            block = buffer[:min(stop, block_start + buffer.shape[0]) - block_start]
+            block[...] = self.codes[block_start:block_start + block.shape[0]]
+            yield block
+
+
+def keep_top_candidates(ids, scores, k, tolerance):
+    """
+    Bounded running top-k: of the candidates seen so far keep only those within
+    tolerance of the current k-th best score. Any row that can still reach the
+    final top-k threshold survives, so the result matches a full scan.
+    """
+    if scores.shape[0] <= k:
+        return ids, scores
+    kth = np.partition(scores, scores.shape[0] - k)[scores.shape[0] - k]
+    keep = scores >= kth - tolerance
+    return ids[keep], scores[keep]
+
+
+class NpyRowBlocks:
+    """
+    Row blocks of a 2-D C-order .npy file, read with pread into a caller's
+    buffer. Unlike a memory map, nothing of the file stays resident between
+    reads, so memory use does not grow with the file.
+    """
+
+    def __init__(self, path, n_rows=None):
+        with open(path, 'rb') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            self.offset = f.tell()
+        if fortran_order or len(shape) != 2:
+            raise ValueError(f"Expected a 2-D C-order array in {path}")
+        self.path = path
+        # Only the first n_rows when the file may be longer than the committed array
+        self.shape = shape if n_rows is None else (min(n_rows, shape[0]), shape[1])
+        self.dtype = dtype
+        self.row_bytes = shape[1] * dtype.itemsize
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+
+    def read(self, start, stop, out):
+        """Rows start:stop into out[:stop - start]; returns that view"""
+        view = out[:stop - start]
+        target = memoryview(view).cast('B')
+        position = self.offset + start * self.row_bytes
+        done = 0
+        while done < target.nbytes:
+            if hasattr(os, 'preadv'):
+                count = os.preadv(self._fd, [target[done:]], position + done)
+            else:
+                chunk = os.pread(self._fd, target.nbytes - done, position + done)
+                count = len(chunk)
+                target[done:done + count] = chunk
+            if count == 0:
+                raise EOFError(f"Unexpected end of {self.path}")
+            done += count
+        return view
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+
+class StreamingScoringEngine(ScoringEngine):
+    """
+    Same scoring as ScoringEngine, but the normalized matrix is streamed from
+    disk block by block and each query keeps only a bounded set of running
+    top-k candidates. A query's peak memory is one block (per thread)
+    regardless of the number of rows; results match the in-memory engine exactly.
+
+    Role ranking also needs each row's role: RoleIndex.row_roles is one small
+    integer per row (int16 for fewer than 32768 roles), built on first use and
+    kept next to the RoleIndex's own per-row arrays. That index grows with the
+    row count; the per-query working set does not.
+    """
+
+    backend = 'stream'
+
+    def __init__(self, reader, X, groups=None, block_rows=STREAM_BLOCK_ROWS):
+        self.reader = reader
+        self.X = X
+        self.groups = groups
+        self.ann = None
+        self.ann_probes = 0
+        self.block_rows = block_rows
+        self.n_rows, self.n_features = reader.shape
+        self.tolerance = 2.0 * self.n_features * float(np.finfo(np.float32).eps)
+        self._local = threading.local()
+
+    @classmethod
+    def from_matrix(cls, X, path, y_encoded=None, block_rows=STREAM_BLOCK_ROWS):
+        """Engine over X, writing its normalized matrix to the .npy file path"""
+        groups = None
+        if y_encoded is not None:
+            unique_index, groups = dedupe_rows(X, y_encoded)
+            X = np.asarray(X)[unique_index]
+        np.save(path, l2_normalize_rows(X, dtype=np.float32))
+        return cls(NpyRowBlocks(path), X, groups, block_rows)
+
+    def memory_bytes(self):
+        """Bytes of one thread's block buffer"""
+        return int(min(self.block_rows, self.n_rows) * self.n_features * 4)
+
+    def _block_buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.empty((min(self.block_rows, self.n_rows), self.n_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def _blocks(self, start=0, stop=None):
+        buffer = self._block_buffer()
+        stop = self.n_rows if stop is None else stop
+        for block_start in range(start, stop, buffer.shape[0]):
+            block_stop = min(stop, block_start + buffer.shape[0])
+            yield block_start, self.reader.read(block_start, block_stop, buffer)
+
+    def similarities(self, queries_normalized):
+        queries = queries_normalized.astype(np.float32, copy=False)
+        return np.concatenate([queries @ block.T for _, block in self._blocks()], axis=-1)
+
+    def similarities_range(self, query_normalized, start, stop):
+        query = query_normalized.astype(np.float32, copy=False)
+        if start == stop:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate([block @ query for _, block in self._blocks(start, stop)])
+
+    def _stream_candidates(self, queries_normalized, k, start=0, stop=None):
+        """One pass over rows start:stop for a chunk of queries; (row ids, first-pass scores) per query"""
+        k = max(1, min(k, self.n_dataset_rows))
+        queries = queries_normalized.astype(np.float32, copy=False)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        candidates = [empty] * queries.shape[0]
+
+        for block_start, block in self._blocks(start, stop):
+            block_scores = block @ queries.T
+            for j, (ids, scores) in enumerate(candidates):
+                column = block_scores[:, j]
+                if scores.shape[0] >= k:
+                    # Rows below the running threshold can never enter the top-k
+                    kth = np.partition(scores, scores.shape[0] - k)[scores.shape[0] - k]
+                    new = np.flatnonzero(column >= kth - self.tolerance)
+                else:
+                    new = np.arange(column.shape[0])
+                if new.shape[0]:
+                    candidates[j] = keep_top_candidates(np.concatenate([ids, new + block_start]),
+                                                        np.concatenate([scores, column[new]]),
+                                                        k, self.tolerance)
+        return candidates
+
+    def range_candidates(self, query_normalized, k, start, stop):
+        return self._stream_candidates(query_normalized[np.newaxis, :], k, start, stop)[0]
+
+    def top_k(self, query, k, timer=NULL_TIMER):
+        query_normalized = l2_normalize_rows(query)[0]
+        if self.uses_ann:
+            return self._top_k_ann(query_normalized, k, timer)
+        if self.n_shards > 1:
+            return self._top_k_sharded(query_normalized, k, timer)
+        with timer.stage('similarity'):
+            ids, approx = self._stream_candidates(query_normalized[np.newaxis, :], k)[0]
+        with timer.stage('top_k'):
+            return self._refine(approx, query_normalized, k, ids)
+
+    def _top_k_batch_normalized(self, queries_normalized, k, chunk_bytes):
+        """Reads the matrix once per chunk of queries"""
+        queries_per_pass = max(1, chunk_bytes // (4 * max(1, min(self.block_rows, self.n_rows))))
+        results = []
+        for start in range(0, queries_normalized.shape[0], queries_per_pass):
+            chunk = queries_normalized[start:start + queries_per_pass]
+            for query_normalized, (ids, approx) in zip(chunk, self._stream_candidates(chunk, k)):
+                results.append(self._refine(approx, query_normalized, k, ids))
+        return results
+
+    def _stream_role_candidates(self, queries_normalized, k, start=0, stop=None):
+        """
+        One pass over rows start:stop for a chunk of queries, keeping each
+        role's running first-pass best and only the rows at or above their
+        role's floor. Floors only rise as rows are read, so every row the full
+        scan would re-rank survives. (row ids, first-pass scores, role bests) per query.
+        """
+        best = np.full((queries_normalized.shape[0], self.roles.n_roles), -np.inf, dtype=np.float32)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if k <= 0:
+            return [empty + (best[j],) for j in range(queries_normalized.shape[0])]
+
+        row_roles = self.roles.row_roles(self.n_rows)
+        queries = queries_normalized.astype(np.float32, copy=False)
+        tolerances = [self.query_tolerance(query_normalized) for query_normalized in queries_normalized]
+        candidates = [empty] * queries.shape[0]
+
+        for block_start, block in self._blocks(start, stop):
+            block_roles = row_roles[block_start:block_start + block.shape[0]]
+            rows = np.flatnonzero(block_roles >= 0)
+            if rows.shape[0] == 0:
+                continue
+            roles = block_roles[rows]
+            block_scores = (block if rows.shape[0] == block.shape[0] else block[rows]) @ queries.T
+            for j, (ids, scores) in enumerate(candidates):
+                column = block_scores[:, j]
+                np.maximum.at(best[j], roles, column)
+                floors = self._role_floors(best[j], k, tolerances[j])
+                keep = scores >= floors[row_roles[ids]]
+                new = np.flatnonzero(column >= floors[roles])
+                candidates[j] = (np.concatenate([ids[keep], rows[new] + block_start]),
+                                 np.concatenate([scores[keep], column[new]]))
+        return [(ids, scores, best[j]) for j, (ids, scores) in enumerate(candidates)]
+
+    def _refine_streamed_roles(self, ids, approx, best, query_normalized, k):
+        """Exact top-k roles from streamed candidates, as _refine_roles would pick them"""
+        k = min(k, int(np.isfinite(best).sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        row_roles = self.roles.row_roles(self.n_rows)[ids]
+        floors = self._role_floors(best, k, self.query_tolerance(query_normalized))
+        keep = approx >= floors[row_roles]
+        return self._rank_role_candidates(ids[keep], row_roles[keep], query_normalized, k)
+
+    def _ann_role_candidates(self, query_normalized):
+        """Probed rows that have a role, their first-pass scores and the role bests among them"""
+        row_ids, approx = self._ann_similarities(query_normalized)
+        roles = self.roles.row_roles(self.n_rows)[row_ids]
+        has_role = roles >= 0
+        best = np.full(self.roles.n_roles, -np.inf, dtype=np.float32)
+        np.maximum.at(best, roles[has_role], approx[has_role])
+        return row_ids[has_role], approx[has_role], best
+
+    def _top_k_roles_ann(self, query_normalized, k):
+        return self._refine_streamed_roles(*self._ann_role_candidates(query_normalized), query_normalized, k)
+
+    def top_k_roles(self, query, k, timer=NULL_TIMER):
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        query_normalized = l2_normalize_rows(query)[0]
+        with timer.stage('similarity'):
+            if self.uses_ann:
+                ids, approx, best = self._ann_role_candidates(query_normalized)
+            elif self.n_shards > 1:
+                # Shard bests are lower than the merged ones, so each shard keeps a superset
+                bounds = np.linspace(0, self.n_rows, self.n_shards + 1).astype(np.int64)
+                parts = list(self._executor().map(
+                    lambda shard: self._stream_role_candidates(query_normalized[np.newaxis, :], k,
+                                                               shard[0], shard[1])[0],
+                    zip(bounds[:-1], bounds[1:])))
+                ids = np.concatenate([part[0] for part in parts])
+                approx = np.concatenate([part[1] for part in parts])
+                best = np.max([part[2] for part in parts], axis=0)
+            else:
+                ids, approx, best = self._stream_role_candidates(query_normalized[np.newaxis, :], k)[0]
+        with timer.stage('top_k'):
+            return self._refine_streamed_roles(ids, approx, best, query_normalized, k)
+
+    def _top_k_roles_batch_normalized(self, queries_normalized, k, chunk_bytes):
+        """Reads the matrix once per chunk of queries"""
+        queries_per_pass = max(1, chunk_bytes // (4 * max(1, min(self.block_rows, self.n_rows))))
+        results = []
+        for start in range(0, queries_normalized.shape[0], queries_per_pass):
+            chunk = queries_normalized[start:start + queries_per_pass]
+            for query_normalized, (ids, approx, best) in zip(chunk, self._stream_role_candidates(chunk, k)):
+                results.append(self._refine_streamed_roles(ids, approx, best, query_normalized, k))
+        return results
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_artifact  # noqa: E402
+import recommendation  # noqa: E402
+from feature_vectorizer import FeatureVectorizer  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from benchmarks.synthetic_survey import SyntheticSurvey, CATEGORY_VALUES  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def survey_df():
+    # 1500 distinct responses, each repeated on average once more, like the oversampled dataset
+    return SyntheticSurvey(3000, n_roles=8, unique_ratio=0.5).frame()
+
+
+@pytest.fixture(scope='session')
+def prepared(survey_df):
+    return recommendation.prepare_model_data(survey_df)
+
+
+@pytest.fixture
+def compiled_model(tmp_path, prepared):
+    """prepared compiled to an artifact and opened the way load_model opens it, with caching off"""
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    path = model_artifact.write_artifact(str(tmp_path), 'd' * 64, str(tmp_path / 'survey.csv'), X.values,
+                                         y_encoded, le_target, label_encoders, input_columns)
+    model = model_artifact.load_artifact(path)
+    model.vectorizer = FeatureVectorizer(recommendation.create_input_features_template(),
+                                         recommendation.INTEREST_MAPPING, label_encoders, input_columns)
+    model.cache = ResultCache(max_entries=0)
+    return model
+
+
+@pytest.fixture(scope='session')
+def random_user_data():
+    rng = np.random.default_rng(1)
+    skills = ['Java', 'Python', 'Go', 'Docker', 'React', 'SQL', 'C#', 'Rust', 'Kotlin', 'PHP']
+    interests = ['Web', 'AI', 'DevOps', 'Mobile', 'Cloud', 'Database', 'Rust', 'Go']
+    payloads = []
+    for _ in range(150):
+        payloads.append({
+            'skills': list(rng.choice(skills, rng.integers(1, 5), replace=False)),
+            'interests': list(rng.choice(interests, rng.integers(1, 3), replace=False)),
+            'country': str(rng.choice(CATEGORY_VALUES['country'] + ['Mars'])),
+            'years_code': int(rng.integers(0, 30)),
+            'work_experience': float(rng.integers(0, 20)),
+        })
+    return payloads
+
+
+@pytest.fixture(scope='session')
+def query_rows(prepared, random_user_data):
+    """random_user_data encoded the way recommend_roles encodes a payload"""
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    return np.vstack([
+        recommendation.encode_input_features(
+            recommendation.update_input_features_from_user_data(
+                recommendation.create_input_features_template(), dict(user_data)),
+            label_encoders, input_columns)
+        for user_data in random_user_data
+    ])
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import model_artifact
+import recommendation
+from scoring import BACKENDS
+
+
+@pytest.fixture
+def appended(tmp_path, survey_df):
+    """Dataset compiled from its first 2000 rows, then the rest appended as JSONL"""
+    dataset_path = str(tmp_path / 'df_upsampled.csv')
+    artifact_root = str(tmp_path / 'model_artifacts')
+    survey_df.iloc[:2000].to_csv(dataset_path, index=False)
+    base = recommendation.build_model_artifact(dataset_path, artifact_root)
+
+    new_rows = survey_df.iloc[2000:].drop(columns=['response_id']).copy()
+    # Sorts before every existing country, so refitting the encoder would renumber them all
+    new_rows.loc[new_rows.index[:4], 'country'] = 'Aaland'
+    new_rows.loc[new_rows.index[4:8], 'current_role'] = 'Role 99 Engineer'
+    rows_path = str(tmp_path / 'new.jsonl')
+    new_rows.to_json(rows_path, orient='records', lines=True)
+
+    artifact, summary = recommendation.append_survey_responses(rows_path, dataset_path, artifact_root,
+                                                               compact_ratio=None)
+    return dataset_path, artifact_root, base, artifact, summary
+
+
+def _query_rows(model, random_user_data):
+    return np.vstack([model.vectorizer.vectorize(recommendation.validate_user_data(dict(user_data)))
+                      for user_data in random_user_data])
+
+
+def _assert_same_results(engine, expected_engine, rows, k=6):
+    for (indices, scores), (want_indices, want_scores) in zip(engine.top_k_batch(rows, k),
+                                                              expected_engine.top_k_batch(rows, k)):
+        assert indices.tolist() == want_indices.tolist()
+        assert np.array_equal(scores, want_scores)
+
+
+def test_append_keeps_existing_codes(appended, survey_df):
+    dataset_path, artifact_root, base, artifact, summary = appended
+
+    assert summary == {"appended_rows": len(survey_df) - 2000, "new_roles": ['Role 99 Engineer'],
+                       "new_categories": {'country': ['Aaland']}, "compacted": False}
+    for col, le in base.label_encoders.items():
+        assert artifact.label_encoders[col].classes_[:len(le.classes_)].tolist() == le.classes_.tolist()
+    assert artifact.label_encoders['country'].classes_[-1] == 'Aaland'
+    assert artifact.n_rows == len(survey_df)
+    assert artifact.manifest['appended_rows'] == len(survey_df) - 2000
+
+    # The CLI path picks up the extended artifact without rebuilding
+    model = recommendation.load_model(dataset_path, artifact_root)
+    assert model.path == artifact.path
+
+
+def test_append_matches_full_rebuild_and_compaction(appended, random_user_data):
+    dataset_path, artifact_root, base, artifact, summary = appended
+    incremental = {backend: model_artifact.load_artifact(artifact.path, backend) for backend in BACKENDS}
+    rows = _query_rows(recommendation.load_model(dataset_path, artifact_root), random_user_data)
+
+    # A full rebuild from the appended CSV starts from the same codes and gives the same rankings
+    rebuilt = recommendation.build_model_artifact(dataset_path, artifact_root)
+    assert rebuilt.label_encoders['country'].classes_.tolist() == \
+        incremental['dense'].label_encoders['country'].classes_.tolist()
+    assert rebuilt.manifest['n_unique_rows'] < incremental['dense'].manifest['n_unique_rows']
+    for backend in BACKENDS:
+        _assert_same_results(incremental[backend].engine, rebuilt.engine, rows)
+
+    # Probing every IVF list also scans the appended tail, so it is still exact
+    engine = incremental['dense'].engine
+    engine.ann_probes = engine.ann.n_lists
+    _assert_same_results(engine, rebuilt.engine, rows)
+
+    compacted = model_artifact.load_artifact(model_artifact.compact_artifact(incremental['dense']))
+    assert compacted.manifest.get('appended_rows', 0) == 0
+    assert compacted.manifest['n_unique_rows'] == rebuilt.manifest['n_unique_rows']
+    _assert_same_results(compacted.engine, rebuilt.engine, rows)
+
+
+def test_interrupted_append_is_invisible(tmp_path, appended):
+    dataset_path, artifact_root, base, artifact, summary = appended
+    normalized_path = f"{artifact.path}/{model_artifact.NORMALIZED_FILE}"
+    n_unique = artifact.manifest['n_unique_rows']
+
+    # Rows written past the committed count, as a crash before the manifest update leaves them
+    model_artifact._append_npy(normalized_path, np.ones((3, artifact.X.shape[1]), dtype=np.float32), n_unique)
+    assert np.load(normalized_path, mmap_mode='r').shape[0] == n_unique + 3
+    for backend in BACKENDS:
+        assert model_artifact.load_artifact(artifact.path, backend).engine.n_rows == n_unique
+
+
+def test_append_outside_stored_layout_compacts(tmp_path, survey_df):
+    dataset_path = str(tmp_path / 'df_upsampled.csv')
+    artifact_root = str(tmp_path / 'model_artifacts')
+    survey_df.iloc[:500].to_csv(dataset_path, index=False)
+    recommendation.build_model_artifact(dataset_path, artifact_root)
+
+    # A single dominant value saturates its column's quantization scale
+    new_rows = survey_df.iloc[500:502].copy()
+    new_rows['work_experience'] = 1e6
+    rows_path = str(tmp_path / 'new.csv')
+    new_rows.to_csv(rows_path, index=False)
+
+    artifact, summary = recommendation.append_survey_responses(rows_path, dataset_path, artifact_root)
+    assert summary['compacted']
+    assert artifact.manifest.get('appended_rows', 0) == 0
+    assert artifact.n_rows == 502
+    assert recommendation.load_model(dataset_path, artifact_root).path == artifact.path
@@ -0,0 +1,37 @@
+import numpy as np
+
+import recommendation
+from benchmarks import pipeline
+from benchmarks.synthetic_survey import SyntheticSurvey
+
+
+def test_synthetic_survey_matches_template_schema():
+    survey = SyntheticSurvey(400, n_roles=5, unique_ratio=0.25, seed=3)
+    df = survey.frame()
+    template = recommendation.create_input_features_template()
+
+    assert list(df.columns) == ['response_id'] + list(template) + ['current_role']
+    assert df['current_role'].nunique() == 5
+    assert len(df.drop_duplicates()) == 100
+    X_encoded, y_encoded, _, label_encoders, input_columns = recommendation.prepare_model_data(df)
+    assert set(label_encoders) == {'main_branch', 'work_mode', 'education', 'country'}
+    assert np.isfinite(X_encoded.values).all()
+
+
+def test_synthetic_survey_chunks_are_deterministic():
+    survey = SyntheticSurvey(1000, seed=7)
+    whole = survey.frame()
+    chunked = survey.frame(600, 900)
+    assert whole.iloc[600:900].reset_index(drop=True).equals(chunked)
+    assert SyntheticSurvey(1000, seed=7).frame(0, 50).equals(whole.iloc[:50])
+
+
+def test_compare_flags_regressions_by_unit():
+    baseline = {"commit": "a", "results": [
+        {"rows": 10, "roles": 2, "per_query": {"score_us": 100.0}, "batch": {"users_per_second": 1000.0}}]}
+    current = {"commit": "b", "results": [
+        {"rows": 10, "roles": 2, "per_query": {"score_us": 105.0}, "batch": {"users_per_second": 500.0}}]}
+
+    comparison = pipeline.compare(baseline, current, threshold=1.1)
+    assert [r['metric'] for r in comparison['regressions']] == ['batch.users_per_second']
+    assert comparison['results'][0]['metrics']['per_query.score_us']['slowdown'] == 1.05
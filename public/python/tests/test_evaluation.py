@@ -0,0 +1,44 @@
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.model_selection import train_test_split
+
+import evaluation
+import recommendation
+from feature_vectorizer import FeatureVectorizer
+
+
+def test_held_out_split_matches_notebook(prepared):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    train, test = evaluation.split_indices(len(y_encoded))
+    X_train, X_test, y_train, y_test = train_test_split(X, y_encoded, test_size=0.2, random_state=42)
+    assert np.array_equal(X.values[test], X_test.values) and np.array_equal(y_encoded[train], y_train)
+    for n_rows in (len(y_encoded), 5, 1001):
+        assert evaluation.split_sizes(n_rows) == tuple(map(len, evaluation.split_indices(n_rows)))
+
+
+def test_evaluate_compares_configurations(tmp_path, prepared):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    vectorizer = FeatureVectorizer(recommendation.create_input_features_template(),
+                                   recommendation.INTEREST_MAPPING, label_encoders, input_columns)
+    report = evaluation.evaluate(X.values, y_encoded, le_target, label_encoders, input_columns,
+                                 str(tmp_path / 'survey.csv'), vectorizer, ann_probes=1000, work_dir=str(tmp_path))
+    assert list(report['configurations']) == list(evaluation.CONFIGURATIONS)
+    assert report['train_rows'] + report['test_rows'] == len(X)
+
+    # Brute force: a held-out row hits at 1 when its role owns the most similar training row
+    train, test = evaluation.split_indices(len(X))
+    similarities = cosine_similarity(vectorizer.as_queries(X.values[test]), X.values[train])
+    best = similarities.shape[1] - 1 - np.argmax(similarities[:, ::-1], axis=1)
+    names = np.array([str(name).strip() for name in le_target.classes_])
+    expected_hit = float(np.mean(names[y_encoded[train][best]] == names[y_encoded[test]]))
+
+    exact = report['configurations']['exact']
+    assert exact['hit@1'] == round(expected_hit, 4)
+    assert exact['hit@3'] >= exact['hit@1']
+    assert sum(role['support'] for role in exact['per_role'].values()) == report['test_rows']
+    # Probing every IVF list is exact too, so every configuration ranks like the reference
+    for name, result in report['configurations'].items():
+        assert result['matches_first'] == 1.0
+        assert (result['hit@1'], result['hit@3'], result['per_role']) == \
+            (exact['hit@1'], exact['hit@3'], exact['per_role'])
+        assert result['rows_per_second'] > 0
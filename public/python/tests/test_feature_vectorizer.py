@@ -0,0 +1,42 @@
+import numpy as np
+
+import recommendation
+from feature_vectorizer import FeatureVectorizer, encode_input_features
+
+
+def legacy_vector(user_data, label_encoders, input_columns):
+    features = recommendation.update_input_features_from_user_data(
+        recommendation.create_input_features_template(), dict(user_data))
+    return encode_input_features(features, label_encoders, input_columns)
+
+
+def make_vectorizer(label_encoders, input_columns):
+    return FeatureVectorizer(recommendation.create_input_features_template(), recommendation.INTEREST_MAPPING,
+                             label_encoders, input_columns)
+
+
+def test_vectorizer_is_bit_identical_to_template_pipeline(prepared, random_user_data):
+    _, _, _, label_encoders, input_columns = prepared
+    vectorizer = make_vectorizer(label_encoders, input_columns)
+
+    payloads = random_user_data + [
+        {'skills': ['Java', 'Unknown Tech', 'AWS'], 'interests': ['Web', 'Cloud', 'Rust', 'Nothing']},
+        {'skills': ['.NET (5+) '], 'interests': ['Full Stack'], 'education': 'PhD', 'main_branch': 'Student'},
+        {'skills': [1, 'C#'], 'interests': ['Database'], 'work_mode': 'Remote', 'work_experience': 3.5},
+    ]
+    for user_data in payloads:
+        expected = legacy_vector(user_data, label_encoders, input_columns)
+        assert np.array_equal(vectorizer.vectorize(user_data), expected)
+
+    matrix = vectorizer.vectorize_batch(payloads)
+    expected = np.vstack([legacy_vector(user_data, label_encoders, input_columns) for user_data in payloads])
+    assert np.array_equal(matrix, expected)
+
+
+def test_vectorizer_ignores_columns_missing_from_the_model(prepared):
+    _, _, _, label_encoders, input_columns = prepared
+    columns = [col for col in input_columns if col not in ('Java_skill', 'country')]
+    vectorizer = make_vectorizer(label_encoders, columns)
+    user_data = {'skills': ['Java'], 'interests': ['Web'], 'country': 'UK'}
+
+    assert np.array_equal(vectorizer.vectorize(user_data), legacy_vector(user_data, label_encoders, columns))
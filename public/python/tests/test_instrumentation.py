@@ -0,0 +1,92 @@
+import json
+import threading
+
+import recommendation
+import recommendation_server
+from instrumentation import StageTimer, NULL_TIMER, Profiler
+
+REQUEST_STAGES = {'validate_ms', 'vectorize_ms', 'similarity_ms', 'top_k_ms', 'labels_ms', 'total_ms'}
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    for _ in range(3):
+        with timer.stage('score'):
+            pass
+    with timer.stage('labels'):
+        pass
+    timings = timer.as_dict()
+    assert list(timings) == ['score_ms', 'labels_ms', 'total_ms']
+    assert timings['total_ms'] >= timings['score_ms'] >= 0
+    assert NULL_TIMER.as_dict() == {}
+
+
+def test_timings_do_not_change_recommendations(compiled_model, random_user_data):
+    model = compiled_model
+    for user_data in random_user_data[:20]:
+        timer = StageTimer()
+        timed = recommendation.generate_recommendations(dict(user_data), model, timer=timer)
+        assert timed == recommendation.generate_recommendations(dict(user_data), model)
+        assert set(timer.as_dict()) == REQUEST_STAGES
+
+
+def test_server_returns_timings_on_request(compiled_model, random_user_data):
+    model = compiled_model
+    service = recommendation_server.RecommendationService(
+        lambda: model, recommendation.generate_recommendations, recommendation.get_model_info)
+    server = recommendation_server.RecommendationHTTPServer(('127.0.0.1', 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = recommendation_server.open_connection(f"http://127.0.0.1:{server.server_address[1]}")
+        body = json.dumps(random_user_data[0])
+        for path, expect_timings in (('/recommend', False), ('/recommend?timings=1', True)):
+            connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            result = json.loads(connection.getresponse().read())
+            assert result['status'] == 'success'
+            assert ('timings' in result) == expect_timings
+        assert set(result['timings']) == REQUEST_STAGES
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_info_level_skips_payload_logs(capsys):
+    previous = recommendation.LOG_LEVEL
+    try:
+        recommendation.set_log_level('info')
+        recommendation.log_debug("User data validation successful", {'skills': ['secret']})
+        recommendation.log_info("visible")
+        assert 'secret' not in capsys.readouterr().err
+
+        recommendation.set_log_level('debug')
+        recommendation.log_debug("User data validation successful", {'skills': ['secret']})
+        assert 'DEBUG' in capsys.readouterr().err
+    finally:
+        recommendation.LOG_LEVEL = previous
+
+
+def test_server_logs_follow_the_log_level(capsys):
+    previous = recommendation.LOG_LEVEL
+    try:
+        recommendation_server.use_logger(recommendation.log_message)
+        recommendation.set_log_level('error')
+        recommendation_server.log_info("Reloading recommendation model")
+        assert capsys.readouterr().err == ''
+
+        recommendation.set_log_level('info')
+        recommendation_server.log_info("Reloading recommendation model")
+        assert 'INFO: Reloading recommendation model' in capsys.readouterr().err
+    finally:
+        recommendation.LOG_LEVEL = previous
+        recommendation_server.use_logger(recommendation_server._log_message)
+
+
+def test_profiler_writes_report(tmp_path):
+    path = str(tmp_path / 'profile.txt')
+    with Profiler(path):
+        sorted(range(10000), key=lambda x: -x)
+    with open(path, encoding='utf-8') as f:
+        report = f.read()
+    assert 'cProfile' in report and 'tracemalloc' in report and 'peak' in report
+    assert (tmp_path / 'profile.txt.pstats').exists()
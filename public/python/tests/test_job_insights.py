@@ -0,0 +1,145 @@
+import json
+import time
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import job_insights
+import recommendation
+import recommendation_server
+from job_insights import JobInsightClient
+from result_cache import ResultCache
+
+
+class StubSearch(BaseHTTPRequestHandler):
+    """
+    Adzuna-shaped /{country}/search/1 answers; roles in server.delays answer
+    late, roles in server.bodies answer with that JSON instead
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        country = url.path.split('/')[-3]
+        role = query['what'][0]
+        server = self.server
+        with server.lock:
+            server.requests.append((country, role))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delays.get(role, 0.2))
+            results = [{"title": f"{role} {i}", "company": {"display_name": "Acme"},
+                        "location": {"display_name": country.upper()}, "salary_min": 1000 * i,
+                        "salary_max": 2000 * i, "created": "2026-01-01T00:00:00Z",
+                        "redirect_url": f"https://jobs.example/{i}"}
+                       for i in range(int(query['results_per_page'][0]) + 3)]
+            payload = server.bodies.get(role, {"count": 42, "mean": 50000.0, "results": results})
+            body = json.dumps(payload).encode('utf-8')
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSearch)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.delays = {}
+    server.bodies = {}
+    server.in_flight = server.max_in_flight = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/api/jobs"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_roles_are_looked_up_concurrently_in_order(stub):
+    client = JobInsightClient(stub.base_url, max_connections=4, listings_per_role=2)
+    roles = ['Data scientist', 'Developer, back-end', 'DevOps specialist']
+    insights = client.lookup(roles, 'gb')
+
+    assert [insight['role'] for insight in insights] == roles
+    assert stub.max_in_flight >= 2
+    assert insights[0]['country'] == 'gb' and insights[0]['count'] == 42
+    assert [job['title'] for job in insights[0]['listings']] == ['Data scientist 0', 'Data scientist 1']
+    assert insights[1]['listings'][1]['company'] == 'Acme'
+
+
+def test_repeated_roles_are_served_from_the_cache(stub):
+    client = JobInsightClient(stub.base_url, cache=ResultCache(16, 60))
+    first = client.lookup(['Data scientist', 'Developer, front-end'], 'gb')
+    assert client.lookup(['Developer, front-end', 'Data scientist'], 'gb') == first[::-1]
+    assert len(stub.requests) == 2 and client.requests_sent == 2
+
+    client.lookup(['Data scientist'], 'us')
+    assert stub.requests[-1] == ('us', 'Data scientist')
+    assert client.stats()['cache']['hits'] == 2
+
+
+def test_slow_lookup_times_out_without_failing_the_others(stub):
+    stub.delays['Engineering manager'] = 3
+    client = JobInsightClient(stub.base_url, timeout=0.5)
+    slow, fast = client.lookup(['Engineering manager', 'Data scientist'], 'gb')
+
+    assert 'timed out' in slow['error'] and 'listings' not in slow
+    assert fast['listings']
+    # Failures are not cached, so the next request tries again
+    assert client.cache.get('jobs|gb|Engineering manager') is None
+
+
+def test_malformed_response_fails_only_its_role(stub):
+    stub.bodies['Engineering manager'] = {"results": ["x"]}
+    stub.bodies['Data engineer'] = ["not", "an", "object"]
+    client = JobInsightClient(stub.base_url)
+    manager, engineer, scientist = client.lookup(['Engineering manager', 'Data engineer', 'Data scientist'], 'gb')
+
+    assert 'unexpected' in manager['error'] and 'unexpected' in engineer['error']
+    assert scientist['listings']
+    assert client.cache.get('jobs|gb|Engineering manager') is None
+
+
+def test_payload_country_maps_to_adzuna_codes():
+    assert job_insights.adzuna_country({'country': 'United Kingdom of Great Britain and Northern Ireland'}) == 'gb'
+    assert job_insights.adzuna_country({'country': 'USA'}) == 'us'
+    assert job_insights.adzuna_country({'country': 'Germany', 'job_country': 'fr'}) == 'fr'
+    assert job_insights.adzuna_country({'country': 'Atlantis'}) == job_insights.DEFAULT_COUNTRY
+
+
+def test_service_adds_job_insights_on_request(stub):
+    service = recommendation_server.RecommendationService(
+        load_model=lambda: None, recommend=lambda user_data, model: (['Data scientist'], [0.9]),
+        model_info=lambda model: {}, job_insights=JobInsightClient(stub.base_url))
+    assert 'job_insights' not in service.recommend({'country': 'Canada'})
+
+    result = service.recommend({'country': 'Canada'}, jobs=True)
+    assert [(insight['role'], insight['country']) for insight in result['job_insights']] == [('Data scientist', 'ca')]
+    with pytest.raises(ValueError):
+        recommendation_server.RecommendationService(lambda: None, None, None).recommend({}, jobs=True)
+
+
+def test_missing_credentials_are_logged(monkeypatch, capsys):
+    monkeypatch.delenv('ADZUNA_APP_ID', raising=False)
+    monkeypatch.setenv('ADZUNA_APP_KEY', 'key')
+    recommendation.create_job_insights()
+    assert 'ADZUNA_APP_ID' in capsys.readouterr().err
+
+    monkeypatch.setenv('ADZUNA_APP_ID', 'id')
+    client = recommendation.create_job_insights()
+    assert capsys.readouterr().err == ''
+    assert (client.app_id, client.app_key) == ('id', 'key')
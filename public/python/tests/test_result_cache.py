@@ -0,0 +1,98 @@
+import io
+import json
+
+import numpy as np
+
+import recommendation
+from result_cache import ResultCache, cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, ttl=None)
+    cache.put('a', ['A'])
+    cache.put('b', ['B'])
+    assert cache.get('a') == ['A']
+    cache.put('c', ['C'])
+
+    assert cache.get('b') is None
+    assert cache.get('a') == ['A'] and cache.get('c') == ['C']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (3, 1, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(max_entries=10, ttl=60, clock=clock)
+    cache.put('a', ['A'])
+    clock.now += 59
+    assert cache.get('a') == ['A']
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_sqlite_tier_is_shared_between_caches(tmp_path):
+    clock = FakeClock()
+    db_path = str(tmp_path / 'results.sqlite')
+    writer = ResultCache(max_entries=10, ttl=60, db_path=db_path, clock=clock)
+    writer.put_many({'a': ['A'], 'b': ['B', 'C']})
+
+    reader = ResultCache(max_entries=0, ttl=60, db_path=db_path, clock=clock)
+    assert reader.get_many(['a', 'b', 'x']) == {'a': ['A'], 'b': ['B', 'C']}
+    assert reader.stats()['disk_hits'] == 2
+    clock.now += 61
+    assert reader.get('a') is None
+    writer.close()
+    reader.close()
+
+
+def test_cache_key_depends_on_row_model_and_top_n():
+    row = np.array([1.0, 0.0, 3.0])
+    assert cache_key(row, 'm1', 3) == cache_key(row.copy(), 'm1', 3)
+    assert cache_key(row, 'm1', 3) != cache_key(row, 'm2', 3)
+    assert cache_key(row, 'm1', 3) != cache_key(row, 'm1', 5)
+    assert cache_key(row, 'm1', 3) != cache_key(np.array([1.0, 0.0, 2.0]), 'm1', 3)
+
+
+def test_cached_results_match_uncached(compiled_model, random_user_data):
+    model = compiled_model
+    expected = [recommendation.generate_recommendations(dict(u), model) for u in random_user_data]
+
+    model.cache = ResultCache()
+    reordered = [dict(u, skills=list(reversed(u['skills']))) for u in random_user_data]
+    assert [recommendation.generate_recommendations(dict(u), model) for u in random_user_data] == expected
+    assert [recommendation.generate_recommendations(u, model) for u in reordered] == expected
+    assert model.cache.stats()['hits'] >= len(random_user_data)
+
+    # Batch mode scores each distinct row once and answers repeats from the cache
+    model.cache = ResultCache()
+    output = io.StringIO()
+    lines = [json.dumps(u) for u in random_user_data + random_user_data]
+    recommendation.run_batch(io.StringIO('\n'.join(lines)), output, model)
+    results = [(result['recommendations'], result['scores'])
+               for result in map(json.loads, output.getvalue().splitlines())]
+    assert results == expected + expected
+    assert model.cache.stats()['misses'] <= len(random_user_data)
+
+
+def test_entries_from_older_value_formats_are_not_served(tmp_path, compiled_model, random_user_data):
+    model = compiled_model
+    user_data = dict(random_user_data[0])
+    expected = recommendation.generate_recommendations(dict(user_data), model)
+
+    # Before roles came with scores, the shared cache held plain role lists under the bare source hash
+    db_path = str(tmp_path / 'shared.sqlite')
+    vector = model.vectorizer.vectorize(recommendation.validate_user_data(dict(user_data)))
+    ResultCache(db_path=db_path).put(cache_key(vector, model.source_hash, 3), ['Role A', 'Role B'])
+
+    model.cache = ResultCache(db_path=db_path)
+    assert recommendation.generate_recommendations(dict(user_data), model) == expected
+    assert model.cache.stats()['disk_hits'] == 0
@@ -0,0 +1,295 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+import scoring
+import model_artifact
+import recommendation
+from scoring import (ScoringEngine, SparseScoringEngine, StreamingScoringEngine, QuantizedScoringEngine,
+                     l2_normalize_rows)
+
+
+def reference_recommend_roles(input_features, X, y_encoded, le_target, label_encoders, input_columns, top_n=3,
+                              n_candidates=None):
+    """
+    recommend_roles as it was before the scoring engine (DataFrame + sklearn +
+    argsort), deduplicating the n_candidates best rows (top_n*2 by default)
+    """
+    input_df = pd.DataFrame([input_features], columns=input_columns)
+    for col in input_df.select_dtypes(include=['object']).columns:
+        if col in label_encoders:
+            try:
+                input_df[col] = label_encoders[col].transform(input_df[col])
+            except ValueError:
+                input_df[col] = input_df[col].apply(lambda x: -1)
+    input_df = input_df.fillna(0).reindex(columns=X.columns, fill_value=0)
+
+    similarities = cosine_similarity(input_df.values, X).flatten()
+    top_indices = similarities.argsort(kind='stable')[-(n_candidates or top_n*2):][::-1]
+    unique_roles = []
+    for role in le_target.inverse_transform(y_encoded[top_indices]):
+        role_clean = str(role).strip()
+        if role_clean not in unique_roles and len(role_clean) > 2:
+            unique_roles.append(role_clean)
+        if len(unique_roles) >= top_n:
+            break
+    return similarities[top_indices], unique_roles
+
+
+def test_engine_matches_reference_ranking(prepared, random_user_data):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    engine = ScoringEngine.from_matrix(X.values)
+
+    for user_data in random_user_data:
+        features = recommendation.update_input_features_from_user_data(
+            recommendation.create_input_features_template(), dict(user_data))
+        for top_n in (1, 3, 10):
+            expected_scores, expected_roles = reference_recommend_roles(
+                features, X, y_encoded, le_target, label_encoders, input_columns, top_n)
+            _, all_roles = reference_recommend_roles(
+                features, X, y_encoded, le_target, label_encoders, input_columns, top_n, n_candidates=len(X))
+            roles, role_scores = recommendation.recommend_roles(
+                features, X.values, y_encoded, le_target, label_encoders, input_columns, top_n, engine=engine)
+            query = recommendation.encode_input_features(features, label_encoders, input_columns)
+            _, scores = engine.top_k(query, top_n*2)
+
+            # sklearn itself scores identical duplicate rows a few ulps apart, so
+            # compare roles exactly and scores to rounding error
+            assert roles[:len(expected_roles)] == expected_roles
+            assert roles == all_roles
+            assert len(roles) == min(top_n, len(le_target.classes_))
+            assert np.allclose(scores, expected_scores, rtol=0, atol=1e-12)
+            # Each role scores as its most similar row
+            names = le_target.inverse_transform(y_encoded)
+            similarities = cosine_similarity(query[np.newaxis, :], X.values)[0]
+            assert np.allclose(role_scores, [similarities[names == role].max() for role in roles], rtol=0, atol=1e-4)
+
+
+def test_batch_matches_single_queries(prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    engine = ScoringEngine.from_matrix(X.values)
+    engine.roles = scoring.RoleIndex.for_engine(engine, y_encoded, le_target.classes_)
+
+    # A tiny chunk budget forces several matrix-product chunks
+    batch = recommendation.recommend_roles_batch(query_rows, engine, chunk_bytes=64 * 1024)
+    single = [recommendation.recommend_roles_for_vector(row, engine) for row in query_rows]
+    assert batch == single
+
+
+def test_sparse_backend_matches_dense(prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    dense = ScoringEngine.from_matrix(X.values)
+    sparse = SparseScoringEngine.from_matrix(X.values, input_columns)
+    assert len(sparse.dense_columns) < 30
+    assert sparse.memory_bytes() < dense.memory_bytes()
+
+    for (dense_indices, dense_scores), (sparse_indices, sparse_scores) in zip(
+            dense.top_k_batch(query_rows, 10), sparse.top_k_batch(query_rows, 10)):
+        assert sparse_indices.tolist() == dense_indices.tolist()
+        assert np.array_equal(sparse_scores, dense_scores)
+    assert np.allclose(sparse.similarities(l2_normalize_rows(query_rows)),
+                       dense.similarities(l2_normalize_rows(query_rows)), atol=1e-6)
+
+
+def test_deduplicated_index_matches_full_scan(prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    full = ScoringEngine.from_matrix(X.values)
+    deduped = ScoringEngine.from_matrix(X.values, y_encoded)
+    sparse_deduped = SparseScoringEngine.from_matrix(X.values, input_columns, y_encoded)
+    assert deduped.n_rows == deduped.groups.n_groups < full.n_rows
+    assert deduped.n_dataset_rows == full.n_rows
+
+    for k in (1, 6, 40):
+        for expected, got, got_sparse in zip(full.top_k_batch(query_rows, k), deduped.top_k_batch(query_rows, k),
+                                             sparse_deduped.top_k_batch(query_rows, k)):
+            assert got[0].tolist() == got_sparse[0].tolist() == expected[0].tolist()
+            assert np.array_equal(got[1], expected[1])
+
+
+def test_top_k_breaks_ties_like_stable_argsort():
+    X = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 0.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]])
+    engine = ScoringEngine.from_matrix(X)
+    indices, scores = engine.top_k(np.array([1.0, 0.0]), 4)
+
+    expected = cosine_similarity([[1.0, 0.0]], X).flatten().argsort(kind='stable')[-4:][::-1]
+    assert indices.tolist() == expected.tolist() == [4, 2, 0, 3]
+    assert np.allclose(scores, [1.0, 1.0, 1.0, np.sqrt(0.5)])
+
+
+def test_ivf_artifact_matches_exact_scan(tmp_path, prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    full = ScoringEngine.from_matrix(X.values)
+    path = model_artifact.write_artifact(str(tmp_path), 'f' * 64, str(tmp_path / 'survey.csv'), X.values,
+                                         y_encoded, le_target, label_encoders, input_columns, ann_lists=8)
+
+    expected = full.top_k_batch(query_rows, 6)
+    for backend in ('dense', 'sparse', 'quantized'):
+        engine = model_artifact.load_artifact(path, backend).engine
+        assert engine.ann.n_lists == 8
+
+        # Probing every list is an exact scan in list order
+        for probes in (0, engine.ann.n_lists):
+            engine.ann_probes = probes
+            for (indices, scores), (expected_indices, expected_scores) in zip(engine.top_k_batch(query_rows, 6),
+                                                                              expected):
+                assert indices.tolist() == expected_indices.tolist()
+                assert np.array_equal(scores, expected_scores)
+
+        engine.ann_probes = 2
+        hits = sum(len(set(got[0].tolist()) & set(want[0].tolist()))
+                   for got, want in zip(engine.top_k_batch(query_rows, 6), expected))
+        assert hits / float(sum(len(want[0]) for want in expected)) > 0.5
+
+
+def test_streaming_backend_matches_in_memory(tmp_path, prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    dense = ScoringEngine.from_matrix(X.values, y_encoded)
+    # A small block size forces many blocks and many running-threshold updates
+    stream = StreamingScoringEngine.from_matrix(X.values, str(tmp_path / 'normalized.npy'), y_encoded,
+                                                block_rows=97)
+    assert stream.memory_bytes() == 97 * X.shape[1] * 4
+
+    for k in (1, 6, 40):
+        expected = dense.top_k_batch(query_rows, k)
+        for (indices, scores), (batch_indices, batch_scores), (want_indices, want_scores) in zip(
+                [stream.top_k(row, k) for row in query_rows], stream.top_k_batch(query_rows, k, chunk_bytes=4096),
+                expected):
+            assert indices.tolist() == batch_indices.tolist() == want_indices.tolist()
+            assert np.array_equal(scores, want_scores) and np.array_equal(batch_scores, want_scores)
+
+
+def test_streaming_peak_memory_does_not_grow_with_rows(tmp_path):
+    rng = np.random.default_rng(5)
+    query = (rng.random(64) < 0.2).astype(np.float64)
+    peaks = []
+    for n_rows in (5000, 50000):
+        X = (rng.random((n_rows, 64)) < 0.2).astype(np.float64)
+        stream = StreamingScoringEngine.from_matrix(X, str(tmp_path / f'{n_rows}.npy'), block_rows=1024)
+        stream.top_k(query, 6)
+        tracemalloc.start()
+        stream.top_k(query, 6)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < peaks[0] * 1.5 + 64 * 1024
+
+
+def test_streaming_role_ranking_memory_does_not_grow_with_rows(tmp_path):
+    rng = np.random.default_rng(5)
+    query = (rng.random(64) < 0.2).astype(np.float64)
+    classes = np.array([f'Role {role}' for role in range(12)])
+    peaks = []
+    for n_rows in (5000, 50000):
+        X = (rng.random((n_rows, 64)) < 0.2).astype(np.float64)
+        y = rng.integers(0, len(classes), n_rows)
+        stream = StreamingScoringEngine.from_matrix(X, str(tmp_path / f'{n_rows}.npy'), block_rows=1024)
+        stream.roles = scoring.RoleIndex.for_engine(stream, y, classes)
+        expected = ScoringEngine.top_k_roles(stream, query, 3)
+        stream.top_k_roles(query, 3)
+        tracemalloc.start()
+        role_ids, scores = stream.top_k_roles(query, 3)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert role_ids.tolist() == expected[0].tolist() and np.array_equal(scores, expected[1])
+    assert peaks[1] < peaks[0] * 1.5 + 64 * 1024
+
+
+def test_parallel_workers_match_serial(tmp_path, monkeypatch, prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    # Small shards so single queries are split across the pool too
+    monkeypatch.setattr(scoring, 'MIN_ROWS_PER_SHARD', 50)
+    engines = [
+        ScoringEngine.from_matrix(X.values, y_encoded),
+        SparseScoringEngine.from_matrix(X.values, input_columns, y_encoded),
+        StreamingScoringEngine.from_matrix(X.values, str(tmp_path / 'normalized.npy'), y_encoded, block_rows=97),
+        QuantizedScoringEngine.from_matrix(X.values, y_encoded, block_rows=97),
+    ]
+    for engine in engines:
+        for k in (1, 6, 40):
+            engine.workers = 1
+            expected = engine.top_k_batch(query_rows, k)
+            engine.workers = 3
+            assert engine.n_shards == 3
+            for (indices, scores), (batch_indices, batch_scores), (want_indices, want_scores) in zip(
+                    [engine.top_k(row, k) for row in query_rows], engine.top_k_batch(query_rows, k), expected):
+                assert indices.tolist() == batch_indices.tolist() == want_indices.tolist()
+                assert np.array_equal(scores, want_scores) and np.array_equal(batch_scores, want_scores)
+
+
+def test_quantized_backend_matches_dense(prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    dense = ScoringEngine.from_matrix(X.values, y_encoded)
+    quantized = QuantizedScoringEngine.from_matrix(X.values, y_encoded, block_rows=97)
+    assert quantized.codes.dtype == np.int8
+    assert quantized.codes.nbytes * 4 == dense.X_normalized.nbytes
+
+    # The first pass is only approximate, within the per-query bound the re-rank relies on
+    rows_normalized = l2_normalize_rows(query_rows)
+    error = np.abs(quantized.similarities(rows_normalized) - dense.similarities(rows_normalized))
+    bounds = [quantized.query_tolerance(row) - quantized.tolerance for row in rows_normalized]
+    assert (error.max(axis=1) <= np.array(bounds) / 2 + dense.tolerance).all()
+    assert error.max() > 0
+
+    for k in (1, 6, 40):
+        for (indices, scores), (batch_indices, batch_scores), (want_indices, want_scores) in zip(
+                [quantized.top_k(row, k) for row in query_rows], quantized.top_k_batch(query_rows, k),
+                dense.top_k_batch(query_rows, k)):
+            assert indices.tolist() == batch_indices.tolist() == want_indices.tolist()
+            assert np.array_equal(scores, want_scores) and np.array_equal(batch_scores, want_scores)
+
+
+def test_top_k_roles_match_full_ranking_deduplicated(tmp_path, monkeypatch, prepared, query_rows):
+    X, y_encoded, le_target, label_encoders, input_columns = prepared
+    full = ScoringEngine.from_matrix(X.values)
+    path = model_artifact.write_artifact(str(tmp_path), 'f' * 64, str(tmp_path / 'survey.csv'), X.values,
+                                         y_encoded, le_target, label_encoders, input_columns, ann_lists=8)
+    n_roles = len(le_target.classes_)
+    names = le_target.inverse_transform(y_encoded)
+
+    # Every role in order of its best row in the exact ranking of all rows
+    expected = []
+    for row in query_rows:
+        indices, scores = full.top_k(row, len(X))
+        first = np.sort(np.unique(names[indices], return_index=True)[1])
+        expected.append((names[indices][first].tolist(), scores[first]))
+
+    monkeypatch.setattr(scoring, 'MIN_ROWS_PER_SHARD', 50)
+    for backend in scoring.BACKENDS:
+        engine = model_artifact.load_artifact(path, backend).engine
+        assert engine.roles.n_roles == n_roles
+        # Serial, split across workers, and probing every IVF list are all exact
+        for workers, probes in ((1, 0), (3, 0), (1, engine.ann.n_lists)):
+            engine.workers, engine.ann_probes = workers, probes
+            for k in (0, 1, 3, n_roles + 5):
+                batch = engine.top_k_roles_batch(query_rows, k, chunk_bytes=64 * 1024)
+                for row, (batch_ids, batch_scores), (want_roles, want_scores) in zip(query_rows, batch, expected):
+                    role_ids, scores = engine.top_k_roles(row, k)
+                    want_roles, want_scores = want_roles[:k], want_scores[:k]
+                    assert [engine.roles.names[role] for role in role_ids] == want_roles
+                    assert len(want_roles) == min(k, n_roles)
+                    assert role_ids.tolist() == batch_ids.tolist()
+                    assert np.array_equal(scores, want_scores) and np.array_equal(batch_scores, want_scores)
+
+
+def test_top_k_roles_rescores_only_rows_near_their_roles_best(monkeypatch):
+    # One role owns almost every row and all of them score well above the k-th role
+    rng = np.random.default_rng(7)
+    query = rng.random(16)
+    X = np.vstack([query + rng.normal(0, 0.3, (3000, 16)),
+                   rng.random((60, 16)) * (rng.random((60, 16)) < 0.5)])
+    y = np.r_[np.zeros(3000, dtype=int), np.repeat([1, 2, 3], 20)]
+    classes = np.array(['Dominant role', 'Role one', 'Role two', 'Role three'])
+    similarities = cosine_similarity([query], X)[0]
+    expected = sorted(((similarities[y == role].max(), role) for role in range(4)), reverse=True)[:3]
+
+    for engine in (ScoringEngine.from_matrix(X), QuantizedScoringEngine.from_matrix(X)):
+        engine.roles = scoring.RoleIndex.for_engine(engine, y, classes)
+        rescored = []
+        exact_similarities = engine.exact_similarities
+        monkeypatch.setattr(engine, 'exact_similarities',
+                            lambda candidates, q: rescored.append(len(candidates)) or exact_similarities(candidates, q))
+        role_ids, scores = engine.top_k_roles(query, 3)
+        assert role_ids.tolist() == [role for _, role in expected]
+        assert np.allclose(scores, [score for score, _ in expected], rtol=0, atol=1e-9)
+        assert sum(rescored) < 100
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import threading
+import subprocess
+
+import pytest
+
+import recommendation
+import recommendation_server
+
+SCRIPT = os.path.abspath(recommendation.__file__)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='pre-fork serving needs os.fork')
+
+
+def _health(socket_path):
+    connection = recommendation_server.open_connection(socket_path=socket_path, timeout=5)
+    try:
+        connection.request('GET', '/health')
+        return json.loads(connection.getresponse().read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def _wait_for(condition, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            result = condition()
+            if result:
+                return result
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("condition not met before timeout")
+
+
+def _worker_hashes(socket_path, rounds=30):
+    """source_hash reported by each worker pid seen over a number of connections"""
+    seen = {}
+    for _ in range(rounds):
+        health = _health(socket_path)
+        seen[health['pid']] = health['source_hash']
+    return seen
+
+
+def test_workers_share_one_artifact_and_reload_together(tmp_path, survey_df):
+    dataset_path = str(tmp_path / 'df_upsampled.csv')
+    survey_df.to_csv(dataset_path, index=False)
+    socket_path = str(tmp_path / 'rec.sock')
+    env = dict(os.environ)
+    env.pop('RECOMMENDATION_CACHE_DB', None)
+
+    server = subprocess.Popen([sys.executable, SCRIPT, 'serve', '--dataset', dataset_path, '--socket', socket_path,
+                               '--processes', '3'], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    try:
+        def several_workers():
+            seen = _worker_hashes(socket_path)
+            return len(seen) > 1 and seen
+
+        workers = _wait_for(several_workers)
+        assert server.pid not in workers
+        first_hash = set(workers.values())
+        assert len(first_hash) == 1
+
+        survey_df.iloc[:2].to_csv(dataset_path, index=False, header=False, mode='a')
+        connection = recommendation_server.open_connection(socket_path=socket_path)
+        connection.request('POST', '/reload')
+        assert connection.getresponse().status == 202
+        connection.close()
+
+        def all_reloaded():
+            seen = _worker_hashes(socket_path)
+            return len(seen) > 1 and not set(seen.values()) & first_hash and seen
+
+        reloaded = _wait_for(all_reloaded)
+        assert len(set(reloaded.values())) == 1
+        assert _health(socket_path)['model_info']['dataset_size'] == len(survey_df) + 2
+    finally:
+        server.send_signal(signal.SIGTERM)
+        _, stderr = server.communicate(timeout=30)
+
+    # The supervisor compiled each version of the dataset once; workers only mapped it
+    assert stderr.decode('utf-8').count('No compiled model for current dataset, rebuilding') == 2
+    assert not os.path.exists(socket_path)
+
+
+def test_request_body_that_never_arrives_times_out(monkeypatch):
+    monkeypatch.setattr(recommendation_server.RecommendationRequestHandler, 'timeout', 0.5)
+    service = recommendation_server.RecommendationService(lambda: None, None, None)
+    server = recommendation_server.RecommendationHTTPServer(('127.0.0.1', 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.create_connection(server.server_address, timeout=5) as client:
+            client.sendall(b"POST /recommend HTTP/1.1\r\nHost: localhost\r\nContent-Length: 5\r\n\r\n")
+            response = client.makefile('rb').read()
+        assert response.startswith(b"HTTP/1.1 408 ")
+        assert b"Timed out reading the request body" in response
+    finally:
+        server.shutdown()
+        server.server_close()
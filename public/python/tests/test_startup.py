@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+import pytest
+
+import recommendation
+
+SCRIPT = os.path.abspath(recommendation.__file__)
+# Seconds from process start to a printed recommendation; raise it on slow CI machines
+STARTUP_BUDGET_SECONDS = float(os.environ.get('RECOMMENDATION_STARTUP_BUDGET', '1.0'))
+
+
+@pytest.fixture(scope='module')
+def compiled_dataset(tmp_path_factory, survey_df):
+    directory = tmp_path_factory.mktemp('startup')
+    dataset_path = str(directory / 'df_upsampled.csv')
+    survey_df.to_csv(dataset_path, index=False)
+    recommendation.build_model_artifact(dataset_path, str(directory / 'model_artifacts'))
+
+    user_file = str(directory / 'user.json')
+    with open(user_file, 'w', encoding='utf-8') as f:
+        json.dump({'skills': ['Python', 'Docker'], 'interests': ['AI'], 'country': 'UK'}, f)
+    return dataset_path, user_file
+
+
+def _cli_env(dataset_path):
+    env = dict(os.environ)
+    env.pop('RECOMMENDATION_CACHE_DB', None)
+    env[recommendation.model_artifact.ARTIFACT_DIR_ENV] = os.path.join(os.path.dirname(dataset_path), 'model_artifacts')
+    return env
+
+
+def test_cold_start_within_budget(compiled_dataset):
+    dataset_path, user_file = compiled_dataset
+    command = [sys.executable, SCRIPT, '--dataset', dataset_path, '--file', user_file]
+
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        completed = subprocess.run(command, capture_output=True, text=True, env=_cli_env(dataset_path))
+        timings.append(time.perf_counter() - start)
+        assert json.loads(completed.stdout)['status'] == 'success', completed.stderr
+
+    assert min(timings) < STARTUP_BUDGET_SECONDS, f"cold start took {min(timings):.2f}s"
+
+
+def test_request_path_skips_training_imports(compiled_dataset):
+    dataset_path, user_file = compiled_dataset
+    completed = subprocess.run([sys.executable, SCRIPT, '--dataset', dataset_path, '--file', user_file,
+                                '--startup-report'], capture_output=True, text=True, env=_cli_env(dataset_path))
+    report = json.loads(completed.stdout)
+
+    assert report['status'] == 'success'
+    assert report['result']['recommendations']
+    assert report['training_only_modules_loaded'] == []